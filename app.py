@@ -1,12 +1,22 @@
 import os
+import time
+import base64
 import mysql.connector
 import json
-import re
-from flask import Flask, jsonify, request, render_template
+from decimal import Decimal, InvalidOperation
+from urllib.parse import urlencode
+from flask import Flask, jsonify, request, render_template, Response
 from dotenv import load_dotenv
 from flask_cors import CORS
 import utils
 import asyncio
+import trabajos
+import db
+import bd_async
+import esquema
+import indice_candidatos
+import servicio_evaluacion
+from planificador_llm import PRIORIDAD_INTERACTIVA, PRIORIDAD_NORMAL, PRIORIDAD_MASIVA
 
 # Cargar variables de entorno desde el archivo .env
 load_dotenv()
@@ -15,21 +25,57 @@ app = Flask(__name__)
 # Habilitar CORS para permitir peticiones desde el frontend
 CORS(app)
 
+# Con JOBS_EMBEDDED=1 (desarrollo) este proceso también ejecuta los trabajos. Con varios
+# workers web (gunicorn.conf.py) se pone a 0 y los ejecuta un único proceso aparte
+# (worker.py), para que el presupuesto del LLM sea realmente global.
+PROCESAR_TRABAJOS_EN_WEB = os.getenv('JOBS_EMBEDDED', '1') == '1'
+# Segundos que se espera a las evaluaciones en curso al apagar antes de interrumpirlas.
+PLAZO_DRENADO = float(os.getenv('JOBS_DRAIN_TIMEOUT', '60'))
+
+# Cola persistente donde se ejecutan las evaluaciones de puestos en segundo plano. Todas
+# corren en el servicio de evaluación, que reparte un único presupuesto del LLM entre los
+# puestos activos según la prioridad de cada tipo de trabajo.
+cola_trabajos = trabajos.ColaTrabajos({
+    'evaluar': utils.orquestador_evaluar_puesto_nuevo_optimizado,
+    'reevaluar': utils.orquestador_reevaluar_puesto_modificado,
+    'reanudar': utils.reanudar_ejecucion,
+    'reevaluar_candidato': utils.orquestador_reevaluar_candidato
+}, prioridades={
+    'evaluar': PRIORIDAD_MASIVA,
+    'reevaluar': PRIORIDAD_NORMAL,
+    'reanudar': PRIORIDAD_MASIVA,
+    'reevaluar_candidato': PRIORIDAD_INTERACTIVA
+}, ejecutar_corrutina=servicio_evaluacion.SERVICIO.ejecutar, arrancar_al_encolar=PROCESAR_TRABAJOS_EN_WEB)
+
+
+def detener_evaluaciones(plazo: float = PLAZO_DRENADO) -> bool:
+    """
+    Apagado ordenado de las evaluaciones del proceso: deja de reclamar trabajos, espera
+    hasta `plazo` segundos a las ejecuciones en curso y cierra el pool de hilos de la BD.
+    Las que no terminan guardan su punto de control y su trabajo vuelve a la cola para
+    reanudarse en el próximo arranque. Devuelve False si hubo que interrumpir alguna.
+    """
+    cola_trabajos.dejar_de_reclamar()
+    completo = servicio_evaluacion.SERVICIO.detener(plazo)
+    cola_trabajos.detener(timeout=10)
+    bd_async.EJECUTOR.cerrar()
+    print("✅ Evaluaciones detenidas." if completo else "⚠️  Evaluaciones detenidas; las interrumpidas se reanudarán.")
+    return completo
+
 # --- Configuración de la conexión a la base de datos ---
 def get_db_connection():
-    """Establece la conexión con la base de datos MySQL."""
+    """Obtiene una conexión del pool compartido con la base de datos MySQL."""
     try:
-        conn = mysql.connector.connect(
-            host=os.getenv('DB_HOST'),
-            database=os.getenv('DB_NAME'),
-            user=os.getenv('DB_USER'),
-            password=os.getenv('DB_PASS')
-        )
-        return conn
+        return db.obtener_conexion()
     except mysql.connector.Error as e:
         print(f"Error al conectar a la base de datos MySQL: {e}")
         return None
 
+@app.before_request
+def verificar_esquema():
+    """Crea las tablas/columnas auxiliares la primera vez (no-op en el resto de peticiones)."""
+    esquema.asegurar_esquema()
+
 # --- Rutas de la API ---
 
 @app.route('/')
@@ -65,7 +111,8 @@ def get_puesto_detail(puesto_id):
         with conn.cursor(dictionary=True) as cur:
             sql = """
                 SELECT PUESTO, DESCRIPCION_CORTA, DESCRIPCION_LARGA, MISION, COMPETENCIAS,
-                       POND_FORMACION, POND_EXPERIENCIA, POND_SOFT_SKILL, POND_HARD_SKILL
+                       POND_FORMACION, POND_EXPERIENCIA, POND_SOFT_SKILL, POND_HARD_SKILL, MODO_EVALUACION,
+                       PRESELECCION_TOP_K, PRESELECCION_UMBRAL
                 FROM PUESTOS_PREDEFINIDOS 
                 WHERE PUESTO = %s;
             """
@@ -86,15 +133,42 @@ def get_puesto_detail(puesto_id):
         if conn and conn.is_connected():
             conn.close()
 
+def leer_preseleccion(data):
+    """
+    Valida la preselección opcional del puesto. Devuelve (top_k, umbral, error);
+    None en un valor significa que se usa el valor por defecto.
+    """
+    top_k, umbral = data.get('preseleccion_top_k'), data.get('preseleccion_umbral')
+    try:
+        top_k = None if top_k is None else int(top_k)
+        umbral = None if umbral is None else float(umbral)
+    except (TypeError, ValueError):
+        return None, None, "La preselección debe ser numérica."
+    if top_k is not None and top_k < 0:
+        return None, None, "preseleccion_top_k no puede ser negativo (0 = sin límite)."
+    if umbral is not None and not 0 <= umbral <= 1:
+        return None, None, "preseleccion_umbral debe estar entre 0 y 1 (0 = sin umbral)."
+    return top_k, umbral, None
+
 @app.route('/api/puestos', methods=['POST'])
-async def create_puesto():
-    """Crea un nuevo puesto en la base de datos, incluyendo ponderaciones."""
+def create_puesto():
+    """
+    Crea un nuevo puesto en la base de datos, incluyendo ponderaciones, y encola
+    su evaluación. Devuelve 202 con el identificador del trabajo.
+    """
     data = request.get_json()
     
     required_fields = ['puesto', 'descripcion_corta', 'descripcion_larga', 'mision', 'competencias']
     if not all(field in data for field in required_fields):
         return jsonify({"error": "Faltan datos en la petición"}), 400
 
+    modo_evaluacion = data.get('modo_evaluacion', utils.MODO_EVALUACION_INDIVIDUAL)
+    if modo_evaluacion not in utils.MODOS_EVALUACION:
+        return jsonify({"error": f"Modo de evaluación no válido. Valores admitidos: {', '.join(utils.MODOS_EVALUACION)}"}), 400
+    top_k, umbral, error = leer_preseleccion(data)
+    if error:
+        return jsonify({"error": error}), 400
+
     competencias_json = json.dumps(data['competencias'])
 
     conn = get_db_connection()
@@ -104,8 +178,9 @@ async def create_puesto():
                 sql = """
                     INSERT INTO PUESTOS_PREDEFINIDOS 
                     (PUESTO, DESCRIPCION_CORTA, DESCRIPCION_LARGA, MISION, COMPETENCIAS,
-                     POND_FORMACION, POND_EXPERIENCIA, POND_SOFT_SKILL, POND_HARD_SKILL) 
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s);
+                     POND_FORMACION, POND_EXPERIENCIA, POND_SOFT_SKILL, POND_HARD_SKILL, MODO_EVALUACION,
+                     PRESELECCION_TOP_K, PRESELECCION_UMBRAL) 
+                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s);
                 """
                 cur.execute(sql, (
                     data['puesto'],
@@ -116,11 +191,21 @@ async def create_puesto():
                     data.get('pond_formacion', 0.25),
                     data.get('pond_experiencia', 0.25),
                     data.get('pond_soft_skill', 0.25),
-                    data.get('pond_hard_skill', 0.25)
+                    data.get('pond_hard_skill', 0.25),
+                    modo_evaluacion,
+                    top_k,
+                    umbral
                 ))
                 conn.commit()
-                await utils.orquestador_evaluar_puesto_nuevo_optimizado(data['puesto'])
-            return jsonify({"mensaje": "Puesto creado con éxito"}), 201
+            utils.CACHE_RANKING.invalidar(data['puesto'])
+            # ?lote=K evalúa K candidatos por llamada al LLM (modo lote, opcional)
+            parametros = {"lote_llm": request.args.get('lote', type=int)} if request.args.get('lote') else {}
+            job_id = cola_trabajos.encolar('evaluar', data['puesto'], parametros)
+            return jsonify({
+                "mensaje": "Puesto creado con éxito. La evaluación de candidatos se está ejecutando en segundo plano.",
+                "job_id": job_id,
+                "estado_url": f"/api/jobs/{job_id}"
+            }), 202
         except mysql.connector.Error as e:
             print(f"Error al insertar en la base de datos: {e}")
             conn.rollback()
@@ -131,14 +216,26 @@ async def create_puesto():
     return jsonify({"error": "No se pudo conectar a la base de datos"}), 500
 
 @app.route('/api/puesto/<path:puesto_id>', methods=['PUT'])
-async def update_puesto(puesto_id):
-    """Actualiza un puesto predefinido existente."""
+def update_puesto(puesto_id):
+    """
+    Actualiza un puesto predefinido existente y encola su re-evaluación.
+    Devuelve 202 con el identificador del trabajo.
+    """
     data = request.get_json()
     
     required_fields = ['puesto', 'descripcion_corta', 'descripcion_larga', 'mision', 'competencias']
     if not all(field in data for field in required_fields):
         return jsonify({"error": "Faltan datos en la petición"}), 400
 
+    # Si no se indica, se conserva el modo de evaluación actual del puesto.
+    modo_evaluacion = data.get('modo_evaluacion')
+    if modo_evaluacion is not None and modo_evaluacion not in utils.MODOS_EVALUACION:
+        return jsonify({"error": f"Modo de evaluación no válido. Valores admitidos: {', '.join(utils.MODOS_EVALUACION)}"}), 400
+    # Igual con la preselección: solo se cambia si viene en la petición (0 la desactiva).
+    top_k, umbral, error = leer_preseleccion(data)
+    if error:
+        return jsonify({"error": error}), 400
+
     competencias_json = json.dumps(data['competencias'])
 
     conn = get_db_connection()
@@ -153,7 +250,10 @@ async def update_puesto(puesto_id):
                 DESCRIPCION_CORTA = %s,
                 DESCRIPCION_LARGA = %s,
                 MISION = %s,
-                COMPETENCIAS = %s
+                COMPETENCIAS = %s,
+                MODO_EVALUACION = COALESCE(%s, MODO_EVALUACION),
+                PRESELECCION_TOP_K = COALESCE(%s, PRESELECCION_TOP_K),
+                PRESELECCION_UMBRAL = COALESCE(%s, PRESELECCION_UMBRAL)
                 WHERE PUESTO = %s;
             """
             cur.execute(sql, (
@@ -162,13 +262,27 @@ async def update_puesto(puesto_id):
                 data['descripcion_larga'],
                 data['mision'],
                 competencias_json,
+                modo_evaluacion,
+                top_k,
+                umbral,
                 puesto_id
             ))
             conn.commit()
             if cur.rowcount == 0:
                 return jsonify({"error": "Puesto no encontrado para actualizar"}), 404
-        await utils.orquestador_reevaluar_puesto_modificado(data['puesto'])
-        return jsonify({"mensaje": "Puesto actualizado con éxito"}), 200
+        # Si el puesto se ha renombrado, lo cacheado con el nombre anterior ya no vale.
+        utils.invalidar_caches_lectura(puesto_id)
+        utils.invalidar_caches_lectura(data['puesto'])
+        # ?forzar=1 ignora huellas y caché de respuestas y re-evalúa todo el puesto
+        parametros = {"forzar": True} if request.args.get('forzar') == '1' else {}
+        if request.args.get('lote'):
+            parametros["lote_llm"] = request.args.get('lote', type=int)
+        job_id = cola_trabajos.encolar('reevaluar', data['puesto'], parametros)
+        return jsonify({
+            "mensaje": "Puesto actualizado con éxito. La re-evaluación se está ejecutando en segundo plano.",
+            "job_id": job_id,
+            "estado_url": f"/api/jobs/{job_id}"
+        }), 202
     except mysql.connector.Error as e:
         print(f"Error al actualizar el puesto: {e}")
         conn.rollback()
@@ -206,9 +320,14 @@ def update_ponderaciones(puesto_id):
                 data['pond_hard_skill'],
                 puesto_id
             ))
-            conn.commit()
             if cur.rowcount == 0:
+                conn.rollback()
                 return jsonify({"error": "Puesto no encontrado"}), 404
+            # La puntuación ponderada guardada se recalcula en la misma transacción.
+            utils.actualizar_puntuacion_ponderada(cur, puesto_id)
+            conn.commit()
+        # La puntuación cambia en el ranking y en los informes de todos los candidatos del puesto.
+        utils.invalidar_caches_lectura(puesto_id)
         return jsonify({"mensaje": "Ponderaciones actualizadas con éxito"}), 200
     except mysql.connector.Error as e:
         print(f"Error al actualizar ponderaciones: {e}")
@@ -249,50 +368,145 @@ def update_vacante_status(puesto_id):
             conn.close()
 
 
+def codificar_cursor(score, id_candidato) -> str:
+    """Cursor opaco de la paginación del ranking: última (puntuación, ID_CANDIDATO) devuelta."""
+    contenido = json.dumps({"s": None if score is None else str(score), "id": id_candidato})
+    return base64.urlsafe_b64encode(contenido.encode('utf-8')).decode('ascii')
+
+def decodificar_cursor(cursor: str):
+    """Devuelve (puntuación, ID_CANDIDATO) del cursor. Lanza ValueError si no es válido."""
+    try:
+        contenido = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        score = None if contenido["s"] is None else Decimal(contenido["s"])
+        return score, int(contenido["id"])
+    except (KeyError, TypeError, InvalidOperation, UnicodeError, ValueError) as e:
+        raise ValueError(f"Cursor no válido: {e}")
+
+def respuesta_con_etag(cuerpo: str, etag: str):
+    """Respuesta JSON con ETag; 304 sin cuerpo si coincide con el If-None-Match de la petición."""
+    respuesta = Response(cuerpo, mimetype='application/json')
+    respuesta.set_etag(etag)
+    # El navegador puede guardarla, pero debe revalidarla en cada uso.
+    respuesta.headers['Cache-Control'] = 'private, no-cache'
+    return respuesta.make_conditional(request)
+
 @app.route('/api/vacante/<path:puesto_id>/candidatos', methods=['GET'])
 def get_vacante_candidatos(puesto_id):
     """
-    Recupera la lista de candidatos para una vacante, calculando
-    la puntuación final en base a las ponderaciones del puesto.
+    Recupera el ranking de candidatos de una vacante, ordenado por la puntuación
+    ponderada guardada (SCORING.SCORE_PONDERADO) y después por ID_CANDIDATO, ambos
+    descendentes; los candidatos sin puntuación van al final.
+
+    Parámetros opcionales:
+        limit: tamaño de página (top-K). Con `limit` o `cursor` la respuesta es
+               {"candidatos": [...], "siguiente_cursor": ...}; sin ellos, la lista completa.
+        cursor: `siguiente_cursor` de la página anterior (paginación por clave).
+        apto: 1 (solo aptos) o 0 (el resto).
+        ciudad: ciudad de residencia exacta.
+        score_min, score_max: rango de puntuación (excluye a los no puntuados).
+
+    La respuesta se cachea por puesto y parámetros (utils.CACHE_RANKING) y lleva un
+    ETag: si el navegador lo envía en If-None-Match y no ha cambiado, se responde 304.
     """
+    paginado = 'limit' in request.args or 'cursor' in request.args
+    limite = request.args.get('limit', type=int)
+    if paginado and (limite is None or limite < 1):
+        limite = 50
+    try:
+        score_cursor, id_cursor = decodificar_cursor(request.args['cursor']) if request.args.get('cursor') else (None, None)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    filtros, valores = [], []
+    apto = request.args.get('apto')
+    if apto == '1':
+        filtros.append("s.APTO = 1")
+    elif apto == '0':
+        filtros.append("(s.APTO IS NULL OR s.APTO <> 1)")
+    elif apto is not None:
+        return jsonify({"error": "apto debe ser 1 o 0"}), 400
+    if request.args.get('ciudad'):
+        filtros.append("c.ciudad_residencia = %s")
+        valores.append(request.args['ciudad'])
+    score_min = request.args.get('score_min', type=float)
+    score_max = request.args.get('score_max', type=float)
+    if score_min is not None:
+        filtros.append("s.SCORE_PONDERADO >= %s")
+        valores.append(score_min)
+    if score_max is not None:
+        filtros.append("s.SCORE_PONDERADO <= %s")
+        valores.append(score_max)
+    incluir_sin_puntuacion = score_min is None and score_max is None
+
+    clave_cache = urlencode(sorted(request.args.items(multi=True)))
+    cacheado = utils.CACHE_RANKING.obtener(puesto_id, clave_cache)
+    if cacheado:
+        return respuesta_con_etag(*cacheado)
+    # Se lee antes de consultar: si hay una escritura mientras tanto, el resultado no se cachea.
+    generacion = utils.CACHE_RANKING.generacion(puesto_id)
+
     conn = get_db_connection()
     if not conn:
         return jsonify({"error": "No se pudo conectar a la base de datos"}), 500
     
     try:
         with conn.cursor(dictionary=True) as cur:
-            sql_scoring = """
-                SELECT 
-                    s.ID_CANDIDATO, 
-                    c.nombre_completo, 
-                    c.ciudad_residencia,
-                    s.APTO,
-                    (
-                        pp.POND_FORMACION * (s.SCORE_FORMACION * 10) +
-                        pp.POND_EXPERIENCIA * (s.SCORE_EXPERIENCIA * 10) +
-                        pp.POND_SOFT_SKILL * (s.SCORE_SOFT_SKILL * 10) +
-                        pp.POND_HARD_SKILL * (s.SCORE_HARD_SKILL * 10)
-                    ) AS calculated_score
+            sql_base = f"""
+                SELECT s.ID_CANDIDATO, c.nombre_completo, c.ciudad_residencia, s.APTO,
+                       s.ESTADO_EVALUACION, s.SCORE_PONDERADO
                 FROM SCORING s
                 JOIN CANDIDATOS c ON s.ID_CANDIDATO = c.ID_CANDIDATO
-                JOIN PUESTOS_PREDEFINIDOS pp ON s.PUESTO = pp.PUESTO
-                WHERE s.PUESTO = %s
-                ORDER BY calculated_score DESC;
+                WHERE s.PUESTO = %s {''.join(f' AND {filtro}' for filtro in filtros)}
             """
-            cur.execute(sql_scoring, (puesto_id,))
-            candidatos = cur.fetchall()
+            # Se pide una fila de más para saber si hay página siguiente.
+            restantes = limite + 1 if paginado else None
+            candidatos = []
+            # 1. Candidatos puntuados, en el orden del índice (PUESTO, SCORE_PONDERADO, ID_CANDIDATO).
+            if score_cursor is not None or id_cursor is None:
+                sql = sql_base + " AND s.SCORE_PONDERADO IS NOT NULL"
+                parametros = [puesto_id, *valores]
+                if score_cursor is not None:
+                    # Expandido (en lugar de una comparación de tuplas) para que MySQL use rangos del índice.
+                    sql += " AND (s.SCORE_PONDERADO < %s OR (s.SCORE_PONDERADO = %s AND s.ID_CANDIDATO < %s))"
+                    parametros += [score_cursor, score_cursor, id_cursor]
+                sql += " ORDER BY s.SCORE_PONDERADO DESC, s.ID_CANDIDATO DESC"
+                if restantes:
+                    sql += f" LIMIT {restantes}"
+                cur.execute(sql, parametros)
+                candidatos = cur.fetchall()
+            # 2. Candidatos sin puntuación (fallidos, no preseleccionados...), al final.
+            if incluir_sin_puntuacion and (not restantes or len(candidatos) < restantes):
+                sql = sql_base + " AND s.SCORE_PONDERADO IS NULL"
+                parametros = [puesto_id, *valores]
+                if score_cursor is None and id_cursor is not None:
+                    sql += " AND s.ID_CANDIDATO < %s"
+                    parametros.append(id_cursor)
+                sql += " ORDER BY s.ID_CANDIDATO DESC"
+                if restantes:
+                    sql += f" LIMIT {restantes - len(candidatos)}"
+                cur.execute(sql, parametros)
+                candidatos += cur.fetchall()
+
+            siguiente_cursor = None
+            if paginado and len(candidatos) > limite:
+                candidatos = candidatos[:limite]
+                siguiente_cursor = codificar_cursor(candidatos[-1]["SCORE_PONDERADO"], candidatos[-1]["ID_CANDIDATO"])
 
             ranked_candidatos = [
                 {
                     "id": cand["ID_CANDIDATO"],
                     "nombreCompleto": cand["nombre_completo"],
                     "localidad": cand["ciudad_residencia"],
-                    "score": round(cand["calculated_score"]) if cand["calculated_score"] is not None else 0,
-                    "apto": cand["APTO"]
+                    "score": round(cand["SCORE_PONDERADO"]) if cand["SCORE_PONDERADO"] is not None else None,
+                    "apto": cand["APTO"],
+                    "estado": cand["ESTADO_EVALUACION"]
                 }
                 for cand in candidatos
             ]
-            return jsonify(ranked_candidatos)
+            respuesta = {"candidatos": ranked_candidatos, "siguiente_cursor": siguiente_cursor} if paginado else ranked_candidatos
+            cuerpo = json.dumps(respuesta)
+            etag = utils.CACHE_RANKING.guardar(puesto_id, clave_cache, cuerpo, generacion)
+            return respuesta_con_etag(cuerpo, etag)
 
     except mysql.connector.Error as e:
         print(f"Error al ejecutar la consulta de candidatos: {e}")
@@ -310,140 +524,177 @@ def parse_json_field(data):
     except (json.JSONDecodeError, TypeError):
         return []
 
+# Una sola consulta por informe (o por lote de informes): los datos de SCORING, las
+# ponderaciones y las observaciones van por JOIN y las skills como arrays JSON agregados.
+SQL_INFORMES = """
+    SELECT
+        c.ID_CANDIDATO, c.nombre_completo, c.correo_electronico, c.numero_telefono,
+        c.fecha_de_nacimiento, c.ciudad_residencia, c.enlace_perfil,
+        c.Otros, c.REF_INTERNAS, c.REF_EXTERNAS,
+        s.ID_CANDIDATO AS ID_SCORING, s.Justificacion, s.JUSTIFICACIONES, s.PREGUNTAS_TECNICAS, s.PREGUNTAS_RRHH,
+        s.PREGUNTAS_MANAGER, s.APTO, s.SCORE_FORMACION, s.SCORE_EXPERIENCIA, s.SCORE_SOFT_SKILL, s.SCORE_HARD_SKILL,
+        pp.PUESTO AS PUESTO_PONDERACIONES, pp.POND_FORMACION, pp.POND_EXPERIENCIA, pp.POND_SOFT_SKILL, pp.POND_HARD_SKILL,
+        o.VAL_PERFIL, o.OBSERVACIONES,
+        (SELECT JSON_ARRAYAGG(JSON_OBJECT('VALORACION', vhs.VALORACION, 'HARD_SKILL', chs.HARD_SKILL, 'ID_HARD_SKILL', chs.ID_HARD_SKILL))
+         FROM VALORACION_HARD_SKILL vhs
+         JOIN CAT_HARD_SKILL chs ON vhs.ID_HARD_SKILL = chs.ID_HARD_SKILL AND vhs.PUESTO = chs.PUESTO
+         WHERE vhs.ID_CANDIDATO = c.ID_CANDIDATO AND vhs.PUESTO = %s AND vhs.MARCA_IA = 0) AS HARD_SKILLS,
+        (SELECT JSON_ARRAYAGG(JSON_OBJECT('VALORACION', vss.VALORACION, 'SOFT_SKILL', css.SOFT_SKILL, 'ID_SOFT_SKILL', css.ID_SOFT_SKILL))
+         FROM VALORACION_SOFT_SKILL vss
+         JOIN CAT_SOFT_SKILL css ON vss.ID_SOFT_SKILL = css.ID_SOFT_SKILL
+         WHERE vss.ID_CANDIDATO = c.ID_CANDIDATO AND vss.MARCA_IA = 0) AS SOFT_SKILLS
+    FROM CANDIDATOS c
+    LEFT JOIN SCORING s ON s.ID_CANDIDATO = c.ID_CANDIDATO AND s.PUESTO = %s
+    LEFT JOIN PUESTOS_PREDEFINIDOS pp ON pp.PUESTO = %s
+    LEFT JOIN CANDIDATO_PUESTO_OTROS o ON o.ID_CANDIDATO = c.ID_CANDIDATO AND o.PUESTO = %s
+    WHERE c.ID_CANDIDATO IN ({placeholders});
+"""
+
+# Máximo de informes por petición del endpoint de lotes.
+MAX_INFORMES_LOTE = 500
+
+def parse_json_agregado(data):
+    """Parsea un array JSON agregado por MySQL (str o bytes según el conector); [] si es NULL."""
+    if isinstance(data, (bytes, bytearray)):
+        data = data.decode('utf-8')
+    return parse_json_field(data) or []
+
+def construir_informe(fila: dict) -> dict:
+    """Construye el informe de un candidato a partir de su fila de SQL_INFORMES."""
+    report = {}
+    if fila['ID_SCORING'] is not None:
+        # Recalcular el score total para asegurar consistencia
+        total_score = 0
+        if fila['PUESTO_PONDERACIONES'] is not None:
+            total_score = (
+                (float(fila['POND_FORMACION'] or 0) * (float(fila['SCORE_FORMACION'] or 0) * 10)) +
+                (float(fila['POND_EXPERIENCIA'] or 0) * (float(fila['SCORE_EXPERIENCIA'] or 0) * 10)) +
+                (float(fila['POND_SOFT_SKILL'] or 0) * (float(fila['SCORE_SOFT_SKILL'] or 0) * 10)) +
+                (float(fila['POND_HARD_SKILL'] or 0) * (float(fila['SCORE_HARD_SKILL'] or 0) * 10))
+            )
+        report['score'] = round(total_score)
+        report['apto'] = fila['APTO']
+        report['score_formacion'] = float(fila['SCORE_FORMACION'] or 0)
+        report['score_experiencia'] = float(fila['SCORE_EXPERIENCIA'] or 0)
+        report['score_soft_skill'] = float(fila['SCORE_SOFT_SKILL'] or 0)
+        report['score_hard_skill'] = float(fila['SCORE_HARD_SKILL'] or 0)
+    else:
+        report.update({'score': None, 'apto': None, 'score_formacion': 0, 'score_experiencia': 0, 'score_soft_skill': 0, 'score_hard_skill': 0})
+
+    # Justificación y razonamiento por evaluador, guardados ya estructurados al evaluar. Las
+    # filas aún sin migrar (migrar_justificaciones.py) se separan del texto consolidado.
+    if fila['JUSTIFICACIONES'] is not None:
+        report['justificacion'] = parse_json_field(fila['JUSTIFICACIONES'])
+    else:
+        report['justificacion'] = utils.parsear_justificacion_consolidada(fila['Justificacion'])
+
+    report['preguntas_entrevista'] = {
+        'tecnicas': parse_json_field(fila['PREGUNTAS_TECNICAS']),
+        'rrhh': parse_json_field(fila['PREGUNTAS_RRHH']),
+        'manager': parse_json_field(fila['PREGUNTAS_MANAGER'])
+    }
+
+    report['nombre'] = fila['nombre_completo']
+    report['email'] = fila['correo_electronico']
+    report['telefono'] = fila['numero_telefono']
+    report['fecha_nacimiento'] = str(fila['fecha_de_nacimiento']) if fila['fecha_de_nacimiento'] else None
+    report['ciudad'] = fila['ciudad_residencia']
+    report['linkedin'] = fila['enlace_perfil']
+    report['ref_internas'] = fila['REF_INTERNAS']
+    report['ref_externas'] = fila['REF_EXTERNAS']
+
+    otros_json = {}
+    if fila['Otros']:
+        try:
+            otros_json = json.loads(fila['Otros'])
+        except (json.JSONDecodeError, TypeError):
+            print(f"Advertencia: El campo 'Otros' para el candidato {fila['ID_CANDIDATO']} no es un JSON válido.")
+    report['formacion'] = otros_json.get('formacion', [])
+    report['miscelanea_formacion'] = otros_json.get('miscelanea', '')
+    report['trayectoria_profesional'] = otros_json.get('trayectoria_profesional', [])
+    report['idiomas'] = otros_json.get('idiomas', [])
+
+    report['hard_skills'] = parse_json_agregado(fila['HARD_SKILLS'])
+    report['soft_skills'] = parse_json_agregado(fila['SOFT_SKILLS'])
+    report['valoracion_perfil'] = fila['VAL_PERFIL'] if fila['VAL_PERFIL'] is not None else ''
+    report['observaciones'] = fila['OBSERVACIONES'] if fila['OBSERVACIONES'] is not None else ''
+    return report
+
+def obtener_informes(ids_candidatos: list, puesto_id: str) -> dict:
+    """
+    Devuelve {id_candidato: (cuerpo_json, etag)} de los informes pedidos. Los que no están
+    en utils.CACHE_INFORMES se construyen con una sola consulta y se cachean. Los
+    candidatos inexistentes no aparecen en el resultado. Lanza mysql.connector.Error.
+    """
+    informes = {}
+    pendientes = []
+    for id_candidato in ids_candidatos:
+        cacheado = utils.CACHE_INFORMES.obtener(str(id_candidato), puesto_id)
+        if cacheado:
+            informes[id_candidato] = cacheado
+        else:
+            pendientes.append(id_candidato)
+    if not pendientes:
+        return informes
+
+    # Se leen antes de consultar: si hay una escritura mientras tanto, el informe no se cachea.
+    generaciones = {id_candidato: utils.CACHE_INFORMES.generacion(str(id_candidato)) for id_candidato in pendientes}
+    conn = db.obtener_conexion()
+    try:
+        with conn.cursor(dictionary=True) as cur:
+            sql = SQL_INFORMES.format(placeholders=', '.join(['%s'] * len(pendientes)))
+            cur.execute(sql, (puesto_id, puesto_id, puesto_id, puesto_id, *pendientes))
+            for fila in cur.fetchall():
+                id_candidato = fila['ID_CANDIDATO']
+                cuerpo = json.dumps(construir_informe(fila), default=str)
+                etag = utils.CACHE_INFORMES.guardar(str(id_candidato), puesto_id, cuerpo, generaciones[id_candidato])
+                informes[id_candidato] = (cuerpo, etag)
+    finally:
+        if conn and conn.is_connected():
+            conn.close()
+    return informes
+
 @app.route('/api/candidato/<int:candidato_id>/reporte/<path:puesto_id>', methods=['GET'])
 def get_candidato_report(candidato_id, puesto_id):
     """
     Recupera el informe detallado de un candidato para un puesto específico.
+    Se cachea por (candidato, puesto) y se sirve con ETag (304 si no ha cambiado).
     """
-    conn = get_db_connection()
-    if not conn:
-        return jsonify({"error": "No se pudo conectar a la base de datos"}), 500
-        
     try:
-        report = {}
-        # MODIFICACIÓN: Se usa un cursor con buffer para evitar errores de 'Unread result'.
-        with conn.cursor(dictionary=True, buffered=True) as cur:
-            # 0. Obtener scores, justificación, preguntas y si es APTO
-            sql_score = """
-                SELECT SCORE, Justificacion, PREGUNTAS_TECNICAS, PREGUNTAS_RRHH, PREGUNTAS_MANAGER, APTO,
-                       SCORE_FORMACION, SCORE_EXPERIENCIA, SCORE_SOFT_SKILL, SCORE_HARD_SKILL
-                FROM SCORING 
-                WHERE ID_CANDIDATO = %s AND PUESTO = %s;
-            """
-            cur.execute(sql_score, (candidato_id, puesto_id))
-            score_data = cur.fetchone()
-
-            if score_data:
-                # Recalcular el score total para asegurar consistencia
-                sql_pond = "SELECT POND_FORMACION, POND_EXPERIENCIA, POND_SOFT_SKILL, POND_HARD_SKILL FROM PUESTOS_PREDEFINIDOS WHERE PUESTO = %s;"
-                cur.execute(sql_pond, (puesto_id,))
-                pond_data = cur.fetchone()
-                
-                total_score = 0
-                if pond_data:
-                    total_score = (
-                        (float(pond_data.get('POND_FORMACION', 0) or 0) * (float(score_data.get('SCORE_FORMACION', 0) or 0) * 10)) +
-                        (float(pond_data.get('POND_EXPERIENCIA', 0) or 0) * (float(score_data.get('SCORE_EXPERIENCIA', 0) or 0) * 10)) +
-                        (float(pond_data.get('POND_SOFT_SKILL', 0) or 0) * (float(score_data.get('SCORE_SOFT_SKILL', 0) or 0) * 10)) +
-                        (float(pond_data.get('POND_HARD_SKILL', 0) or 0) * (float(score_data.get('SCORE_HARD_SKILL', 0) or 0) * 10))
-                    )
-                
-                report['score'] = round(total_score)
-                report['apto'] = score_data['APTO']
-                report['score_formacion'] = float(score_data.get('SCORE_FORMACION', 0) or 0)
-                report['score_experiencia'] = float(score_data.get('SCORE_EXPERIENCIA', 0) or 0)
-                report['score_soft_skill'] = float(score_data.get('SCORE_SOFT_SKILL', 0) or 0)
-                report['score_hard_skill'] = float(score_data.get('SCORE_HARD_SKILL', 0) or 0)
-            else:
-                 report.update({ 'score': None, 'apto': None, 'score_formacion': 0, 'score_experiencia': 0, 'score_soft_skill': 0, 'score_hard_skill': 0})
-
-            justificaciones = []
-            if score_data and score_data.get('Justificacion') and isinstance(score_data['Justificacion'], str):
-                justificacion_str = score_data['Justificacion']
-                matches = re.findall(r'-\s*(.*?):\s*(.*?)(?=\s*-\s*[^:]+:|$)', justificacion_str, re.DOTALL)
-                for match in matches:
-                    evaluador = match[0].strip()
-                    texto = match[1].strip()
-                    if evaluador and texto:
-                        justificaciones.append({'evaluador': evaluador, 'texto': texto})
-            
-            report['justificacion'] = justificaciones
-            
-            report['preguntas_entrevista'] = {
-                'tecnicas': parse_json_field(score_data.get('PREGUNTAS_TECNICAS')) if score_data else [],
-                'rrhh': parse_json_field(score_data.get('PREGUNTAS_RRHH')) if score_data else [],
-                'manager': parse_json_field(score_data.get('PREGUNTAS_MANAGER')) if score_data else []
-            }
-
-            # 1. Obtener datos personales del candidato (incluyendo referencias)
-            sql_personal = """
-                SELECT 
-                    nombre_completo, correo_electronico, numero_telefono,
-                    fecha_de_nacimiento, ciudad_residencia, enlace_perfil,
-                    Otros, REF_INTERNAS, REF_EXTERNAS
-                FROM CANDIDATOS WHERE ID_CANDIDATO = %s;
-            """
-            cur.execute(sql_personal, (candidato_id,))
-            personal_data = cur.fetchone()
-            if not personal_data:
-                return jsonify({"error": "Candidato no encontrado"}), 404
-            
-            report['nombre'] = personal_data['nombre_completo']
-            report['email'] = personal_data['correo_electronico']
-            report['telefono'] = personal_data['numero_telefono']
-            report['fecha_nacimiento'] = str(personal_data['fecha_de_nacimiento']) if personal_data.get('fecha_de_nacimiento') else None
-            report['ciudad'] = personal_data['ciudad_residencia']
-            report['linkedin'] = personal_data['enlace_perfil']
-            report['ref_internas'] = personal_data['REF_INTERNAS']
-            report['ref_externas'] = personal_data['REF_EXTERNAS']
-
-            otros_json = {}
-            if personal_data.get('Otros'):
-                try:
-                    otros_json = json.loads(personal_data['Otros'])
-                except (json.JSONDecodeError, TypeError):
-                    print(f"Advertencia: El campo 'Otros' para el candidato {candidato_id} no es un JSON válido.")
-
-            report['formacion'] = otros_json.get('formacion', [])
-            report['miscelanea_formacion'] = otros_json.get('miscelanea', '')
-            report['trayectoria_profesional'] = otros_json.get('trayectoria_profesional', [])
-            report['idiomas'] = otros_json.get('idiomas', [])
-
-            # 2. Obtener Hard Skills
-            sql_hard = """
-                SELECT vhs.VALORACION, chs.HARD_SKILL, chs.ID_HARD_SKILL
-                FROM VALORACION_HARD_SKILL vhs
-                JOIN CAT_HARD_SKILL chs ON vhs.ID_HARD_SKILL = chs.ID_HARD_SKILL AND vhs.PUESTO = chs.PUESTO
-                WHERE vhs.ID_CANDIDATO = %s AND vhs.PUESTO = %s AND vhs.MARCA_IA = 0;
-            """
-            cur.execute(sql_hard, (candidato_id, puesto_id))
-            report['hard_skills'] = cur.fetchall()
-
-            # 3. Obtener Soft Skills
-            sql_soft = """
-                SELECT vss.VALORACION, css.SOFT_SKILL, css.ID_SOFT_SKILL
-                FROM VALORACION_SOFT_SKILL vss
-                JOIN CAT_SOFT_SKILL css ON vss.ID_SOFT_SKILL = css.ID_SOFT_SKILL
-                WHERE vss.ID_CANDIDATO = %s AND vss.MARCA_IA = 0;
-            """
-            cur.execute(sql_soft, (candidato_id,))
-            report['soft_skills'] = cur.fetchall()
-
-            # 4. Obtener Valoración de Perfil y Observaciones
-            sql_otros = "SELECT VAL_PERFIL, OBSERVACIONES FROM CANDIDATO_PUESTO_OTROS WHERE ID_CANDIDATO = %s AND PUESTO = %s;"
-            cur.execute(sql_otros, (candidato_id, puesto_id))
-            otros_data = cur.fetchone()
-            report['valoracion_perfil'] = otros_data['VAL_PERFIL'] if otros_data else ''
-            report['observaciones'] = otros_data['OBSERVACIONES'] if otros_data else ''
-
-        return jsonify(report)
-        
+        informe = obtener_informes([candidato_id], puesto_id).get(candidato_id)
     except mysql.connector.Error as e:
         print(f"Error al construir el informe del candidato: {e}")
         return jsonify({"error": "Error interno del servidor"}), 500
-    finally:
-        if conn and conn.is_connected():
-            conn.close()
+    if not informe:
+        return jsonify({"error": "Candidato no encontrado"}), 404
+    return respuesta_con_etag(*informe)
+
+@app.route('/api/reportes/<path:puesto_id>', methods=['POST'])
+def get_candidatos_reports(puesto_id):
+    """
+    Devuelve los informes de varios candidatos para un puesto (exportaciones, sesiones
+    de revisión). Cuerpo: {"ids": [id_candidato, ...]}, como mucho MAX_INFORMES_LOTE.
+
+    Returns:
+        {"informes": {id_candidato: informe}, "no_encontrados": [id_candidato, ...]}
+    """
+    data = request.get_json(silent=True) or {}
+    ids = data.get('ids')
+    if not isinstance(ids, list) or not ids or not all(isinstance(id_candidato, int) for id_candidato in ids):
+        return jsonify({"error": "'ids' debe ser una lista no vacía de identificadores de candidato"}), 400
+    if len(ids) > MAX_INFORMES_LOTE:
+        return jsonify({"error": f"Como mucho {MAX_INFORMES_LOTE} informes por petición"}), 400
+    ids = list(dict.fromkeys(ids))
+
+    try:
+        informes = obtener_informes(ids, puesto_id)
+    except mysql.connector.Error as e:
+        print(f"Error al construir los informes de los candidatos: {e}")
+        return jsonify({"error": "Error interno del servidor"}), 500
+    return jsonify({
+        "informes": {str(id_candidato): json.loads(informes[id_candidato][0]) for id_candidato in ids if id_candidato in informes},
+        "no_encontrados": [id_candidato for id_candidato in ids if id_candidato not in informes]
+    })
 
 @app.route('/api/candidatos/count', methods=['GET'])
 def get_candidatos_count():
@@ -464,6 +715,31 @@ def get_candidatos_count():
         if conn and conn.is_connected():
             conn.close()
 
+@app.route('/api/candidatos/search', methods=['GET'])
+def search_candidatos():
+    """
+    Busca candidatos por formación, trayectoria, idiomas o competencias en el índice
+    invertido. Parámetros: q (términos; 'OR', '-excluido' y 'campo:termino'),
+    modo ('ranking' por defecto o 'booleano'), limit y offset.
+    """
+    consulta = request.args.get('q', '').strip()
+    if not consulta:
+        return jsonify({"error": "Falta el parámetro 'q'"}), 400
+    modo = request.args.get('modo', indice_candidatos.MODO_RANKING)
+    if modo not in (indice_candidatos.MODO_RANKING, indice_candidatos.MODO_BOOLEANO):
+        return jsonify({"error": "modo debe ser 'ranking' o 'booleano'"}), 400
+    limite = min(max(request.args.get('limit', default=20, type=int), 1), 200)
+    desplazamiento = max(request.args.get('offset', default=0, type=int), 0)
+
+    try:
+        inicio = time.perf_counter()
+        resultado = indice_candidatos.buscar(consulta, modo, limite, desplazamiento)
+        resultado["duracion_ms"] = round((time.perf_counter() - inicio) * 1000, 2)
+        return jsonify(resultado)
+    except mysql.connector.Error as e:
+        print(f"Error al buscar candidatos: {e}")
+        return jsonify({"error": "Error interno del servidor"}), 500
+
 # --- NUEVAS RUTAS PARA GUARDAR DATOS DEL INFORME ---
 
 @app.route('/api/candidato/<int:candidato_id>/reporte/<path:puesto_id>', methods=['PUT'])
@@ -474,12 +750,15 @@ def save_candidato_report(candidato_id, puesto_id):
     if not conn:
         return jsonify({"error": "No se pudo conectar a la base de datos"}), 500
 
+    # Puestos cuyo ranking cacheado cambia con este informe.
+    puestos_afectados = set()
     try:
         with conn.cursor() as cur:
             # 1. Actualizar APTO en SCORING
             if 'apto' in data and data['apto'] != 'no_definido':
                 cur.execute("UPDATE SCORING SET APTO = %s WHERE ID_CANDIDATO = %s AND PUESTO = %s;",
                             (data['apto'], candidato_id, puesto_id))
+                puestos_afectados.add(puesto_id)
 
             # 2. Actualizar datos personales y JSON 'Otros' en CANDIDATOS
             if 'personal' in data:
@@ -502,6 +781,11 @@ def save_candidato_report(candidato_id, puesto_id):
                     personal.get('ref_internas'), personal.get('ref_externas'), otros_json,
                     candidato_id
                 ))
+                # El índice de búsqueda se actualiza en la misma transacción que el perfil.
+                indice_candidatos.actualizar_candidato(cur, candidato_id, json.loads(otros_json))
+                # El nombre y la ciudad aparecen en el ranking de todos los puestos del candidato.
+                cur.execute("SELECT DISTINCT PUESTO FROM SCORING WHERE ID_CANDIDATO = %s;", (candidato_id,))
+                puestos_afectados.update(fila[0] for fila in cur.fetchall())
             
             # 3. Actualizar/Insertar en CANDIDATO_PUESTO_OTROS
             if 'otros_puesto' in data:
@@ -529,6 +813,9 @@ def save_candidato_report(candidato_id, puesto_id):
                     """, (skill['VALORACION'], candidato_id, puesto_id, skill['ID_HARD_SKILL']))
 
             conn.commit()
+            for puesto in puestos_afectados:
+                utils.CACHE_RANKING.invalidar(puesto)
+            utils.CACHE_INFORMES.invalidar(str(candidato_id))
             return jsonify({"mensaje": "Informe guardado con éxito"}), 200
 
     except mysql.connector.Error as e:
@@ -539,6 +826,117 @@ def save_candidato_report(candidato_id, puesto_id):
         if conn and conn.is_connected():
             conn.close()
 
+@app.route('/api/db/pool', methods=['GET'])
+def get_db_pool_metrics():
+    """
+    Devuelve las métricas del pool de conexiones a la base de datos y del pool de
+    hilos por el que las evaluaciones acceden a ella (bd_async).
+    """
+    metricas = db.POOL.metricas()
+    metricas["ejecutor_async"] = bd_async.EJECUTOR.metricas()
+    return jsonify(metricas)
+
+@app.route('/api/cache-llm', methods=['GET'])
+def get_cache_llm_stats():
+    """Devuelve los contadores de la caché de respuestas del LLM."""
+    return jsonify(utils.CACHE_RESPUESTAS.estadisticas())
+
+@app.route('/api/cache-ranking', methods=['GET'])
+def get_cache_ranking_stats():
+    """Devuelve los contadores de la caché de rankings."""
+    return jsonify(utils.CACHE_RANKING.estadisticas())
+
+@app.route('/api/cache-informes', methods=['GET'])
+def get_cache_informes_stats():
+    """Devuelve los contadores de la caché de informes de candidatos."""
+    return jsonify(utils.CACHE_INFORMES.estadisticas())
+
+@app.route('/api/puesto/<path:puesto_id>/cache-llm', methods=['DELETE'])
+def invalidar_cache_llm_puesto(puesto_id):
+    """Invalida las respuestas cacheadas del LLM de un puesto."""
+    eliminadas = utils.CACHE_RESPUESTAS.invalidar_puesto(puesto_id)
+    return jsonify({"mensaje": f"{eliminadas} respuestas cacheadas eliminadas para '{puesto_id}'"}), 200
+
+# --- RUTAS DE EJECUCIONES DE EVALUACIÓN ---
+
+@app.route('/api/ejecuciones', methods=['GET'])
+def get_ejecuciones():
+    """Lista las ejecuciones de evaluación registradas (opcionalmente por puesto)."""
+    puesto = request.args.get('puesto')
+    limite = request.args.get('limit', default=50, type=int)
+    return jsonify(utils.listar_ejecuciones(puesto, limite))
+
+@app.route('/api/ejecuciones/<int:id_ejecucion>/reanudar', methods=['POST'])
+def reanudar_ejecucion(id_ejecucion):
+    """Encola la reanudación de una ejecución interrumpida. Devuelve 202 con el trabajo."""
+    ejecucion = utils.obtener_ejecucion(id_ejecucion, solo_incompletas=True)
+    if not ejecucion:
+        return jsonify({"error": "Ejecución no encontrada o ya completada"}), 404
+    job_id = cola_trabajos.encolar('reanudar', ejecucion['PUESTO'], {"id_ejecucion": id_ejecucion})
+    return jsonify({
+        "mensaje": f"Reanudando la ejecución {id_ejecucion} en segundo plano.",
+        "job_id": job_id,
+        "estado_url": f"/api/jobs/{job_id}"
+    }), 202
+
+@app.route('/api/candidato/<int:candidato_id>/reevaluar/<path:puesto_id>', methods=['POST'])
+def reevaluar_candidato(candidato_id, puesto_id):
+    """
+    Encola la re-evaluación de un solo candidato para un puesto, con prioridad
+    interactiva: adelanta a las evaluaciones masivas en curso. ?cache=1 reutiliza
+    las respuestas cacheadas del LLM. Devuelve 202 con el trabajo.
+    """
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({"error": "No se pudo conectar a la base de datos"}), 500
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT 1 FROM CANDIDATOS WHERE id_candidato = %s;", (candidato_id,))
+            candidato = cur.fetchone()
+            cur.execute("SELECT 1 FROM PUESTOS_PREDEFINIDOS WHERE PUESTO = %s;", (puesto_id,))
+            puesto = cur.fetchone()
+    except mysql.connector.Error as e:
+        print(f"Error al comprobar el candidato y el puesto: {e}")
+        return jsonify({"error": "Error interno del servidor"}), 500
+    finally:
+        if conn and conn.is_connected():
+            conn.close()
+    if not candidato or not puesto:
+        return jsonify({"error": "Candidato o puesto no encontrado"}), 404
+    job_id = cola_trabajos.encolar('reevaluar_candidato', puesto_id, {
+        "id_candidato": candidato_id, "usar_cache": request.args.get('cache') == '1'
+    })
+    return jsonify({
+        "mensaje": f"Re-evaluando al candidato {candidato_id} en segundo plano.",
+        "job_id": job_id,
+        "estado_url": f"/api/jobs/{job_id}"
+    }), 202
+
+@app.route('/api/servicio-evaluacion', methods=['GET'])
+def get_servicio_evaluacion_stats():
+    """Devuelve las ejecuciones en curso y el uso del presupuesto compartido del LLM."""
+    return jsonify(servicio_evaluacion.SERVICIO.estadisticas())
+
+# --- RUTAS DE TRABAJOS EN SEGUNDO PLANO ---
+
+@app.route('/api/jobs', methods=['GET'])
+def get_jobs():
+    """Lista los trabajos de evaluación más recientes (opcionalmente por puesto)."""
+    puesto = request.args.get('puesto')
+    limite = request.args.get('limit', default=50, type=int)
+    return jsonify(cola_trabajos.listar(puesto, limite))
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Devuelve el estado, el progreso y los errores de un trabajo de evaluación."""
+    trabajo = cola_trabajos.obtener(job_id)
+    if not trabajo:
+        return jsonify({"error": "Trabajo no encontrado"}), 404
+    return jsonify(trabajo)
+
 if __name__ == '__main__':
+    # Con el reloader de Flask, solo el proceso hijo arranca los workers.
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        cola_trabajos.iniciar()
     app.run(debug=True)
 
@@ -0,0 +1,290 @@
+import asyncio
+import datetime
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+from typing import Optional
+
+from dotenv import load_dotenv
+
+
+load_dotenv()
+# 'gemini' (por defecto), 'openai' (endpoint local compatible con la API de OpenAI) o 'falso'.
+TIPO_BACKEND_LLM = os.getenv('LLM_BACKEND', 'gemini')
+MODELO_GEMINI = os.getenv('GEMINI_MODEL', 'gemini-2.0-flash')
+URL_OPENAI_LOCAL = os.getenv('LLM_BASE_URL', 'http://localhost:11434/v1')
+MODELO_OPENAI_LOCAL = os.getenv('LLM_MODEL', 'llama3.1')
+# Caché de contexto explícita de Gemini para el prefijo común de los prompts
+# (instrucciones y requisitos del puesto). Solo compensa con prefijos largos: el
+# proveedor exige un mínimo de tokens y los que no llegan se envían concatenados.
+CACHE_CONTEXTO_GEMINI = os.getenv('LLM_CONTEXT_CACHE', '0') == '1'
+TTL_CACHE_CONTEXTO = int(os.getenv('LLM_CONTEXT_CACHE_TTL', '3600'))
+
+# Parámetros del backend falso: latencia (segundos) y tasas de error simuladas.
+LATENCIA_FALSA_MEDIANA = float(os.getenv('LLM_FAKE_LATENCY', '1.5'))
+LATENCIA_FALSA_SIGMA = float(os.getenv('LLM_FAKE_LATENCY_SIGMA', '0.4'))
+TASA_ERROR_FALSA = float(os.getenv('LLM_FAKE_ERROR_RATE', '0.0'))
+TASA_LIMITACION_FALSA = float(os.getenv('LLM_FAKE_RATE_LIMIT_RATE', '0.0'))
+TASA_JSON_INVALIDO_FALSA = float(os.getenv('LLM_FAKE_BAD_JSON_RATE', '0.0'))
+SEMILLA_FALSA = int(os.getenv('LLM_FAKE_SEED', '42'))
+# En prompts de varios candidatos: latencia extra por candidato adicional (fracción de
+# la de uno solo) y probabilidad de omitir la evaluación de un candidato.
+FACTOR_LATENCIA_LOTE_FALSA = float(os.getenv('LLM_FAKE_BATCH_LATENCY_FACTOR', '0.5'))
+TASA_OMISION_LOTE_FALSA = float(os.getenv('LLM_FAKE_BATCH_DROP_RATE', '0.0'))
+
+
+class BackendLLM:
+    """
+    Interfaz de los proveedores de LLM. `generar` recibe el prompt y la configuración
+    de generación y devuelve el texto de la respuesta; los errores se propagan tal
+    cual para que el planificador decida si reintentar. `prefijo` es la parte inicial
+    del prompt, común a todas las llamadas de una ejecución: los backends que lo
+    admiten pueden cachearlo en el proveedor, el resto lo antepone al prompt.
+    """
+
+    nombre = 'base'
+
+    def __init__(self, modelo: str):
+        self.modelo = modelo
+
+    @property
+    def identificador(self) -> str:
+        """Identifica las respuestas del backend en la caché y en las huellas."""
+        return f"{self.nombre}:{self.modelo}"
+
+    async def generar(self, prompt: str, generation_config: dict, prefijo: str = '') -> str:
+        raise NotImplementedError
+
+
+class BackendGemini(BackendLLM):
+    """Google Gemini a través de google-generativeai."""
+
+    nombre = 'gemini'
+
+    def __init__(self, modelo: str = MODELO_GEMINI, api_key: Optional[str] = None,
+                 cache_contexto: bool = CACHE_CONTEXTO_GEMINI, ttl_cache_contexto: int = TTL_CACHE_CONTEXTO):
+        super().__init__(modelo)
+        import google.generativeai as genai
+        genai.configure(api_key=api_key or os.getenv('GOOGLE_API_KEY'))
+        self._genai = genai
+        self._modelos = {}
+        self.cache_contexto = cache_contexto
+        self.ttl_cache_contexto = ttl_cache_contexto
+        # Modelos ligados a un prefijo cacheado: (prefijo, config) -> (modelo, caducidad).
+        self._modelos_cacheados = {}
+        # Prefijos que el proveedor no aceptó cachear (p. ej. por ser demasiado cortos).
+        self._prefijos_rechazados = set()
+        self._lock_cache = threading.Lock()
+
+    @property
+    def identificador(self):
+        # Sin prefijo, para conservar las huellas y la caché anteriores al cambio.
+        return self.modelo
+
+    def _modelo_con_prefijo(self, prefijo: str, generation_config: dict, clave: str):
+        """
+        Devuelve un modelo ligado a una caché de contexto con el prefijo, creándola si
+        no existe o ha caducado. Devuelve None si el proveedor no la acepta.
+        """
+        clave_prefijo = (hashlib.sha256(prefijo.encode('utf-8')).hexdigest(), clave)
+        with self._lock_cache:
+            if clave_prefijo[0] in self._prefijos_rechazados:
+                return None
+            cacheado = self._modelos_cacheados.get(clave_prefijo)
+            # Margen de un minuto para no usar una caché a punto de caducar.
+            if cacheado and cacheado[1] > time.monotonic() + 60:
+                return cacheado[0]
+            try:
+                from google.generativeai import caching
+                contenido = caching.CachedContent.create(
+                    model=self.modelo, contents=[prefijo], ttl=datetime.timedelta(seconds=self.ttl_cache_contexto)
+                )
+                modelo = self._genai.GenerativeModel.from_cached_content(contenido, generation_config=generation_config)
+            except Exception as e:
+                print(f"⚠️  No se pudo cachear el prefijo del prompt en Gemini, se enviará completo: {e}")
+                self._prefijos_rechazados.add(clave_prefijo[0])
+                return None
+            self._modelos_cacheados[clave_prefijo] = (modelo, time.monotonic() + self.ttl_cache_contexto)
+            return modelo
+
+    async def generar(self, prompt, generation_config, prefijo=''):
+        clave = json.dumps(generation_config, sort_keys=True)
+        if prefijo and self.cache_contexto:
+            # La creación de la caché es una llamada síncrona: se hace fuera del bucle de eventos.
+            modelo = await asyncio.to_thread(self._modelo_con_prefijo, prefijo, generation_config, clave)
+            if modelo is not None:
+                response = await modelo.generate_content_async(prompt)
+                return response.text
+        modelo = self._modelos.get(clave)
+        if modelo is None:
+            modelo = self._modelos[clave] = self._genai.GenerativeModel(self.modelo, generation_config=generation_config)
+        response = await modelo.generate_content_async(prefijo + prompt)
+        return response.text
+
+
+class BackendOpenAICompatible(BackendLLM):
+    """Endpoint local compatible con la API de OpenAI (Ollama, vLLM, LM Studio...)."""
+
+    nombre = 'openai'
+
+    def __init__(self, modelo: str = MODELO_OPENAI_LOCAL, base_url: str = URL_OPENAI_LOCAL,
+                 api_key: Optional[str] = None):
+        super().__init__(modelo)
+        from openai import AsyncOpenAI
+        self.base_url = base_url
+        self._cliente = AsyncOpenAI(base_url=base_url, api_key=api_key or os.getenv('LLM_API_KEY', 'local'))
+
+    async def generar(self, prompt, generation_config, prefijo=''):
+        # Los servidores compatibles con OpenAI (vLLM, Ollama...) reutilizan por sí solos
+        # el prefijo común de los prompts, así que basta con enviarlo al principio.
+        prompt = prefijo + prompt
+        parametros = {"temperature": generation_config.get("temperature")}
+        if generation_config.get("response_mime_type") == "application/json":
+            parametros["response_format"] = {"type": "json_object"}
+        respuesta = await self._cliente.chat.completions.create(
+            model=self.modelo,
+            messages=[{"role": "user", "content": prompt}],
+            **{k: v for k, v in parametros.items() if v is not None}
+        )
+        return respuesta.choices[0].message.content
+
+
+class ErrorSimulado(Exception):
+    """Error del backend falso. `code` imita el código HTTP del proveedor (429, 503...)."""
+
+    def __init__(self, mensaje: str, code: int):
+        super().__init__(mensaje)
+        self.code = code
+
+
+class BackendFalso(BackendLLM):
+    """
+    Backend en proceso y sin red para pruebas de carga y benchmarks. La respuesta y
+    su latencia (lognormal) dependen solo del prompt y de la semilla, así que dos
+    ejecuciones iguales producen los mismos resultados. Los errores se sortean en
+    cada intento, con las tasas configuradas, para ejercitar los reintentos. Si el
+    prompt trae una lista de candidatos o de perfiles evaluadores responde
+    {"evaluaciones": [...]} con una entrada por cada uno, omitiendo algunas si se
+    configura `tasa_omision_lote`. Cuenta como reutilizados los tokens de los
+    prefijos ya vistos, como haría la caché de prefijos de un proveedor.
+    """
+
+    nombre = 'falso'
+
+    def __init__(self, modelo: str = 'cvision-falso', latencia_mediana: float = LATENCIA_FALSA_MEDIANA,
+                 latencia_sigma: float = LATENCIA_FALSA_SIGMA, tasa_error: float = TASA_ERROR_FALSA,
+                 tasa_limitacion: float = TASA_LIMITACION_FALSA, tasa_json_invalido: float = TASA_JSON_INVALIDO_FALSA,
+                 semilla: int = SEMILLA_FALSA, factor_latencia_lote: float = FACTOR_LATENCIA_LOTE_FALSA,
+                 tasa_omision_lote: float = TASA_OMISION_LOTE_FALSA):
+        super().__init__(modelo)
+        self.latencia_mediana = latencia_mediana
+        self.latencia_sigma = latencia_sigma
+        self.tasa_error = tasa_error
+        self.tasa_limitacion = tasa_limitacion
+        self.tasa_json_invalido = tasa_json_invalido
+        self.semilla = semilla
+        self.factor_latencia_lote = factor_latencia_lote
+        self.tasa_omision_lote = tasa_omision_lote
+        self._azar_errores = random.Random(semilla)
+        self.llamadas = 0
+        self.tokens_entrada = 0
+        self.tokens_salida = 0
+        self.tokens_prefijo_reutilizados = 0
+        self._prefijos_vistos = set()
+
+    def _azar_prompt(self, prompt: str) -> random.Random:
+        digest = hashlib.sha256(f"{self.semilla}:{prompt}".encode('utf-8')).digest()
+        return random.Random(int.from_bytes(digest[:8], 'big'))
+
+    def _puntuacion_base(self, candidato) -> int:
+        """Nivel del candidato, común a todos sus evaluadores para que tiendan a coincidir."""
+        return self._azar_prompt(json.dumps(candidato, sort_keys=True, ensure_ascii=False)).randint(5, 95)
+
+    async def generar(self, prompt, generation_config, prefijo=''):
+        self.llamadas += 1
+        if prefijo:
+            huella_prefijo = hashlib.sha256(prefijo.encode('utf-8')).digest()
+            if huella_prefijo in self._prefijos_vistos:
+                self.tokens_prefijo_reutilizados += len(prefijo) // 4
+            self._prefijos_vistos.add(huella_prefijo)
+            prompt = prefijo + prompt
+        self.tokens_entrada += len(prompt) // 4
+        azar = self._azar_prompt(prompt)
+        requisitos, candidato, entradas = self._bloques(prompt)
+        if self.latencia_mediana > 0:
+            escala = 1 + self.factor_latencia_lote * (max(len(entradas), 1) - 1)
+            await asyncio.sleep(self.latencia_mediana * escala * azar.lognormvariate(0, self.latencia_sigma))
+        sorteo = self._azar_errores.random()
+        if sorteo < self.tasa_limitacion:
+            raise ErrorSimulado("429 Resource exhausted (simulado)", 429)
+        if sorteo < self.tasa_limitacion + self.tasa_error:
+            raise ErrorSimulado("503 Service unavailable (simulado)", 503)
+        if sorteo < self.tasa_limitacion + self.tasa_error + self.tasa_json_invalido:
+            return '{"id_candidato": '
+        if entradas:
+            respuesta = {"evaluaciones": [
+                self._respuesta(requisitos, azar, entrada.get('perfil', candidato),
+                                entrada.get('id_candidato'), entrada.get('perfil_evaluador'))
+                for entrada in entradas if azar.random() >= self.tasa_omision_lote
+            ]}
+        else:
+            respuesta = self._respuesta(requisitos, azar, candidato)
+        texto = json.dumps(respuesta, ensure_ascii=False)
+        self.tokens_salida += len(texto) // 4
+        return texto
+
+    @staticmethod
+    def _bloques(prompt: str):
+        """
+        Recupera del prompt los requisitos del puesto, el perfil del candidato y, si la
+        hay, la lista de candidatos (evaluación en lote) o de perfiles evaluadores
+        (evaluación multiperfil).
+        """
+        requisitos, candidato, entradas = {}, {}, []
+        for bloque in re.findall(r"```json\s*(.*?)```", prompt, re.DOTALL):
+            try:
+                datos = json.loads(bloque)
+            except json.JSONDecodeError:
+                continue
+            if isinstance(datos, dict) and 'skills_tecnicas_requeridas' in datos:
+                requisitos = datos
+            elif isinstance(datos, list) and datos and all(
+                    isinstance(e, dict) and ('id_candidato' in e or 'perfil_evaluador' in e) for e in datos):
+                entradas = datos
+            elif isinstance(datos, dict):
+                candidato = datos
+        return requisitos, candidato, entradas
+
+    def _respuesta(self, requisitos: dict, azar: random.Random, candidato=None, id_candidato=None,
+                   perfil_evaluador=None) -> dict:
+        # Cada evaluador se desvía algo del nivel del candidato, y cada categoría un poco más.
+        base = max(0, min(100, self._puntuacion_base(candidato) + azar.randint(-8, 8)))
+        puntuaciones = {
+            categoria: max(0, min(100, base + azar.randint(-6, 6)))
+            for categoria in ("experiencia", "formacion", "skills_tecnicas", "soft_skills")
+        }
+        return {
+            "id_candidato": id_candidato,
+            "perfil_evaluador": perfil_evaluador,
+            "razonamiento_paso_a_paso": "Evaluación simulada por el backend falso.",
+            "puntuaciones_parciales": puntuaciones,
+            "justificacion": f"Respuesta simulada con puntuación base {base}.",
+            "match_soft_skills": {s: azar.choice("ABCD") for s in requisitos.get('soft_skills_deseadas', [])},
+            "match_skills_tecnicas": {s: azar.choice("ABCD") for s in requisitos.get('skills_tecnicas_requeridas', [])},
+            "preguntas_entrevista": [f"Pregunta simulada {i}" for i in range(1, 6)]
+        }
+
+
+def crear_backend(tipo: str = TIPO_BACKEND_LLM) -> BackendLLM:
+    """Crea el backend configurado ('gemini', 'openai' o 'falso')."""
+    if tipo == 'gemini':
+        return BackendGemini()
+    if tipo == 'openai':
+        return BackendOpenAICompatible()
+    if tipo == 'falso':
+        return BackendFalso()
+    raise ValueError(f"Backend de LLM desconocido: {tipo}")
@@ -0,0 +1,103 @@
+"""
+Acceso a la base de datos desde corrutinas.
+
+mysql-connector es bloqueante: llamado directamente desde el bucle de eventos del
+orquestador, cada consulta congela también las llamadas al LLM en curso. Las
+corrutinas pasan las funciones de acceso a datos por este módulo, que las ejecuta
+en un pool de hilos propio y acotado (por defecto, tantos hilos como conexiones
+tiene el pool de db.py, para que ninguno se quede esperando conexión).
+"""
+import asyncio
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+import db
+
+
+HILOS_BD = int(os.getenv('DB_ASYNC_WORKERS', str(db.TAMANO_POOL)))
+# Filas que se leen de golpe al recorrer en un hilo un iterador bloqueante.
+TAMANO_BLOQUE_ITERACION = int(os.getenv('DB_ASYNC_ITER_CHUNK', '200'))
+
+
+class EjecutorBD:
+    """Pool de hilos acotado para las operaciones de BD lanzadas desde corrutinas, con métricas de uso."""
+
+    def __init__(self, num_hilos: int = HILOS_BD):
+        self.num_hilos = num_hilos
+        self._pool = None
+        self._lock = threading.Lock()
+        self._metricas = {"operaciones": 0, "errores": 0, "en_curso": 0, "max_en_curso": 0}
+
+    def _obtener_pool(self) -> ThreadPoolExecutor:
+        # Se crea en el primer uso y se vuelve a crear si se cerró (p. ej. en las pruebas de carga).
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.num_hilos, thread_name_prefix='cvision-bd')
+            return self._pool
+
+    def _llamar(self, funcion, args, kwargs):
+        with self._lock:
+            self._metricas["operaciones"] += 1
+            self._metricas["en_curso"] += 1
+            self._metricas["max_en_curso"] = max(self._metricas["max_en_curso"], self._metricas["en_curso"])
+        try:
+            return funcion(*args, **kwargs)
+        except Exception:
+            with self._lock:
+                self._metricas["errores"] += 1
+            raise
+        finally:
+            with self._lock:
+                self._metricas["en_curso"] -= 1
+
+    async def ejecutar(self, funcion, *args, **kwargs):
+        """Ejecuta `funcion(*args, **kwargs)` en el pool y espera su resultado sin bloquear el bucle."""
+        bucle = asyncio.get_running_loop()
+        return await bucle.run_in_executor(self._obtener_pool(), functools.partial(self._llamar, funcion, args, kwargs))
+
+    async def iterar(self, iterable, tamano_bloque: int = TAMANO_BLOQUE_ITERACION):
+        """
+        Recorre un iterador bloqueante (p. ej. utils.iterar_candidatos) leyendo en el pool
+        bloques de `tamano_bloque` elementos, y los entrega uno a uno al bucle de eventos.
+        """
+        iterador = iter(iterable)
+        try:
+            while True:
+                bloque = await self.ejecutar(lambda: list(islice(iterador, tamano_bloque)))
+                for elemento in bloque:
+                    yield elemento
+                if len(bloque) < tamano_bloque:
+                    return
+        finally:
+            # Si el consumidor se detiene antes (plazo agotado), se libera la conexión del generador.
+            if hasattr(iterador, 'close'):
+                await self.ejecutar(iterador.close)
+
+    def cerrar(self, esperar: bool = True):
+        """Cierra el pool tras las operaciones pendientes."""
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool:
+            pool.shutdown(wait=esperar)
+
+    def metricas(self) -> dict:
+        with self._lock:
+            metricas = dict(self._metricas)
+        metricas["hilos"] = self.num_hilos
+        return metricas
+
+
+EJECUTOR = EjecutorBD()
+
+
+async def ejecutar(funcion, *args, **kwargs):
+    """Ejecuta una función de acceso a datos en el pool compartido."""
+    return await EJECUTOR.ejecutar(funcion, *args, **kwargs)
+
+
+def iterar(iterable, tamano_bloque: int = TAMANO_BLOQUE_ITERACION):
+    """Recorre un iterador bloqueante desde una corrutina (`async for`)."""
+    return EJECUTOR.iterar(iterable, tamano_bloque)
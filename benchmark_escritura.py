@@ -0,0 +1,160 @@
+"""
+Benchmark de la escritura masiva de evaluaciones en MySQL.
+
+Genera filas sintéticas con la forma de SCORING y VALORACION_HARD_SKILL y las
+escribe en tablas temporales (CREATE TEMPORARY TABLE ... LIKE, solo visibles en la
+conexión del benchmark: no toca los datos reales) con la escritura anterior de
+guardar_evaluaciones_masivamente (`executemany` de todas las filas en una sola
+transacción) y con escritura_masiva a varios tamaños de bloque, un commit por
+bloque. Informa de filas/s y MB/s de cada variante.
+
+Con --upsert repite cada escritura sobre las filas ya existentes con
+ON DUPLICATE KEY UPDATE, como hacen las huellas y los puntos de control.
+
+Uso:
+    python benchmark_escritura.py --candidatos 20000
+    python benchmark_escritura.py --candidatos 50000 --bloques 250 1000 5000 --upsert
+"""
+import argparse
+import json
+import random
+import time
+
+
+def _parsear_argumentos():
+    parser = argparse.ArgumentParser(description="Benchmark de la escritura masiva de evaluaciones en MySQL.")
+    parser.add_argument('--candidatos', type=int, default=10000, help="Número de candidatos sintéticos.")
+    parser.add_argument('--skills', type=int, default=8, help="Hard skills valoradas por candidato (x2 filas por la marca IA).")
+    parser.add_argument('--bytes-justificacion', type=int, default=1500, help="Longitud de la justificación sintética.")
+    parser.add_argument('--bloques', type=int, nargs='+', default=[250, 1000, 5000],
+                        help="Tamaños de bloque (filas por sentencia y por commit) a medir.")
+    parser.add_argument('--upsert', action='store_true', help="Mide también la reescritura con ON DUPLICATE KEY UPDATE.")
+    parser.add_argument('--semilla', type=int, default=42)
+    return parser.parse_args()
+
+
+COLUMNAS_SCORING = (
+    'ID_EJECUCION', 'PUESTO', 'ID_CANDIDATO', 'ESTADO_EVALUACION', 'SCORE', 'Justificacion', 'JUSTIFICACIONES',
+    'SCORE_FORMACION', 'SCORE_EXPERIENCIA', 'SCORE_SOFT_SKILL', 'SCORE_HARD_SKILL',
+    'PREGUNTAS_TECNICAS', 'PREGUNTAS_RRHH', 'PREGUNTAS_MANAGER'
+)
+COLUMNAS_HARD_SKILLS = ('ID_EJECUCION', 'PUESTO', 'ID_CANDIDATO', 'ID_HARD_SKILL', 'VALORACION', 'MARCA_IA')
+ACTUALIZAR_SCORING = ('SCORE', 'Justificacion', 'JUSTIFICACIONES')
+
+
+def _filas_sinteticas(args) -> dict:
+    aleatorio = random.Random(args.semilla)
+    texto = ("Cumple los requisitos principales del puesto. " * (args.bytes_justificacion // 46 + 1))[:args.bytes_justificacion]
+    preguntas = json.dumps([f"Pregunta técnica {j}" for j in range(5)], ensure_ascii=False)
+    scoring, hard_skills = [], []
+    for id_candidato in range(1, args.candidatos + 1):
+        justificaciones = json.dumps([{"evaluador": "rrhh", "texto": texto, "razonamiento": ""}], ensure_ascii=False)
+        scoring.append((
+            0, 'Benchmark', id_candidato, 'EVALUADA', aleatorio.randint(0, 100), texto, justificaciones,
+            aleatorio.uniform(0, 10), aleatorio.uniform(0, 10), aleatorio.uniform(0, 10), aleatorio.uniform(0, 10),
+            preguntas, preguntas, preguntas
+        ))
+        for id_skill in range(1, args.skills + 1):
+            valoracion = aleatorio.choice('ABCD')
+            hard_skills.append((0, 'Benchmark', id_candidato, id_skill, valoracion, 0))
+            hard_skills.append((0, 'Benchmark', id_candidato, id_skill, valoracion, 1))
+    return {'SCORING': scoring, 'HARD_SKILL': hard_skills}
+
+
+def _bytes(filas: list) -> int:
+    return sum(len(valor) if isinstance(valor, str) else 8 for fila in filas for valor in fila)
+
+
+def _sql_executemany(tabla: str, columnas: tuple, actualizar: tuple = ()) -> str:
+    sql = f"INSERT INTO {tabla} ({', '.join(columnas)}) VALUES ({', '.join(['%s'] * len(columnas))})"
+    if actualizar:
+        sql += " ON DUPLICATE KEY UPDATE " + ', '.join(f"{columna} = VALUES({columna})" for columna in actualizar)
+    return sql + ';'
+
+
+def _medir(conn, nombre: str, escribir, filas_por_tabla: dict, silencioso: bool = False) -> dict:
+    with conn.cursor() as cur:
+        cur.execute("TRUNCATE TABLE BENCH_SCORING;")
+        cur.execute("TRUNCATE TABLE BENCH_HARD_SKILL;")
+    conn.commit()
+    inicio = time.perf_counter()
+    escribir(conn)
+    duracion = time.perf_counter() - inicio
+    filas = sum(len(f) for f in filas_por_tabla.values())
+    resultado = {
+        "variante": nombre,
+        "filas": filas,
+        "duracion": duracion,
+        "filas_s": filas / duracion,
+        "mb_s": sum(_bytes(f) for f in filas_por_tabla.values()) / duracion / 1e6
+    }
+    if not silencioso:
+        print(f"   -> {nombre:<28} {filas} filas en {duracion:.2f}s | {resultado['filas_s']:.0f} filas/s | {resultado['mb_s']:.1f} MB/s")
+    return resultado
+
+
+def _ejecutar(args):
+    import db
+    import esquema
+    import escritura_masiva
+
+    esquema.asegurar_esquema()
+    filas = _filas_sinteticas(args)
+    print(f"🏁 {args.candidatos} candidatos sintéticos: {len(filas['SCORING'])} filas de SCORING y "
+          f"{len(filas['HARD_SKILL'])} de VALORACION_HARD_SKILL.")
+
+    conn = db.obtener_conexion()
+    try:
+        conn.autocommit = False
+        with conn.cursor() as cur:
+            cur.execute("CREATE TEMPORARY TABLE BENCH_SCORING LIKE SCORING_PREPARACION;")
+            cur.execute("CREATE TEMPORARY TABLE BENCH_HARD_SKILL LIKE VALORACION_HARD_SKILL_PREPARACION;")
+
+        def anterior(actualizar=()):
+            def escribir(conn):
+                with conn.cursor() as cur:
+                    cur.executemany(_sql_executemany('BENCH_SCORING', COLUMNAS_SCORING, actualizar), filas['SCORING'])
+                    if not actualizar:
+                        cur.executemany(_sql_executemany('BENCH_HARD_SKILL', COLUMNAS_HARD_SKILLS), filas['HARD_SKILL'])
+                conn.commit()
+            return escribir
+
+        def por_bloques(tamano, actualizar=()):
+            def escribir(conn):
+                escritura_masiva.escribir_por_bloques(conn, 'BENCH_SCORING', COLUMNAS_SCORING, filas['SCORING'],
+                                                      actualizar, tamano)
+                if not actualizar:
+                    escritura_masiva.escribir_por_bloques(conn, 'BENCH_HARD_SKILL', COLUMNAS_HARD_SKILLS,
+                                                          filas['HARD_SKILL'], (), tamano)
+            return escribir
+
+        print(f"\n{'='*20} INSERCIÓN {'='*20}")
+        resultados = [_medir(conn, "executemany (anterior)", anterior(), filas)]
+        for tamano in args.bloques:
+            resultados.append(_medir(conn, f"bloques de {tamano}", por_bloques(tamano), filas))
+
+        if args.upsert:
+            # Solo SCORING tiene clave primaria en las tablas de preparación: se reescribe sobre sí misma.
+            print(f"\n{'='*20} UPSERT (ON DUPLICATE KEY UPDATE) {'='*20}")
+            num_filas = len(filas['SCORING'])
+            variantes = [("executemany (anterior)", anterior(ACTUALIZAR_SCORING))]
+            variantes += [(f"bloques de {tamano}", por_bloques(tamano, ACTUALIZAR_SCORING)) for tamano in args.bloques]
+            for nombre, reescribir in variantes:
+                # Carga inicial (sin medir) y reescritura de las mismas claves.
+                _medir(conn, "carga", por_bloques(escritura_masiva.TAMANO_BLOQUE_FILAS), filas, silencioso=True)
+                inicio = time.perf_counter()
+                reescribir(conn)
+                duracion = time.perf_counter() - inicio
+                print(f"   -> {nombre:<28} {num_filas} filas en {duracion:.2f}s | {num_filas / duracion:.0f} filas/s")
+
+        referencia = resultados[0]
+        print(f"\n{'='*20} COMPARATIVA FRENTE A executemany {'='*20}")
+        for otro in resultados[1:]:
+            print(f"   -> {otro['variante']}: {otro['filas_s'] / referencia['filas_s']:.2f}x filas/s")
+    finally:
+        if conn.is_connected():
+            conn.close()
+
+
+if __name__ == '__main__':
+    _ejecutar(_parsear_argumentos())
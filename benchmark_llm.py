@@ -0,0 +1,192 @@
+"""
+Benchmark offline del pipeline de evaluación.
+
+Lanza las evaluaciones de un puesto ficticio contra candidatos sintéticos usando el
+backend de LLM falso (sin red ni base de datos) y mide el rendimiento del
+orquestador: pares por segundo, latencias y comportamiento del planificador.
+
+Con --lote K compara además el modo de evaluación en lote (K candidatos por
+llamada) con el de una llamada por par: llamadas/s y tokens por candidato. Con
+--multiperfil compara también el modo de una llamada por candidato para todos
+los evaluadores, y con --adaptativo el muestreo adaptativo de evaluadores. Con
+--comparar-plantillas la referencia usa la plantilla de prompt original (v1) y se
+compara con la indicada en --plantilla: tokens de entrada y tokens de prefijo
+reutilizables por la caché del proveedor.
+
+Uso:
+    python benchmark_llm.py --candidatos 2000 --latencia 1.5 --tasa-error 0.02
+    python benchmark_llm.py --candidatos 2000 --lote 5 --tasa-omision-lote 0.02
+    python benchmark_llm.py --candidatos 2000 --multiperfil --adaptativo
+    python benchmark_llm.py --candidatos 500 --comparar-plantillas --plantilla 2
+"""
+import argparse
+import asyncio
+import os
+import time
+
+
+def _parsear_argumentos():
+    parser = argparse.ArgumentParser(description="Benchmark offline del orquestador de evaluación con un LLM simulado.")
+    parser.add_argument('--candidatos', type=int, default=1000, help="Número de candidatos sintéticos.")
+    parser.add_argument('--latencia', type=float, default=1.5, help="Latencia mediana simulada por llamada (s).")
+    parser.add_argument('--sigma', type=float, default=0.4, help="Dispersión lognormal de la latencia.")
+    parser.add_argument('--tasa-error', type=float, default=0.0, help="Fracción de llamadas con error 503 simulado.")
+    parser.add_argument('--tasa-limitacion', type=float, default=0.0, help="Fracción de llamadas con error 429 simulado.")
+    parser.add_argument('--tasa-json-invalido', type=float, default=0.0, help="Fracción de respuestas con JSON corrupto.")
+    parser.add_argument('--rpm', type=float, default=None, help="Límite de peticiones por minuto del planificador.")
+    parser.add_argument('--tpm', type=float, default=None, help="Límite de tokens por minuto del planificador.")
+    parser.add_argument('--concurrencia', type=int, default=None, help="Concurrencia máxima de llamadas al LLM.")
+    parser.add_argument('--lote', type=int, default=1, help="Candidatos por llamada en modo lote (1 = desactivado).")
+    parser.add_argument('--multiperfil', action='store_true', help="Mide también el modo multiperfil.")
+    parser.add_argument('--adaptativo', action='store_true', help="Mide también el muestreo adaptativo de evaluadores.")
+    parser.add_argument('--tasa-omision-lote', type=float, default=0.0,
+                        help="Fracción de candidatos que el LLM simulado omite en las respuestas de lote.")
+    parser.add_argument('--plantilla', default=None, help="Versión de la plantilla del prompt (por defecto, PROMPT_TEMPLATE_VERSION).")
+    parser.add_argument('--comparar-plantillas', action='store_true',
+                        help="Usa la plantilla original (v1) como referencia de la comparativa.")
+    parser.add_argument('--plazo', type=float, default=0, help="Plazo global de la ejecución (s, 0 = sin límite).")
+    parser.add_argument('--semilla', type=int, default=42)
+    return parser.parse_args()
+
+
+def _configurar_entorno(args):
+    # La configuración se lee al importar utils, así que se fija antes de importarlo.
+    os.environ['LLM_BACKEND'] = 'falso'
+    os.environ['LLM_CACHE'] = 'none'
+    os.environ['LLM_FAKE_LATENCY'] = str(args.latencia)
+    os.environ['LLM_FAKE_LATENCY_SIGMA'] = str(args.sigma)
+    os.environ['LLM_FAKE_ERROR_RATE'] = str(args.tasa_error)
+    os.environ['LLM_FAKE_RATE_LIMIT_RATE'] = str(args.tasa_limitacion)
+    os.environ['LLM_FAKE_BAD_JSON_RATE'] = str(args.tasa_json_invalido)
+    os.environ['LLM_FAKE_SEED'] = str(args.semilla)
+    os.environ['LLM_FAKE_BATCH_DROP_RATE'] = str(args.tasa_omision_lote)
+    if args.rpm:
+        os.environ['LLM_RPM'] = str(args.rpm)
+    if args.tpm:
+        os.environ['LLM_TPM'] = str(args.tpm)
+
+
+def _candidato_sintetico(i: int) -> dict:
+    return {
+        "trayectoria_profesional": [{"puesto": f"Analista {i % 7}", "empresa": f"Empresa {i % 13}", "anios": i % 10}],
+        "formacion": [{"titulo": f"Grado {i % 5}", "centro": f"Universidad {i % 3}"}],
+        "competencias_tecnicas": [f"skill_{j}" for j in range(i % 6)],
+        "soft_skills": ["comunicación", "trabajo en equipo"][: i % 3],
+        "idiomas": [],
+        "miscelanea": ""
+    }
+
+
+async def _medir(args, utils, requisitos: dict, lote_llm: int, modo: str = 'individual', version_plantilla: str = None) -> dict:
+    """Ejecuta una pasada completa con un backend falso nuevo y devuelve sus cifras."""
+    import backends_llm
+    import plantillas_prompt
+
+    # Backend nuevo en cada pasada para que los contadores de llamadas y tokens empiecen de cero.
+    utils.BACKEND_LLM = backends_llm.crear_backend('falso')
+    plantilla = plantillas_prompt.crear_plantilla(requisitos, utils.EVALUADORES, version_plantilla or utils.VERSION_PROMPT)
+    pares = (
+        (i, plantilla.preparar_candidato(_candidato_sintetico(i)), evaluador)
+        for i in range(1, args.candidatos + 1)
+        for evaluador in utils.EVALUADORES
+    )
+    total = args.candidatos * len(utils.EVALUADORES)
+
+    inicio = time.perf_counter()
+    informe = await utils._lanzar_evaluaciones(pares, requisitos, usar_cache=False, total=total,
+                                               plazo_ejecucion=args.plazo, lote_llm=lote_llm,
+                                               multiperfil=modo == utils.MODO_EVALUACION_MULTIPERFIL,
+                                               adaptativo=modo == utils.MODO_EVALUACION_ADAPTATIVO,
+                                               plantilla=plantilla)
+    duracion = time.perf_counter() - inicio
+
+    inicio_consenso = time.perf_counter()
+    consolidados = utils._procesar_evaluaciones(informe["resultados"])
+    duracion_consenso = time.perf_counter() - inicio_consenso
+
+    backend = utils.BACKEND_LLM
+    nombre_modo = modo if modo != 'individual' else (f"lotes de {lote_llm}" if lote_llm > 1 else "una llamada por par")
+    return {
+        "modo": f"{nombre_modo}, plantilla v{plantilla.version}",
+        "pares": len(informe["resultados"]),
+        "total": total,
+        "errores": sum(1 for r in informe["resultados"] if r.get('error')),
+        "no_iniciados": informe["no_iniciados"],
+        "duracion": duracion,
+        "candidatos": len(consolidados),
+        "duracion_consenso": duracion_consenso,
+        "llamadas": backend.llamadas,
+        "tokens_entrada": backend.tokens_entrada,
+        "tokens_salida": backend.tokens_salida,
+        "tokens_prefijo_reutilizados": backend.tokens_prefijo_reutilizados,
+        "prompt": informe["prompt"],
+        "lotes": informe["lotes"],
+        "adaptativo": informe["adaptativo"],
+        "planificador": informe["planificador"]
+    }
+
+
+def _imprimir(resultado: dict):
+    pares = max(resultado['pares'], 1)
+    print(f"\n{'='*20} RESULTADOS DEL BENCHMARK ({resultado['modo']}) {'='*20}")
+    print(f"   -> Pares: {resultado['pares']}/{resultado['total']} ({resultado['errores']} con error, "
+          f"{resultado['no_iniciados']} sin lanzar)")
+    print(f"   -> Tiempo total: {resultado['duracion']:.2f}s | {resultado['pares'] / resultado['duracion']:.1f} pares/s | "
+          f"{resultado['candidatos'] / resultado['duracion']:.1f} candidatos/s")
+    print(f"   -> Llamadas al LLM: {resultado['llamadas']} ({resultado['llamadas'] / resultado['duracion']:.1f} llamadas/s, "
+          f"{resultado['llamadas'] / pares:.2f} por par)")
+    print(f"   -> Tokens por par evaluado: {resultado['tokens_entrada'] / pares:.0f} de entrada, "
+          f"{resultado['tokens_salida'] / pares:.0f} de salida")
+    print(f"   -> Prompts: {resultado['prompt']} | tokens de prefijo reutilizables: {resultado['tokens_prefijo_reutilizados']} "
+          f"({resultado['tokens_prefijo_reutilizados'] / max(resultado['tokens_entrada'], 1):.0%} de la entrada)")
+    print(f"   -> Consenso de {resultado['candidatos']} candidatos: {resultado['duracion_consenso'] * 1000:.1f} ms")
+    if resultado['lotes']:
+        print(f"   -> Lotes: {resultado['lotes']}")
+    if resultado['adaptativo']:
+        print(f"   -> Muestreo adaptativo: {resultado['adaptativo']}")
+    print(f"   -> Planificador: {resultado['planificador']}")
+
+
+async def _ejecutar(args):
+    import utils
+
+    if args.concurrencia:
+        utils.MAX_CONSULTAS_CONCURRENTES = args.concurrencia
+    requisitos = {
+        'puesto': 'Benchmark',
+        'mision': 'Puesto ficticio para medir el rendimiento del pipeline.',
+        'skills_tecnicas_requeridas': [f"skill_{j}" for j in range(8)],
+        'soft_skills_deseadas': ["comunicación", "trabajo en equipo", "liderazgo"]
+    }
+    version = args.plantilla or utils.VERSION_PROMPT
+    modos = [(1, utils.MODO_EVALUACION_INDIVIDUAL, '1' if args.comparar_plantillas else version)]
+    if args.comparar_plantillas:
+        modos.append((1, utils.MODO_EVALUACION_INDIVIDUAL, version))
+    if args.lote > 1:
+        modos.append((args.lote, utils.MODO_EVALUACION_INDIVIDUAL, version))
+    if args.multiperfil:
+        modos.append((1, utils.MODO_EVALUACION_MULTIPERFIL, version))
+    if args.adaptativo:
+        modos.append((1, utils.MODO_EVALUACION_ADAPTATIVO, version))
+    resultados = []
+    for lote_llm, modo, version_plantilla in modos:
+        resultados.append(await _medir(args, utils, requisitos, lote_llm, modo, version_plantilla))
+        _imprimir(resultados[-1])
+
+    individual = resultados[0]
+    tokens_individual = individual['tokens_entrada'] / max(individual['pares'], 1)
+    for otro in resultados[1:]:
+        tokens_otro = otro['tokens_entrada'] / max(otro['pares'], 1)
+        print(f"\n{'='*20} COMPARATIVA: {individual['modo']} -> {otro['modo']} {'='*20}")
+        print(f"   -> Llamadas al LLM: {individual['llamadas']} -> {otro['llamadas']} "
+              f"({otro['llamadas'] / max(individual['llamadas'], 1):.0%})")
+        print(f"   -> Tokens de entrada por par: {tokens_individual:.0f} -> {tokens_otro:.0f} "
+              f"({tokens_otro / max(tokens_individual, 1):.0%})")
+        print(f"   -> Tokens de prefijo reutilizables: {individual['tokens_prefijo_reutilizados']} -> {otro['tokens_prefijo_reutilizados']}")
+        print(f"   -> Pares/s: {individual['pares'] / individual['duracion']:.1f} -> {otro['pares'] / otro['duracion']:.1f}")
+
+
+if __name__ == '__main__':
+    argumentos = _parsear_argumentos()
+    _configurar_entorno(argumentos)
+    asyncio.run(_ejecutar(argumentos))
@@ -0,0 +1,202 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+
+RUTA_CACHE_LLM = os.getenv('LLM_CACHE_PATH', 'cvision_llm_cache.sqlite3')
+# 'sqlite' (por defecto) o 'none' para desactivar la caché por completo.
+TIPO_CACHE_LLM = os.getenv('LLM_CACHE', 'sqlite')
+TTL_CACHE_LLM = int(os.getenv('LLM_CACHE_TTL', str(30 * 24 * 3600)))
+MAX_BYTES_CACHE_LLM = int(os.getenv('LLM_CACHE_MAX_BYTES', str(512 * 1024 * 1024)))
+# Cada cuántas escrituras se purgan las entradas caducadas y se recalcula el tamaño total
+# (corrige la deriva si otro proceso escribe en el mismo fichero).
+INTERVALO_REVISION_CACHE_LLM = int(os.getenv('LLM_CACHE_SWEEP_EVERY', '1000'))
+
+
+def calcular_clave(modelo: str, generation_config: dict, prompt: str) -> str:
+    """Clave de caché: hash del modelo, la configuración de generación y el prompt."""
+    contenido = json.dumps({
+        "modelo": modelo,
+        "generation_config": generation_config,
+        "prompt": prompt
+    }, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(contenido.encode('utf-8')).hexdigest()
+
+
+class CacheRespuestas:
+    """Interfaz de las cachés de respuestas del LLM."""
+
+    def __init__(self):
+        self.aciertos = 0
+        self.fallos = 0
+        self.escrituras = 0
+        self.expulsiones = 0
+
+    def obtener(self, clave: str) -> Optional[str]:
+        raise NotImplementedError
+
+    def guardar(self, clave: str, respuesta: str, puesto: Optional[str] = None):
+        raise NotImplementedError
+
+    def invalidar_puesto(self, puesto: str) -> int:
+        raise NotImplementedError
+
+    def vaciar(self):
+        raise NotImplementedError
+
+    def estadisticas(self) -> dict:
+        consultas = self.aciertos + self.fallos
+        return {
+            "tipo": type(self).__name__,
+            "aciertos": self.aciertos,
+            "fallos": self.fallos,
+            "ratio_aciertos": round(self.aciertos / consultas, 4) if consultas else 0.0,
+            "escrituras": self.escrituras,
+            "expulsiones": self.expulsiones
+        }
+
+
+class CacheNula(CacheRespuestas):
+    """Caché desactivada: nunca acierta y no guarda nada."""
+
+    def obtener(self, clave):
+        self.fallos += 1
+        return None
+
+    def guardar(self, clave, respuesta, puesto=None):
+        pass
+
+    def invalidar_puesto(self, puesto):
+        return 0
+
+    def vaciar(self):
+        pass
+
+
+class CacheSQLite(CacheRespuestas):
+    """
+    Caché persistente en disco (SQLite) con expiración por TTL y expulsión LRU
+    cuando el tamaño total de las respuestas supera `max_bytes`.
+
+    El tamaño total se lleva en memoria (se lee al abrir y se ajusta en cada
+    escritura y borrado) para no recorrer la tabla en cada respuesta guardada; cada
+    `intervalo_revision` escrituras se purgan las caducadas y se vuelve a calcular.
+    """
+
+    def __init__(self, ruta: str = RUTA_CACHE_LLM, ttl: int = TTL_CACHE_LLM, max_bytes: int = MAX_BYTES_CACHE_LLM,
+                 intervalo_revision: int = INTERVALO_REVISION_CACHE_LLM):
+        super().__init__()
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.intervalo_revision = intervalo_revision
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(ruta, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL;")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS RESPUESTAS_LLM (
+                CLAVE TEXT PRIMARY KEY,
+                PUESTO TEXT,
+                RESPUESTA TEXT NOT NULL,
+                TAMANO INTEGER NOT NULL,
+                CREADO REAL NOT NULL,
+                ULTIMO_ACCESO REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS IDX_RESPUESTAS_PUESTO ON RESPUESTAS_LLM (PUESTO);
+            CREATE INDEX IF NOT EXISTS IDX_RESPUESTAS_ACCESO ON RESPUESTAS_LLM (ULTIMO_ACCESO);
+            CREATE INDEX IF NOT EXISTS IDX_RESPUESTAS_CREADO ON RESPUESTAS_LLM (CREADO);
+        """)
+        self._escrituras_sin_revisar = 0
+        self._bytes = self._calcular_bytes()
+
+    def _calcular_bytes(self) -> int:
+        return self._conn.execute("SELECT COALESCE(SUM(TAMANO), 0) FROM RESPUESTAS_LLM;").fetchone()[0]
+
+    def obtener(self, clave):
+        ahora = time.time()
+        with self._lock:
+            fila = self._conn.execute(
+                "SELECT RESPUESTA, CREADO, TAMANO FROM RESPUESTAS_LLM WHERE CLAVE = ?;", (clave,)
+            ).fetchone()
+            if fila and ahora - fila[1] > self.ttl:
+                self._conn.execute("DELETE FROM RESPUESTAS_LLM WHERE CLAVE = ?;", (clave,))
+                self._bytes -= fila[2]
+                self.expulsiones += 1
+                fila = None
+            if not fila:
+                self.fallos += 1
+                return None
+            self._conn.execute("UPDATE RESPUESTAS_LLM SET ULTIMO_ACCESO = ? WHERE CLAVE = ?;", (ahora, clave))
+            self.aciertos += 1
+            return fila[0]
+
+    def guardar(self, clave, respuesta, puesto=None):
+        ahora = time.time()
+        tamano = len(respuesta.encode('utf-8'))
+        with self._lock:
+            previa = self._conn.execute("SELECT TAMANO FROM RESPUESTAS_LLM WHERE CLAVE = ?;", (clave,)).fetchone()
+            self._conn.execute("""
+                INSERT OR REPLACE INTO RESPUESTAS_LLM (CLAVE, PUESTO, RESPUESTA, TAMANO, CREADO, ULTIMO_ACCESO)
+                VALUES (?, ?, ?, ?, ?, ?);
+            """, (clave, puesto, respuesta, tamano, ahora, ahora))
+            self._bytes += tamano - (previa[0] if previa else 0)
+            self.escrituras += 1
+            self._escrituras_sin_revisar += 1
+            if self._escrituras_sin_revisar >= self.intervalo_revision:
+                self._revisar(ahora)
+            if self._bytes > self.max_bytes:
+                self._expulsar()
+
+    def _revisar(self, ahora: float):
+        """Elimina las entradas caducadas y recalcula el tamaño total."""
+        cur = self._conn.execute("DELETE FROM RESPUESTAS_LLM WHERE CREADO < ?;", (ahora - self.ttl,))
+        self.expulsiones += max(cur.rowcount, 0)
+        self._bytes = self._calcular_bytes()
+        self._escrituras_sin_revisar = 0
+
+    def _expulsar(self):
+        """Elimina las entradas menos usadas hasta volver a `max_bytes`."""
+        exceso = self._bytes - self.max_bytes
+        claves = []
+        for clave, tamano in self._conn.execute("SELECT CLAVE, TAMANO FROM RESPUESTAS_LLM ORDER BY ULTIMO_ACCESO;"):
+            claves.append((clave,))
+            exceso -= tamano
+            self._bytes -= tamano
+            if exceso <= 0:
+                break
+        self._conn.executemany("DELETE FROM RESPUESTAS_LLM WHERE CLAVE = ?;", claves)
+        self.expulsiones += len(claves)
+
+    def invalidar_puesto(self, puesto):
+        with self._lock:
+            self._bytes -= self._conn.execute(
+                "SELECT COALESCE(SUM(TAMANO), 0) FROM RESPUESTAS_LLM WHERE PUESTO = ?;", (puesto,)
+            ).fetchone()[0]
+            cur = self._conn.execute("DELETE FROM RESPUESTAS_LLM WHERE PUESTO = ?;", (puesto,))
+            return max(cur.rowcount, 0)
+
+    def vaciar(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM RESPUESTAS_LLM;")
+            self._bytes = 0
+
+    def estadisticas(self):
+        stats = super().estadisticas()
+        with self._lock:
+            entradas, total = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(TAMANO), 0) FROM RESPUESTAS_LLM;"
+            ).fetchone()
+        stats.update({"entradas": entradas, "bytes": total, "max_bytes": self.max_bytes, "ttl": self.ttl})
+        return stats
+
+
+def crear_cache(tipo: str = TIPO_CACHE_LLM) -> CacheRespuestas:
+    """Crea la caché configurada ('sqlite' o 'none')."""
+    if tipo == 'none':
+        return CacheNula()
+    if tipo == 'sqlite':
+        return CacheSQLite()
+    raise ValueError(f"Tipo de caché de LLM desconocido: {tipo}")
@@ -0,0 +1,280 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+
+# Cachés de las respuestas de lectura de la API ya serializadas: rankings de los puestos
+# e informes de los candidatos. Tipo: 'memoria' (por defecto, un solo proceso), 'sqlite'
+# (compartida entre los workers de la misma máquina) o 'none' para desactivarla.
+TIPO_CACHE_RANKING = os.getenv('RANKING_CACHE', 'memoria')
+RUTA_CACHE_RANKING = os.getenv('RANKING_CACHE_PATH', 'cvision_ranking_cache.sqlite3')
+TTL_CACHE_RANKING = int(os.getenv('RANKING_CACHE_TTL', '300'))
+MAX_ENTRADAS_CACHE_RANKING = int(os.getenv('RANKING_CACHE_MAX_ENTRIES', '512'))
+
+TIPO_CACHE_INFORMES = os.getenv('REPORT_CACHE', TIPO_CACHE_RANKING)
+RUTA_CACHE_INFORMES = os.getenv('REPORT_CACHE_PATH', 'cvision_informes_cache.sqlite3')
+TTL_CACHE_INFORMES = int(os.getenv('REPORT_CACHE_TTL', '600'))
+MAX_ENTRADAS_CACHE_INFORMES = int(os.getenv('REPORT_CACHE_MAX_ENTRIES', '2048'))
+
+
+def calcular_etag(cuerpo: str) -> str:
+    """ETag de una respuesta cacheada: hash de su contenido."""
+    return hashlib.sha256(cuerpo.encode('utf-8')).hexdigest()[:32]
+
+
+class CacheRanking:
+    """
+    Interfaz de las cachés de respuestas ya serializadas, por grupo y clave. El grupo
+    es la unidad de invalidación: el puesto en los rankings y el candidato en los informes.
+
+    Cada grupo tiene un número de generación que se incrementa al invalidarlo. Quien
+    calcula un ranking lee la generación antes de consultar la BD y la pasa a
+    `guardar`: si entretanto hubo una escritura, el resultado (posiblemente anterior
+    a ella) no se guarda.
+    """
+
+    def __init__(self):
+        self.aciertos = 0
+        self.fallos = 0
+        self.escrituras = 0
+        self.invalidaciones = 0
+
+    def generacion(self, grupo: str) -> int:
+        raise NotImplementedError
+
+    def obtener(self, grupo: str, clave: str) -> Optional[Tuple[str, str]]:
+        """Devuelve (cuerpo, etag) si la consulta está cacheada y vigente."""
+        raise NotImplementedError
+
+    def guardar(self, grupo: str, clave: str, cuerpo: str, generacion: int) -> str:
+        """Guarda el cuerpo si el grupo no se ha invalidado desde `generacion`. Devuelve su ETag."""
+        raise NotImplementedError
+
+    def invalidar(self, grupo: str):
+        raise NotImplementedError
+
+    def vaciar(self):
+        raise NotImplementedError
+
+    def estadisticas(self) -> dict:
+        consultas = self.aciertos + self.fallos
+        return {
+            "tipo": type(self).__name__,
+            "aciertos": self.aciertos,
+            "fallos": self.fallos,
+            "ratio_aciertos": round(self.aciertos / consultas, 4) if consultas else 0.0,
+            "escrituras": self.escrituras,
+            "invalidaciones": self.invalidaciones
+        }
+
+
+class CacheRankingNula(CacheRanking):
+    """Caché desactivada: nunca acierta y no guarda nada."""
+
+    def generacion(self, grupo):
+        return 0
+
+    def obtener(self, grupo, clave):
+        self.fallos += 1
+        return None
+
+    def guardar(self, grupo, clave, cuerpo, generacion):
+        return calcular_etag(cuerpo)
+
+    def invalidar(self, grupo):
+        self.invalidaciones += 1
+
+    def vaciar(self):
+        pass
+
+
+class CacheRankingMemoria(CacheRanking):
+    """Caché en memoria del proceso, con expiración por TTL y expulsión LRU por número de entradas."""
+
+    def __init__(self, ttl: int = TTL_CACHE_RANKING, max_entradas: int = MAX_ENTRADAS_CACHE_RANKING):
+        super().__init__()
+        self.ttl = ttl
+        self.max_entradas = max_entradas
+        self._entradas = OrderedDict()
+        self._generaciones = {}
+        self._lock = threading.Lock()
+
+    def generacion(self, grupo):
+        with self._lock:
+            return self._generaciones.get(grupo, 0)
+
+    def obtener(self, grupo, clave):
+        with self._lock:
+            entrada = self._entradas.get((grupo, clave))
+            if entrada and time.monotonic() - entrada[2] > self.ttl:
+                del self._entradas[(grupo, clave)]
+                entrada = None
+            if not entrada:
+                self.fallos += 1
+                return None
+            self._entradas.move_to_end((grupo, clave))
+            self.aciertos += 1
+            return entrada[0], entrada[1]
+
+    def guardar(self, grupo, clave, cuerpo, generacion):
+        etag = calcular_etag(cuerpo)
+        with self._lock:
+            if self._generaciones.get(grupo, 0) != generacion:
+                return etag
+            self._entradas[(grupo, clave)] = (cuerpo, etag, time.monotonic())
+            self._entradas.move_to_end((grupo, clave))
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+            self.escrituras += 1
+        return etag
+
+    def invalidar(self, grupo):
+        with self._lock:
+            self._generaciones[grupo] = self._generaciones.get(grupo, 0) + 1
+            for clave in [clave for clave in self._entradas if clave[0] == grupo]:
+                del self._entradas[clave]
+            self.invalidaciones += 1
+
+    def vaciar(self):
+        with self._lock:
+            for grupo in {grupo for grupo, _ in self._entradas} | set(self._generaciones):
+                self._generaciones[grupo] = self._generaciones.get(grupo, 0) + 1
+            self._entradas.clear()
+            self.invalidaciones += 1
+
+    def estadisticas(self):
+        stats = super().estadisticas()
+        with self._lock:
+            stats.update({"entradas": len(self._entradas), "max_entradas": self.max_entradas, "ttl": self.ttl})
+        return stats
+
+
+class CacheRankingSQLite(CacheRanking):
+    """
+    Caché en un fichero SQLite local, compartida por todos los workers de la máquina:
+    la invalidación hecha por uno es visible para el resto.
+    """
+
+    def __init__(self, ruta: str = RUTA_CACHE_RANKING, ttl: int = TTL_CACHE_RANKING,
+                 max_entradas: int = MAX_ENTRADAS_CACHE_RANKING):
+        super().__init__()
+        self.ttl = ttl
+        self.max_entradas = max_entradas
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(ruta, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL;")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS RESPUESTA (
+                GRUPO TEXT NOT NULL,
+                CLAVE TEXT NOT NULL,
+                CUERPO TEXT NOT NULL,
+                ETAG TEXT NOT NULL,
+                CREADO REAL NOT NULL,
+                ULTIMO_ACCESO REAL NOT NULL,
+                PRIMARY KEY (GRUPO, CLAVE)
+            );
+            CREATE INDEX IF NOT EXISTS IDX_RESPUESTA_ACCESO ON RESPUESTA (ULTIMO_ACCESO);
+            CREATE TABLE IF NOT EXISTS GENERACION_GRUPO (
+                GRUPO TEXT PRIMARY KEY,
+                GENERACION INTEGER NOT NULL
+            );
+        """)
+
+    def generacion(self, grupo):
+        with self._lock:
+            fila = self._conn.execute("SELECT GENERACION FROM GENERACION_GRUPO WHERE GRUPO = ?;", (grupo,)).fetchone()
+            return fila[0] if fila else 0
+
+    def obtener(self, grupo, clave):
+        ahora = time.time()
+        with self._lock:
+            fila = self._conn.execute(
+                "SELECT CUERPO, ETAG, CREADO FROM RESPUESTA WHERE GRUPO = ? AND CLAVE = ?;", (grupo, clave)
+            ).fetchone()
+            if fila and ahora - fila[2] > self.ttl:
+                self._conn.execute("DELETE FROM RESPUESTA WHERE GRUPO = ? AND CLAVE = ?;", (grupo, clave))
+                fila = None
+            if not fila:
+                self.fallos += 1
+                return None
+            self._conn.execute("UPDATE RESPUESTA SET ULTIMO_ACCESO = ? WHERE GRUPO = ? AND CLAVE = ?;", (ahora, grupo, clave))
+            self.aciertos += 1
+            return fila[0], fila[1]
+
+    def guardar(self, grupo, clave, cuerpo, generacion):
+        etag = calcular_etag(cuerpo)
+        ahora = time.time()
+        with self._lock:
+            # La comprobación de la generación y la escritura van en la misma transacción.
+            self._conn.execute("BEGIN IMMEDIATE;")
+            try:
+                fila = self._conn.execute("SELECT GENERACION FROM GENERACION_GRUPO WHERE GRUPO = ?;", (grupo,)).fetchone()
+                if (fila[0] if fila else 0) == generacion:
+                    self._conn.execute("""
+                        INSERT OR REPLACE INTO RESPUESTA (GRUPO, CLAVE, CUERPO, ETAG, CREADO, ULTIMO_ACCESO)
+                        VALUES (?, ?, ?, ?, ?, ?);
+                    """, (grupo, clave, cuerpo, etag, ahora, ahora))
+                    self._conn.execute("""
+                        DELETE FROM RESPUESTA WHERE rowid IN (
+                            SELECT rowid FROM RESPUESTA ORDER BY ULTIMO_ACCESO DESC LIMIT -1 OFFSET ?
+                        );
+                    """, (self.max_entradas,))
+                    self.escrituras += 1
+                self._conn.execute("COMMIT;")
+            except sqlite3.Error:
+                self._conn.execute("ROLLBACK;")
+                raise
+        return etag
+
+    def invalidar(self, grupo):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE;")
+            try:
+                self._conn.execute("""
+                    INSERT INTO GENERACION_GRUPO (GRUPO, GENERACION) VALUES (?, 1)
+                    ON CONFLICT(GRUPO) DO UPDATE SET GENERACION = GENERACION + 1;
+                """, (grupo,))
+                self._conn.execute("DELETE FROM RESPUESTA WHERE GRUPO = ?;", (grupo,))
+                self._conn.execute("COMMIT;")
+            except sqlite3.Error:
+                self._conn.execute("ROLLBACK;")
+                raise
+            self.invalidaciones += 1
+
+    def vaciar(self):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE;")
+            try:
+                self._conn.execute("""
+                    INSERT OR IGNORE INTO GENERACION_GRUPO (GRUPO, GENERACION) SELECT DISTINCT GRUPO, 0 FROM RESPUESTA;
+                """)
+                self._conn.execute("UPDATE GENERACION_GRUPO SET GENERACION = GENERACION + 1;")
+                self._conn.execute("DELETE FROM RESPUESTA;")
+                self._conn.execute("COMMIT;")
+            except sqlite3.Error:
+                self._conn.execute("ROLLBACK;")
+                raise
+            self.invalidaciones += 1
+
+    def estadisticas(self):
+        stats = super().estadisticas()
+        with self._lock:
+            entradas = self._conn.execute("SELECT COUNT(*) FROM RESPUESTA;").fetchone()[0]
+        stats.update({"entradas": entradas, "max_entradas": self.max_entradas, "ttl": self.ttl})
+        return stats
+
+
+def crear_cache(tipo: str = TIPO_CACHE_RANKING, ruta: str = RUTA_CACHE_RANKING, ttl: int = TTL_CACHE_RANKING,
+                max_entradas: int = MAX_ENTRADAS_CACHE_RANKING) -> CacheRanking:
+    """Crea una caché del tipo indicado ('memoria', 'sqlite' o 'none'); por defecto, la de rankings."""
+    if tipo == 'none':
+        return CacheRankingNula()
+    if tipo == 'memoria':
+        return CacheRankingMemoria(ttl, max_entradas)
+    if tipo == 'sqlite':
+        return CacheRankingSQLite(ruta, ttl, max_entradas)
+    raise ValueError(f"Tipo de caché de ranking desconocido: {tipo}")
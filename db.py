@@ -0,0 +1,167 @@
+import os
+import threading
+import time
+
+from dotenv import load_dotenv
+from mysql.connector import pooling
+from mysql.connector.errors import Error, PoolError
+
+
+load_dotenv()
+DB_CONFIG = {
+    "database": os.getenv('DB_NAME'),
+    "user": os.getenv('DB_USER'),
+    "password": os.getenv('DB_PASS'),
+    "host": os.getenv('DB_HOST'),
+    "port": os.getenv('DB_PORT', '3306')
+}
+
+# mysql-connector no admite pools de más de 32 conexiones.
+TAMANO_POOL = min(int(os.getenv('DB_POOL_SIZE', '10')), pooling.CNX_POOL_MAXSIZE)
+TIMEOUT_CHECKOUT = float(os.getenv('DB_POOL_TIMEOUT', '10'))
+# Las conexiones que llevan más de este tiempo ociosas se comprueban con un ping.
+INTERVALO_PING = float(os.getenv('DB_POOL_PING_INTERVAL', '30'))
+
+
+class PoolAgotado(PoolError):
+    """No quedó ninguna conexión libre dentro del tiempo de espera."""
+
+
+class _ConexionPool:
+    """
+    Envoltorio de una conexión del pool. Delega todo en la conexión real y, al
+    cerrarse, la devuelve al pool (deshaciendo cualquier transacción abierta).
+    """
+
+    def __init__(self, pool: 'PoolConexiones', conexion):
+        object.__setattr__(self, '_pool', pool)
+        object.__setattr__(self, '_conexion', conexion)
+        object.__setattr__(self, '_cerrada', False)
+
+    def __getattr__(self, nombre):
+        return getattr(self._conexion, nombre)
+
+    def __setattr__(self, nombre, valor):
+        setattr(self._conexion, nombre, valor)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self._cerrada:
+            return
+        object.__setattr__(self, '_cerrada', True)
+        self._pool._devolver(self._conexion)
+
+
+class PoolConexiones:
+    """
+    Pool de conexiones MySQL compartido por app.py y utils.py. Añade al pool de
+    mysql-connector una espera acotada cuando está lleno, comprobación de salud
+    de las conexiones ociosas y métricas de uso.
+    """
+
+    def __init__(self, config: dict = DB_CONFIG, tamano: int = TAMANO_POOL,
+                 timeout_checkout: float = TIMEOUT_CHECKOUT, nombre: str = 'cvision'):
+        self.config = config
+        self.tamano = tamano
+        self.timeout_checkout = timeout_checkout
+        self.nombre = nombre
+        self._pool = None
+        self._lock = threading.Lock()
+        self._huecos = threading.BoundedSemaphore(tamano)
+        self._ultimo_uso = {}
+        self._metricas = {
+            "checkouts": 0,
+            "esperas": 0,
+            "timeouts": 0,
+            "reconexiones": 0,
+            "errores": 0,
+            "en_uso": 0,
+            "max_en_uso": 0,
+            "espera_total_s": 0.0
+        }
+
+    def _obtener_pool(self):
+        # Se crea en el primer uso para no conectar a la BD al importar el módulo.
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    self._pool = pooling.MySQLConnectionPool(
+                        pool_name=self.nombre, pool_size=self.tamano, pool_reset_session=True, **self.config
+                    )
+        return self._pool
+
+    def obtener_conexion(self, timeout: float = None) -> _ConexionPool:
+        """
+        Saca una conexión del pool, esperando como máximo `timeout` segundos
+        a que quede una libre. Lanza PoolAgotado si no llega a tiempo.
+        """
+        timeout = self.timeout_checkout if timeout is None else timeout
+        inicio = time.monotonic()
+        if not self._huecos.acquire(blocking=False):
+            with self._lock:
+                self._metricas["esperas"] += 1
+            if not self._huecos.acquire(timeout=timeout):
+                with self._lock:
+                    self._metricas["timeouts"] += 1
+                raise PoolAgotado(f"No hay conexiones libres en el pool '{self.nombre}' tras {timeout}s")
+        try:
+            conexion = self._obtener_pool().get_connection()
+            self._comprobar_salud(conexion)
+        except Error:
+            self._huecos.release()
+            with self._lock:
+                self._metricas["errores"] += 1
+            raise
+        with self._lock:
+            self._metricas["checkouts"] += 1
+            self._metricas["espera_total_s"] += time.monotonic() - inicio
+            self._metricas["en_uso"] += 1
+            self._metricas["max_en_uso"] = max(self._metricas["max_en_uso"], self._metricas["en_uso"])
+        return _ConexionPool(self, conexion)
+
+    def _comprobar_salud(self, conexion):
+        """Hace ping a las conexiones que llevan tiempo ociosas y las reabre si han caído."""
+        ultimo_uso = self._ultimo_uso.get(conexion.connection_id)
+        if ultimo_uso is not None and time.monotonic() - ultimo_uso < INTERVALO_PING:
+            return
+        try:
+            conexion.ping(reconnect=False)
+        except Error:
+            with self._lock:
+                self._metricas["reconexiones"] += 1
+            conexion.ping(reconnect=True, attempts=2, delay=0)
+
+    def _devolver(self, conexion):
+        try:
+            if conexion.is_connected() and conexion.in_transaction:
+                conexion.rollback()
+            self._ultimo_uso[conexion.connection_id] = time.monotonic()
+            conexion.close()
+        except Error as e:
+            with self._lock:
+                self._metricas["errores"] += 1
+            print(f"⚠️  Error al devolver una conexión al pool: {e}")
+        finally:
+            with self._lock:
+                self._metricas["en_uso"] -= 1
+            self._huecos.release()
+
+    def metricas(self) -> dict:
+        with self._lock:
+            metricas = dict(self._metricas)
+        metricas.update({"tamano": self.tamano, "timeout_checkout": self.timeout_checkout})
+        metricas["espera_media_ms"] = round(1000 * metricas["espera_total_s"] / metricas["checkouts"], 3) if metricas["checkouts"] else 0.0
+        return metricas
+
+
+POOL = PoolConexiones()
+
+
+def obtener_conexion(timeout: float = None) -> _ConexionPool:
+    """Devuelve una conexión del pool compartido. Se devuelve al pool con close()."""
+    return POOL.obtener_conexion(timeout)
@@ -0,0 +1,71 @@
+"""
+Escritura masiva en MySQL con sentencias INSERT multi-fila por bloques.
+
+`executemany` de mysql-connector junta todas las filas en una sola sentencia (o, si
+no puede reescribirla, hace una ida y vuelta por fila): con decenas de miles de
+candidatos eso son sentencias de cientos de MB o transacciones muy largas. Aquí cada
+bloque de filas es una sentencia `INSERT ... VALUES (...), (...), ...` de tamaño
+acotado, opcionalmente con `ON DUPLICATE KEY UPDATE`.
+
+Para medirlo frente a la escritura anterior: python benchmark_escritura.py
+"""
+import os
+
+
+# Filas por sentencia INSERT y candidatos por transacción al guardar evaluaciones.
+TAMANO_BLOQUE_FILAS = int(os.getenv('DB_BULK_CHUNK_ROWS', '1000'))
+TAMANO_BLOQUE_CANDIDATOS = int(os.getenv('DB_BULK_CHUNK_CANDIDATES', '500'))
+
+
+def bloques(filas: list, tamano: int):
+    """Divide la lista en trozos de `tamano` elementos (todo en uno si tamano <= 0)."""
+    tamano = tamano if tamano and tamano > 0 else max(len(filas), 1)
+    for inicio in range(0, len(filas), tamano):
+        yield filas[inicio:inicio + tamano]
+
+
+def sentencia_insercion(tabla: str, columnas: tuple, num_filas: int, actualizar: tuple = ()) -> str:
+    """INSERT multi-fila de `num_filas` filas; con `actualizar`, las columnas que se sobrescriben si la clave ya existe."""
+    marcadores = '(' + ', '.join(['%s'] * len(columnas)) + ')'
+    sql = f"INSERT INTO {tabla} ({', '.join(columnas)}) VALUES {', '.join([marcadores] * num_filas)}"
+    if actualizar:
+        sql += " ON DUPLICATE KEY UPDATE " + ', '.join(f"{columna} = VALUES({columna})" for columna in actualizar)
+    return sql + ';'
+
+
+def insertar_filas(cursor, tabla: str, columnas: tuple, filas: list, actualizar: tuple = (),
+                   tamano_bloque: int = TAMANO_BLOQUE_FILAS) -> int:
+    """
+    Inserta las filas con una sentencia multi-fila por bloque, dentro de la transacción
+    de quien llama (no confirma). Devuelve el número de filas enviadas.
+    """
+    sql_bloque_completo = None
+    for bloque in bloques(filas, tamano_bloque):
+        if len(bloque) == tamano_bloque:
+            # Todos los bloques salvo el último tienen el mismo tamaño: la sentencia se construye una vez.
+            sql_bloque_completo = sql_bloque_completo or sentencia_insercion(tabla, columnas, len(bloque), actualizar)
+            sql = sql_bloque_completo
+        else:
+            sql = sentencia_insercion(tabla, columnas, len(bloque), actualizar)
+        cursor.execute(sql, [valor for fila in bloque for valor in fila])
+    return len(filas)
+
+
+def escribir_por_bloques(conn, tabla: str, columnas: tuple, filas: list, actualizar: tuple = (),
+                         tamano_bloque: int = TAMANO_BLOQUE_FILAS) -> int:
+    """
+    Como insertar_filas, pero confirma cada bloque en su propia transacción: si falla
+    uno, los anteriores quedan guardados. Lanza mysql.connector.Error tras deshacer
+    el bloque fallido. Devuelve el número de filas confirmadas.
+    """
+    confirmadas = 0
+    with conn.cursor() as cur:
+        for bloque in bloques(filas, tamano_bloque):
+            try:
+                insertar_filas(cur, tabla, columnas, bloque, actualizar, tamano_bloque)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            confirmadas += len(bloque)
+    return confirmadas
@@ -0,0 +1,218 @@
+import threading
+import time
+
+from mysql.connector import Error
+
+import db
+
+
+# Tablas y columnas auxiliares que necesita el pipeline de evaluación, además
+# del modelo de datos original (PUESTOS_PREDEFINIDOS, CANDIDATOS, SCORING...).
+# Todas las sentencias son idempotentes para poder ejecutarse en cada arranque.
+SENTENCIAS_ESQUEMA = [
+    # Huella de las entradas de cada par (candidato, evaluador) y la respuesta
+    # cruda del LLM, para poder re-evaluar solo lo que ha cambiado.
+    """
+    CREATE TABLE IF NOT EXISTS HUELLA_EVALUACION (
+        PUESTO VARCHAR(255) NOT NULL,
+        ID_CANDIDATO INT NOT NULL,
+        PERFIL_EVALUADOR VARCHAR(64) NOT NULL,
+        HUELLA CHAR(64) NOT NULL,
+        RESPUESTA LONGTEXT,
+        FECHA TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+        PRIMARY KEY (PUESTO, ID_CANDIDATO, PERFIL_EVALUADOR)
+    );
+    """,
+    # Registro de cada ejecución de evaluación de un puesto y de cada par
+    # (candidato, evaluador) completado, para poder reanudarla tras una caída.
+    """
+    CREATE TABLE IF NOT EXISTS EJECUCION_EVALUACION (
+        ID_EJECUCION BIGINT AUTO_INCREMENT PRIMARY KEY,
+        PUESTO VARCHAR(255) NOT NULL,
+        TIPO VARCHAR(32) NOT NULL,
+        ESTADO VARCHAR(32) NOT NULL,
+        PARAMETROS TEXT,
+        COMPLETADOS INT NOT NULL DEFAULT 0,
+        ERROR TEXT,
+        INICIO TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FIN TIMESTAMP NULL,
+        INDEX IDX_EJECUCION_PUESTO (PUESTO, ESTADO)
+    );
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS EJECUCION_RESULTADO (
+        ID_EJECUCION BIGINT NOT NULL,
+        ID_CANDIDATO INT NOT NULL,
+        PERFIL_EVALUADOR VARCHAR(64) NOT NULL,
+        RESPUESTA LONGTEXT,
+        ERROR TINYINT(1) NOT NULL DEFAULT 0,
+        FECHA TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (ID_EJECUCION, ID_CANDIDATO, PERFIL_EVALUADOR)
+    );
+    """,
+    # Estado de la evaluación de cada fila de SCORING: 'EVALUADA' o 'FALLIDA'
+    # (todas las llamadas al LLM fallaron; no hay puntuación real).
+    """
+    ALTER TABLE SCORING ADD COLUMN ESTADO_EVALUACION VARCHAR(16) NOT NULL DEFAULT 'EVALUADA';
+    """,
+    # Ampliada para 'NO_PRESELECCIONADO' (candidato descartado en la preselección).
+    """
+    ALTER TABLE SCORING MODIFY COLUMN ESTADO_EVALUACION VARCHAR(32) NOT NULL DEFAULT 'EVALUADA';
+    """,
+    # Estadísticas de cada ejecución (pares evaluados, sin cambios, llamadas omitidas...).
+    """
+    ALTER TABLE EJECUCION_EVALUACION ADD COLUMN ESTADISTICAS TEXT;
+    """,
+    # Modo de evaluación del puesto: 'individual' (una llamada al LLM por evaluador),
+    # 'multiperfil' (una sola llamada devuelve las evaluaciones de todos los perfiles)
+    # o 'adaptativo' (evaluadores en secuencia que se detienen si ya hay consenso).
+    """
+    ALTER TABLE PUESTOS_PREDEFINIDOS ADD COLUMN MODO_EVALUACION VARCHAR(16) NOT NULL DEFAULT 'individual';
+    """,
+    # Preselección local del puesto (preseleccion.py): número máximo de candidatos y
+    # afinidad mínima relativa que pasan a la evaluación con el LLM. NULL = valor por defecto.
+    """
+    ALTER TABLE PUESTOS_PREDEFINIDOS ADD COLUMN PRESELECCION_TOP_K INT NULL;
+    """,
+    """
+    ALTER TABLE PUESTOS_PREDEFINIDOS ADD COLUMN PRESELECCION_UMBRAL FLOAT NULL;
+    """,
+    # Índice invertido de los perfiles de los candidatos (indice_candidatos.py): una fila
+    # por (término, candidato, campo) con la longitud del perfil para puntuar con BM25.
+    """
+    CREATE TABLE IF NOT EXISTS INDICE_CANDIDATO_TERMINO (
+        TERMINO VARCHAR(64) NOT NULL,
+        ID_CANDIDATO INT NOT NULL,
+        CAMPO VARCHAR(32) NOT NULL,
+        FRECUENCIA SMALLINT NOT NULL,
+        LONGITUD INT NOT NULL,
+        PRIMARY KEY (TERMINO, ID_CANDIDATO, CAMPO),
+        INDEX IDX_INDICE_TERMINO_CANDIDATO (ID_CANDIDATO)
+    );
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS INDICE_CANDIDATO_DOCUMENTO (
+        ID_CANDIDATO INT PRIMARY KEY,
+        LONGITUD INT NOT NULL,
+        FECHA TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+    );
+    """,
+    # Puntuación final del candidato con las ponderaciones del puesto (0-100), guardada
+    # para que el ranking se lea en orden de índice en lugar de calcularla y ordenar en
+    # cada consulta. Se recalcula al guardar evaluaciones y al cambiar las ponderaciones.
+    """
+    ALTER TABLE SCORING ADD COLUMN SCORE_PONDERADO DECIMAL(7,3) NULL;
+    """,
+    """
+    ALTER TABLE SCORING ADD INDEX IDX_SCORING_RANKING (PUESTO, SCORE_PONDERADO, ID_CANDIDATO);
+    """,
+    # Las filas anteriores a la columna se rellenan con migrar_score_ponderado.py.
+    # Justificación y razonamiento de cada evaluador como JSON
+    # ([{"evaluador", "texto", "razonamiento"}, ...]), para que el informe no tenga que
+    # separar el texto consolidado de 'Justificacion'. Las filas anteriores se rellenan
+    # con migrar_justificaciones.py.
+    """
+    ALTER TABLE SCORING ADD COLUMN JUSTIFICACIONES LONGTEXT NULL;
+    """,
+    # Tablas de preparación de las re-evaluaciones: la ejecución escribe aquí sus resultados
+    # y utils.publicar_ejecucion los pasa a las tablas definitivas en una sola transacción,
+    # así que el ranking y los informes muestran la evaluación anterior completa hasta que
+    # termina la nueva. Si se añaden columnas a SCORING que escriba la evaluación, hay que
+    # añadirlas también a SCORING_PREPARACION.
+    """
+    CREATE TABLE IF NOT EXISTS SCORING_PREPARACION (
+        ID_EJECUCION BIGINT NOT NULL,
+        PUESTO VARCHAR(255) NOT NULL,
+        ID_CANDIDATO INT NOT NULL,
+        ESTADO_EVALUACION VARCHAR(32) NOT NULL,
+        SCORE INT NULL,
+        Justificacion LONGTEXT,
+        JUSTIFICACIONES LONGTEXT,
+        SCORE_FORMACION DOUBLE NULL,
+        SCORE_EXPERIENCIA DOUBLE NULL,
+        SCORE_SOFT_SKILL DOUBLE NULL,
+        SCORE_HARD_SKILL DOUBLE NULL,
+        PREGUNTAS_TECNICAS LONGTEXT,
+        PREGUNTAS_RRHH LONGTEXT,
+        PREGUNTAS_MANAGER LONGTEXT,
+        PRIMARY KEY (ID_EJECUCION, ID_CANDIDATO)
+    );
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS VALORACION_HARD_SKILL_PREPARACION (
+        ID_EJECUCION BIGINT NOT NULL,
+        PUESTO VARCHAR(255) NOT NULL,
+        ID_CANDIDATO INT NOT NULL,
+        ID_HARD_SKILL INT NOT NULL,
+        VALORACION VARCHAR(32),
+        MARCA_IA TINYINT(1) NOT NULL,
+        INDEX IDX_HARD_SKILL_PREPARACION (ID_EJECUCION, ID_CANDIDATO)
+    );
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS VALORACION_SOFT_SKILL_PREPARACION (
+        ID_EJECUCION BIGINT NOT NULL,
+        ID_CANDIDATO INT NOT NULL,
+        ID_SOFT_SKILL INT NOT NULL,
+        VALORACION VARCHAR(32),
+        MARCA_IA TINYINT(1) NOT NULL,
+        INDEX IDX_SOFT_SKILL_PREPARACION (ID_EJECUCION, ID_CANDIDATO)
+    );
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS HUELLA_EVALUACION_PREPARACION (
+        ID_EJECUCION BIGINT NOT NULL,
+        PUESTO VARCHAR(255) NOT NULL,
+        ID_CANDIDATO INT NOT NULL,
+        PERFIL_EVALUADOR VARCHAR(64) NOT NULL,
+        HUELLA CHAR(64) NOT NULL,
+        RESPUESTA LONGTEXT,
+        PRIMARY KEY (ID_EJECUCION, ID_CANDIDATO, PERFIL_EVALUADOR)
+    );
+    """,
+]
+
+# Códigos de MySQL que indican que el objeto ya existe (columna o índice duplicado).
+_ERRORES_IGNORABLES = {1060, 1061}
+
+# Espera antes de reintentar tras un fallo; se duplica en cada fallo seguido hasta el máximo.
+ESPERA_REINTENTO_INICIAL = 5.0
+ESPERA_REINTENTO_MAXIMA = 300.0
+
+_esquema_verificado = False
+_lock_esquema = threading.Lock()
+_proximo_intento = 0.0
+_espera_reintento = ESPERA_REINTENTO_INICIAL
+
+
+def asegurar_esquema():
+    """
+    Crea (una sola vez por proceso) las tablas auxiliares si no existen. Un solo hilo
+    ejecuta las sentencias; si fallan, no se reintenta hasta pasada una espera creciente
+    para no repetirlas en cada petición.
+    """
+    global _esquema_verificado, _proximo_intento, _espera_reintento
+    if _esquema_verificado:
+        return
+    with _lock_esquema:
+        if _esquema_verificado or time.monotonic() < _proximo_intento:
+            return
+        conn = None
+        try:
+            conn = db.obtener_conexion()
+            with conn.cursor() as cur:
+                for sentencia in SENTENCIAS_ESQUEMA:
+                    try:
+                        cur.execute(sentencia)
+                    except Error as e:
+                        if e.errno not in _ERRORES_IGNORABLES:
+                            raise
+            conn.commit()
+            _esquema_verificado = True
+        except Error as e:
+            print(f"❌ Error al verificar el esquema auxiliar (se reintentará en {_espera_reintento:.0f}s): {e}")
+            _proximo_intento = time.monotonic() + _espera_reintento
+            _espera_reintento = min(_espera_reintento * 2, ESPERA_REINTENTO_MAXIMA)
+        finally:
+            if conn and conn.is_connected():
+                conn.close()
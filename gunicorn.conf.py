@@ -0,0 +1,54 @@
+"""
+Configuración de gunicorn para producción:
+
+    gunicorn app:app          (lee este fichero automáticamente)
+    python worker.py          (un único proceso de evaluación, aparte)
+
+Las vistas son síncronas: cada worker atiende WEB_THREADS peticiones en paralelo con
+hilos (gthread). Las evaluaciones no se ejecutan en los workers web sino en worker.py,
+para que el presupuesto del LLM y los workers de la cola no se multipliquen por el
+número de procesos. Por eso las cachés de lectura (ranking e informes) se comparten
+entre procesos por defecto (RANKING_CACHE=sqlite): las invalidaciones que hace worker.py
+al terminar una evaluación tienen que llegar a los workers web.
+"""
+import multiprocessing
+import os
+
+
+# Los workers web solo encolan; los trabajos los procesa worker.py. Se fija antes de que
+# los workers importen app.py.
+os.environ.setdefault('JOBS_EMBEDDED', '0')
+os.environ.setdefault('RANKING_CACHE', 'sqlite')
+
+bind = os.getenv('WEB_BIND', '0.0.0.0:8000')
+workers = int(os.getenv('WEB_CONCURRENCY', str(min(multiprocessing.cpu_count() * 2 + 1, 8))))
+worker_class = 'gthread'
+# Cada hilo puede tener una conexión del pool de db.py: más hilos que DB_POOL_SIZE solo
+# añadirían esperas por conexión.
+threads = int(os.getenv('WEB_THREADS', os.getenv('DB_POOL_SIZE', '10')))
+timeout = int(os.getenv('WEB_TIMEOUT', '120'))
+# Al recibir SIGTERM, las peticiones en curso tienen este plazo para terminar.
+graceful_timeout = int(os.getenv('WEB_GRACEFUL_TIMEOUT', '30'))
+keepalive = 5
+# Reciclar workers de vez en cuando acota el crecimiento de memoria de las cachés en proceso.
+max_requests = int(os.getenv('WEB_MAX_REQUESTS', '5000'))
+max_requests_jitter = max_requests // 10
+accesslog = '-'
+errorlog = '-'
+
+
+def on_starting(server):
+    if os.environ.get('JOBS_EMBEDDED') == '1' and workers > 1:
+        server.log.warning("JOBS_EMBEDDED=1 con varios workers: cada uno tendrá su propia cola y su propio "
+                           "presupuesto del LLM. Usa JOBS_EMBEDDED=0 y worker.py.")
+    evaluaciones_aparte = os.environ.get('JOBS_EMBEDDED') != '1'
+    if os.environ.get('RANKING_CACHE') == 'memoria' and (workers > 1 or evaluaciones_aparte):
+        server.log.warning("RANKING_CACHE=memoria con varios procesos: las invalidaciones no se comparten y "
+                           "se servirán rankings e informes caducados hasta su TTL. Usa RANKING_CACHE=sqlite.")
+
+
+def worker_exit(server, worker):
+    # Solo hay evaluaciones que drenar si este worker las ejecuta (JOBS_EMBEDDED=1).
+    if os.environ.get('JOBS_EMBEDDED') == '1':
+        import app
+        app.detener_evaluaciones()
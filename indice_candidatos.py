@@ -0,0 +1,253 @@
+"""
+Índice invertido de términos sobre el JSON 'Otros' de los candidatos.
+
+Cada término normalizado (normalizar_texto) se guarda con el candidato, el campo
+del perfil en que aparece y la longitud del perfil (INDICE_CANDIDATO_TERMINO); el
+número de perfiles y su longitud media salen de INDICE_CANDIDATO_DOCUMENTO. Una
+búsqueda solo lee las listas de los términos de la consulta, así que no depende
+del tamaño de la tabla CANDIDATOS.
+
+El índice se actualiza al guardar el perfil de un candidato desde el informe. Para
+crearlo o rehacerlo entero (p. ej. tras una carga masiva de candidatos):
+    python indice_candidatos.py
+"""
+import time
+from collections import defaultdict, Counter
+
+from mysql.connector import Error
+
+import db
+import esquema
+import preseleccion
+import utils
+
+
+# Campos de 'Otros' que se indexan. Se pueden usar como filtro en la consulta (campo:termino).
+CAMPOS_INDEXADOS = ('formacion', 'trayectoria_profesional', 'idiomas', 'competencias_tecnicas', 'soft_skills')
+LONGITUD_MAXIMA_TERMINO = 64
+TAMANO_LOTE_RECONSTRUCCION = 500
+MODO_BOOLEANO = 'booleano'
+MODO_RANKING = 'ranking'
+
+
+def terminos_candidato(datos_candidato: dict) -> tuple:
+    """
+    Devuelve ({(termino, campo): frecuencia}, longitud) de los campos indexados
+    del perfil de un candidato.
+    """
+    frecuencias = Counter()
+    if isinstance(datos_candidato, dict):
+        for campo in CAMPOS_INDEXADOS:
+            for termino in preseleccion.tokenizar(preseleccion.aplanar_texto(datos_candidato.get(campo)), utils.normalizar_texto):
+                frecuencias[(termino[:LONGITUD_MAXIMA_TERMINO], campo)] += 1
+    return frecuencias, sum(frecuencias.values())
+
+
+def actualizar_candidato(cur, id_candidato: int, datos_candidato: dict):
+    """
+    Reindexa un candidato con el cursor recibido, dentro de la transacción de quien
+    llama: el índice se confirma (o se deshace) junto con el cambio del perfil.
+    """
+    frecuencias, longitud = terminos_candidato(datos_candidato)
+    cur.execute("DELETE FROM INDICE_CANDIDATO_TERMINO WHERE ID_CANDIDATO = %s;", (id_candidato,))
+    if frecuencias:
+        cur.executemany(
+            "INSERT INTO INDICE_CANDIDATO_TERMINO (TERMINO, ID_CANDIDATO, CAMPO, FRECUENCIA, LONGITUD) VALUES (%s, %s, %s, %s, %s);",
+            [(termino, id_candidato, campo, tf, longitud) for (termino, campo), tf in frecuencias.items()]
+        )
+    cur.execute("""
+        INSERT INTO INDICE_CANDIDATO_DOCUMENTO (ID_CANDIDATO, LONGITUD) VALUES (%s, %s)
+        ON DUPLICATE KEY UPDATE LONGITUD = VALUES(LONGITUD);
+    """, (id_candidato, longitud))
+
+
+def reconstruir_indice(tamano_lote: int = TAMANO_LOTE_RECONSTRUCCION) -> int:
+    """Rehace el índice de todos los candidatos por lotes. Devuelve los candidatos indexados."""
+    esquema.asegurar_esquema()
+    inicio = time.monotonic()
+    indexados = 0
+    conn = None
+    try:
+        conn = db.obtener_conexion()
+        with conn.cursor() as cur:
+            cur.execute("DELETE FROM INDICE_CANDIDATO_TERMINO;")
+            cur.execute("DELETE FROM INDICE_CANDIDATO_DOCUMENTO;")
+            conn.commit()
+
+            terminos, documentos = [], []
+
+            def volcar():
+                cur.executemany(
+                    "INSERT INTO INDICE_CANDIDATO_TERMINO (TERMINO, ID_CANDIDATO, CAMPO, FRECUENCIA, LONGITUD) VALUES (%s, %s, %s, %s, %s);",
+                    terminos
+                )
+                cur.executemany("INSERT INTO INDICE_CANDIDATO_DOCUMENTO (ID_CANDIDATO, LONGITUD) VALUES (%s, %s);", documentos)
+                conn.commit()
+                terminos.clear()
+                documentos.clear()
+
+            for id_candidato, otros in utils.iterar_candidatos():
+                frecuencias, longitud = terminos_candidato(utils._parsear_otros(otros))
+                terminos.extend((termino, id_candidato, campo, tf, longitud) for (termino, campo), tf in frecuencias.items())
+                documentos.append((id_candidato, longitud))
+                indexados += 1
+                if len(documentos) >= tamano_lote:
+                    volcar()
+            if documentos:
+                volcar()
+        print(f"✅ Índice de candidatos reconstruido: {indexados} candidatos en {time.monotonic() - inicio:.1f}s.")
+    except Error as e:
+        print(f"❌ Error al reconstruir el índice de candidatos: {e}")
+        if conn:
+            conn.rollback()
+    finally:
+        if conn and conn.is_connected():
+            conn.close()
+    return indexados
+
+
+def analizar_consulta(consulta: str) -> tuple:
+    """
+    Convierte la consulta en (grupos, excluidos). Los términos separados por espacios
+    son obligatorios (AND); 'a OR b' admite cualquiera de los dos; '-termino' excluye;
+    'campo:termino' limita el término a un campo de CAMPOS_INDEXADOS.
+
+    Returns:
+        tuple: `grupos` es una lista de alternativas [(termino, campo_o_None), ...] de las
+               que cada candidato debe cumplir al menos una por grupo; `excluidos` es una
+               lista de (termino, campo_o_None).
+    """
+    grupos, excluidos = [], []
+    unir_con_anterior = False
+    for palabra in consulta.split():
+        if palabra.upper() == 'OR':
+            unir_con_anterior = bool(grupos)
+            continue
+        excluir = palabra.startswith('-')
+        palabra = palabra.lstrip('-+')
+        campo = None
+        if ':' in palabra:
+            posible_campo, resto = palabra.split(':', 1)
+            if posible_campo in CAMPOS_INDEXADOS:
+                campo, palabra = posible_campo, resto
+        # Una palabra compuesta ("machine-learning") da varios términos: todos obligatorios.
+        terminos = [(termino[:LONGITUD_MAXIMA_TERMINO], campo) for termino in preseleccion.tokenizar(palabra, utils.normalizar_texto)]
+        if not terminos:
+            unir_con_anterior = False
+            continue
+        if excluir:
+            excluidos.extend(terminos)
+        elif unir_con_anterior and len(terminos) == 1:
+            grupos[-1].append(terminos[0])
+        else:
+            grupos.extend([termino] for termino in terminos)
+        unir_con_anterior = False
+    return grupos, excluidos
+
+
+def _leer_listas(cur, terminos: set) -> tuple:
+    """
+    Devuelve ({termino: {campo: {id_candidato: frecuencia}}}, {id_candidato: longitud})
+    de los términos pedidos.
+    """
+    listas = defaultdict(lambda: defaultdict(dict))
+    longitudes = {}
+    placeholders = ', '.join(['%s'] * len(terminos))
+    cur.execute(
+        f"SELECT TERMINO, CAMPO, ID_CANDIDATO, FRECUENCIA, LONGITUD FROM INDICE_CANDIDATO_TERMINO WHERE TERMINO IN ({placeholders});",
+        tuple(terminos)
+    )
+    for termino, campo, id_candidato, frecuencia, longitud in cur.fetchall():
+        listas[termino][campo][id_candidato] = frecuencia
+        longitudes[id_candidato] = longitud
+    return listas, longitudes
+
+
+def _frecuencias(listas: dict, termino: str, campo: str = None) -> dict:
+    """{id_candidato: frecuencia} del término, en un campo o sumando todos."""
+    if campo is not None:
+        return listas[termino].get(campo, {})
+    total = defaultdict(int)
+    for por_candidato in listas[termino].values():
+        for id_candidato, frecuencia in por_candidato.items():
+            total[id_candidato] += frecuencia
+    return total
+
+
+def buscar(consulta: str, modo: str = MODO_RANKING, limite: int = 20, desplazamiento: int = 0) -> dict:
+    """
+    Busca candidatos en el índice.
+
+    Args:
+        modo (str): 'booleano' (cumplen todos los grupos de la consulta) o 'ranking'
+                    (cumplen al menos uno). En los dos se ordena por BM25.
+
+    Returns:
+        dict: 'total' de coincidencias y 'resultados' de la página pedida, cada uno con
+              'id', 'nombreCompleto', 'localidad', 'puntuacion' y 'terminos' encontrados.
+    """
+    esquema.asegurar_esquema()
+    grupos, excluidos = analizar_consulta(consulta)
+    if not grupos:
+        return {"total": 0, "resultados": []}
+    conn = None
+    try:
+        conn = db.obtener_conexion()
+        with conn.cursor() as cur:
+            listas, longitudes = _leer_listas(cur, {termino for grupo in grupos for termino, _ in grupo} | {termino for termino, _ in excluidos})
+            coincidencias_grupo = []
+            for grupo in grupos:
+                ids = set()
+                for termino, campo in grupo:
+                    ids.update(_frecuencias(listas, termino, campo))
+                coincidencias_grupo.append(ids)
+            if modo == MODO_BOOLEANO:
+                candidatos = set.intersection(*coincidencias_grupo)
+            else:
+                candidatos = set.union(*coincidencias_grupo)
+            for termino, campo in excluidos:
+                candidatos.difference_update(_frecuencias(listas, termino, campo))
+
+            puntuaciones = {id_candidato: 0.0 for id_candidato in candidatos}
+            encontrados = defaultdict(list)
+            if candidatos:
+                cur.execute("SELECT COUNT(*), AVG(LONGITUD) FROM INDICE_CANDIDATO_DOCUMENTO;")
+                num_documentos, longitud_media = cur.fetchone()
+                for termino, campo in {t for grupo in grupos for t in grupo}:
+                    frecuencias = _frecuencias(listas, termino, campo)
+                    idf_termino = preseleccion.idf(num_documentos, len(frecuencias))
+                    for id_candidato, tf in frecuencias.items():
+                        if id_candidato in puntuaciones:
+                            puntuaciones[id_candidato] += preseleccion.peso_bm25(
+                                tf, longitudes.get(id_candidato, 0), float(longitud_media or 0), idf_termino
+                            )
+                            encontrados[id_candidato].append(termino if campo is None else f"{campo}:{termino}")
+
+            ordenados = sorted(puntuaciones.items(), key=lambda par: (-par[1], par[0]))
+            pagina = ordenados[desplazamiento:desplazamiento + limite]
+            datos = {}
+            if pagina:
+                placeholders = ', '.join(['%s'] * len(pagina))
+                cur.execute(f"SELECT ID_CANDIDATO, nombre_completo, ciudad_residencia FROM CANDIDATOS WHERE ID_CANDIDATO IN ({placeholders});",
+                            tuple(id_candidato for id_candidato, _ in pagina))
+                datos = {fila[0]: fila[1:] for fila in cur.fetchall()}
+            return {
+                "total": len(ordenados),
+                "resultados": [
+                    {
+                        "id": id_candidato,
+                        "nombreCompleto": datos.get(id_candidato, (None, None))[0],
+                        "localidad": datos.get(id_candidato, (None, None))[1],
+                        "puntuacion": round(puntuacion, 4),
+                        "terminos": sorted(encontrados[id_candidato])
+                    }
+                    for id_candidato, puntuacion in pagina
+                ]
+            }
+    finally:
+        if conn and conn.is_connected():
+            conn.close()
+
+
+if __name__ == '__main__':
+    reconstruir_indice()
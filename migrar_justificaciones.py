@@ -0,0 +1,91 @@
+"""
+Migración única: rellena SCORING.JUSTIFICACIONES en las filas guardadas antes de
+que existiera la columna.
+
+Para cada fila se usan, si están, las respuestas crudas del LLM guardadas en
+HUELLA_EVALUACION (recuperan también el razonamiento paso a paso de cada
+evaluador); si no, se separa por evaluador el texto consolidado de 'Justificacion'.
+Se puede interrumpir y volver a lanzar: solo procesa las filas aún sin rellenar.
+    python migrar_justificaciones.py
+"""
+import json
+import time
+from collections import defaultdict
+
+from mysql.connector import Error
+
+import db
+import esquema
+import utils
+
+
+TAMANO_LOTE_MIGRACION = 500
+
+
+def _justificaciones_desde_respuestas(respuestas: list) -> dict:
+    """{id_candidato: justificaciones} a partir de las respuestas guardadas de un puesto."""
+    por_candidato = defaultdict(list)
+    for respuesta in respuestas:
+        if respuesta.get('error') or respuesta.get('omitido') or 'id_candidato' not in respuesta:
+            continue
+        por_candidato[respuesta['id_candidato']].append((respuesta, respuesta.get('perfil_evaluador', '')))
+    return {
+        id_candidato: utils.justificaciones_evaluadores(sorted(evaluaciones, key=lambda par: par[1]))
+        for id_candidato, evaluaciones in por_candidato.items()
+    }
+
+
+def migrar(tamano_lote: int = TAMANO_LOTE_MIGRACION) -> int:
+    """Rellena JUSTIFICACIONES por lotes, un commit por lote. Devuelve las filas migradas."""
+    esquema.asegurar_esquema()
+    inicio = time.monotonic()
+    migradas = desde_respuestas = 0
+    conn = None
+    try:
+        conn = db.obtener_conexion()
+        with conn.cursor() as cur:
+            while True:
+                # Cada lote deja sus filas con valor, así que la consulta avanza sola.
+                cur.execute(
+                    "SELECT PUESTO, ID_CANDIDATO, Justificacion FROM SCORING WHERE JUSTIFICACIONES IS NULL LIMIT %s;",
+                    (tamano_lote,)
+                )
+                filas = cur.fetchall()
+                if not filas:
+                    break
+                por_puesto = defaultdict(list)
+                for puesto, id_candidato, justificacion in filas:
+                    por_puesto[puesto].append((id_candidato, justificacion))
+
+                actualizaciones = []
+                for puesto, candidatos in por_puesto.items():
+                    recuperadas = _justificaciones_desde_respuestas(
+                        utils.obtener_respuestas_evaluacion(puesto, [id_candidato for id_candidato, _ in candidatos])
+                    )
+                    for id_candidato, justificacion in candidatos:
+                        if id_candidato in recuperadas:
+                            justificaciones = recuperadas[id_candidato]
+                            desde_respuestas += 1
+                        else:
+                            justificaciones = utils.parsear_justificacion_consolidada(justificacion)
+                        actualizaciones.append((json.dumps(justificaciones, ensure_ascii=False), puesto, id_candidato))
+
+                cur.executemany("UPDATE SCORING SET JUSTIFICACIONES = %s WHERE PUESTO = %s AND ID_CANDIDATO = %s;", actualizaciones)
+                conn.commit()
+                migradas += len(actualizaciones)
+                print(f"   -> {migradas} filas migradas...")
+        utils.CACHE_INFORMES.vaciar()
+        print(f"✅ Justificaciones migradas: {migradas} filas ({desde_respuestas} con las respuestas guardadas del LLM) "
+              f"en {time.monotonic() - inicio:.1f}s.")
+    except Error as e:
+        print(f"❌ Error al migrar las justificaciones: {e}")
+        if conn:
+            conn.rollback()
+    finally:
+        if conn and conn.is_connected():
+            conn.close()
+    return migradas
+
+
+if __name__ == '__main__':
+    migrar()
@@ -0,0 +1,51 @@
+"""
+Migración única: rellena SCORING.SCORE_PONDERADO en las filas guardadas antes de
+que existiera la columna. Hasta entonces, el ranking las muestra como candidatos sin
+puntuar, al final de la lista.
+
+Se recalcula puesto a puesto con las ponderaciones actuales, un commit por puesto.
+Se puede interrumpir y volver a lanzar: solo procesa los puestos con filas sin rellenar.
+    python migrar_score_ponderado.py
+"""
+import time
+
+from mysql.connector import Error
+
+import db
+import esquema
+import utils
+
+
+def migrar() -> int:
+    """Rellena SCORE_PONDERADO de los puestos que lo tienen vacío. Devuelve las filas migradas."""
+    esquema.asegurar_esquema()
+    inicio = time.monotonic()
+    migradas = 0
+    conn = None
+    try:
+        conn = db.obtener_conexion()
+        with conn.cursor() as cur:
+            cur.execute(
+                "SELECT DISTINCT PUESTO FROM SCORING WHERE SCORE_PONDERADO IS NULL AND SCORE_FORMACION IS NOT NULL;"
+            )
+            puestos = [fila[0] for fila in cur.fetchall()]
+            for puesto in puestos:
+                utils.actualizar_puntuacion_ponderada(cur, puesto)
+                conn.commit()
+                migradas += max(cur.rowcount, 0)
+                utils.invalidar_caches_lectura(puesto)
+                print(f"   -> '{puesto}': {migradas} filas migradas...")
+        print(f"✅ Puntuaciones ponderadas migradas: {migradas} filas de {len(puestos)} puestos "
+              f"en {time.monotonic() - inicio:.1f}s.")
+    except Error as e:
+        print(f"❌ Error al migrar las puntuaciones ponderadas: {e}")
+        if conn:
+            conn.rollback()
+    finally:
+        if conn and conn.is_connected():
+            conn.close()
+    return migradas
+
+
+if __name__ == '__main__':
+    migrar()
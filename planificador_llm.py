@@ -0,0 +1,489 @@
+import asyncio
+import contextvars
+import json
+import os
+import random
+import re
+import statistics
+import time
+from collections import defaultdict, deque
+from typing import Awaitable, Callable, Optional
+
+
+LIMITE_RPM = float(os.getenv('LLM_RPM', '2000'))
+LIMITE_TPM = float(os.getenv('LLM_TPM', '4000000'))
+CONCURRENCIA_INICIAL = int(os.getenv('LLM_CONCURRENCIA_INICIAL', '16'))
+CONCURRENCIA_MINIMA = 1
+MAX_REINTENTOS = int(os.getenv('LLM_MAX_REINTENTOS', '5'))
+BACKOFF_BASE = 1.0
+BACKOFF_MAXIMO = 60.0
+# Factor por el que se multiplica el límite de concurrencia al recibir un 429.
+FACTOR_REDUCCION = 0.5
+# Plazo máximo de cada llamada individual al LLM (segundos).
+TIMEOUT_LLAMADA = float(os.getenv('LLM_TIMEOUT', '35'))
+# Cobertura ("hedging"): si una llamada tarda más que este percentil de las latencias
+# observadas, se lanza una copia y se usa la primera respuesta que llegue.
+PERCENTIL_COBERTURA = 0.95
+MIN_MUESTRAS_COBERTURA = 20
+MAX_FRACCION_COBERTURAS = 0.1
+# Clases de prioridad del presupuesto compartido (menor = antes): las re-evaluaciones de
+# un solo candidato adelantan a las re-evaluaciones de puestos y estas a las masivas.
+PRIORIDAD_INTERACTIVA = 0
+PRIORIDAD_NORMAL = 1
+PRIORIDAD_MASIVA = 2
+
+
+class LLMFallido(Exception):
+    """La llamada al LLM no tuvo éxito tras agotar los reintentos."""
+
+    def __init__(self, mensaje: str, intentos: int, ultimo_error: Exception = None):
+        super().__init__(mensaje)
+        self.intentos = intentos
+        self.ultimo_error = ultimo_error
+
+
+class PlazoAgotado(LLMFallido):
+    """Se agotó el plazo global de la ejecución antes de obtener respuesta."""
+
+
+# Mensajes de limitación de los clientes que no exponen el código HTTP: el código al
+# principio del mensaje ("429 Resource exhausted") o el texto de cuota agotada. No basta
+# con que aparezca "429" en cualquier parte (p. ej. "column 4290" de un JSON corrupto).
+_PATRON_LIMITACION = re.compile(r'^\s*429\b|resource (has been )?exhausted|too many requests|rate limit', re.IGNORECASE)
+
+
+def es_limitacion(error: Exception) -> bool:
+    """¿El proveedor nos está limitando (HTTP 429 / cuota agotada)?"""
+    if isinstance(error, json.JSONDecodeError):
+        return False
+    codigo = getattr(error, 'code', None) or getattr(error, 'status_code', None)
+    nombre = type(error).__name__
+    if codigo == 429 or nombre in ('ResourceExhausted', 'TooManyRequests', 'RateLimitError'):
+        return True
+    # El texto solo se mira si el error no trae código propio.
+    return codigo is None and bool(_PATRON_LIMITACION.search(str(error)))
+
+
+def es_transitorio(error: Exception) -> bool:
+    """Errores que merece la pena reintentar: caídas del servicio, timeouts, red o JSON corrupto."""
+    if es_limitacion(error):
+        return True
+    if isinstance(error, (asyncio.TimeoutError, ConnectionError, json.JSONDecodeError)):
+        return True
+    codigo = getattr(error, 'code', None) or getattr(error, 'status_code', None)
+    nombre = type(error).__name__
+    return codigo in (500, 502, 503, 504) or nombre in (
+        'ServiceUnavailable', 'DeadlineExceeded', 'InternalServerError', 'APIConnectionError', 'APITimeoutError'
+    )
+
+
+class CuboTokens:
+    """Cubo de tokens que se rellena de forma continua a razón de `por_minuto` unidades."""
+
+    def __init__(self, por_minuto: float):
+        self.capacidad = por_minuto
+        self.tasa = por_minuto / 60.0
+        self.disponibles = por_minuto
+        self.actualizado = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _rellenar(self):
+        ahora = time.monotonic()
+        self.disponibles = min(self.capacidad, self.disponibles + (ahora - self.actualizado) * self.tasa)
+        self.actualizado = ahora
+
+    async def adquirir(self, cantidad: float = 1.0):
+        # Una petición mayor que el cubo entero solo tiene que esperar a que esté lleno.
+        cantidad = min(cantidad, self.capacidad)
+        async with self._lock:
+            while True:
+                self._rellenar()
+                if self.disponibles >= cantidad:
+                    self.disponibles -= cantidad
+                    return
+                await asyncio.sleep((cantidad - self.disponibles) / self.tasa)
+
+    def intentar_adquirir(self, cantidad: float = 1.0) -> bool:
+        """Como adquirir, pero sin esperar: solo toma la cantidad si ya está disponible y nadie espera."""
+        cantidad = min(cantidad, self.capacidad)
+        if self._lock.locked():
+            return False
+        self._rellenar()
+        if self.disponibles < cantidad:
+            return False
+        self.disponibles -= cantidad
+        return True
+
+    def devolver(self, cantidad: float = 1.0):
+        """Devuelve al cubo una cantidad tomada que no se llegó a usar."""
+        self.disponibles = min(self.capacidad, self.disponibles + min(cantidad, self.capacidad))
+
+
+class LimiteAdaptativo:
+    """
+    Límite de concurrencia AIMD: crece en 1 por cada `limite` éxitos (aumento aditivo)
+    y se multiplica por FACTOR_REDUCCION con cada limitación del proveedor.
+    """
+
+    def __init__(self, inicial: int, minimo: int, maximo: int):
+        self.minimo = minimo
+        self.maximo = maximo
+        self.limite = float(max(minimo, min(inicial, maximo)))
+        self.en_vuelo = 0
+        self._condicion = asyncio.Condition()
+
+    async def __aenter__(self):
+        async with self._condicion:
+            await self._condicion.wait_for(lambda: self.en_vuelo < int(self.limite))
+            self.en_vuelo += 1
+        return self
+
+    async def __aexit__(self, *exc):
+        async with self._condicion:
+            self.en_vuelo -= 1
+            self._condicion.notify_all()
+
+    def exito(self):
+        self.limite = min(self.maximo, self.limite + 1.0 / self.limite)
+
+    def limitacion(self):
+        self.limite = max(self.minimo, self.limite * FACTOR_REDUCCION)
+
+
+class RepartoJusto(LimiteAdaptativo):
+    """
+    Límite de concurrencia AIMD compartido por varios clientes (los puestos en
+    evaluación). Cuando no hay hueco, las esperas se atienden por clase de prioridad
+    (estricta: una clase solo recibe huecos si las anteriores no esperan) y, dentro de
+    cada clase, primero al cliente con menos llamadas en vuelo, en turno rotatorio, de
+    modo que los puestos activos se reparten el límite a partes iguales.
+    """
+
+    def __init__(self, inicial: int, minimo: int, maximo: int):
+        super().__init__(inicial, minimo, maximo)
+        self.en_vuelo_cliente = defaultdict(int)
+        self._esperas = {}
+
+    def _hay_esperas(self) -> bool:
+        return any(cola for clientes in self._esperas.values() for cola in clientes.values())
+
+    def _conceder(self, cliente: str):
+        self.en_vuelo += 1
+        self.en_vuelo_cliente[cliente] += 1
+
+    def _siguiente(self):
+        for prioridad in sorted(self._esperas):
+            clientes = self._esperas[prioridad]
+            pendientes = [cliente for cliente, cola in clientes.items() if cola]
+            if not pendientes:
+                del self._esperas[prioridad]
+                continue
+            # min() se queda con el primero en caso de empate y el cliente atendido pasa
+            # al final del diccionario: turno rotatorio entre los que van igual.
+            cliente = min(pendientes, key=lambda c: self.en_vuelo_cliente[c])
+            cola = clientes.pop(cliente)
+            espera = cola.popleft()
+            if cola:
+                clientes[cliente] = cola
+            return cliente, espera
+        return None
+
+    def _despachar(self):
+        while self.en_vuelo < int(self.limite):
+            siguiente = self._siguiente()
+            if siguiente is None:
+                return
+            cliente, espera = siguiente
+            self._conceder(cliente)
+            espera.set_result(None)
+
+    async def adquirir(self, cliente: str = '', prioridad: int = PRIORIDAD_NORMAL):
+        if self.en_vuelo < int(self.limite) and not self._hay_esperas():
+            self._conceder(cliente)
+            return
+        espera = asyncio.get_running_loop().create_future()
+        self._esperas.setdefault(prioridad, {}).setdefault(cliente, deque()).append(espera)
+        try:
+            await espera
+        except asyncio.CancelledError:
+            if espera.cancelled():
+                cola = self._esperas.get(prioridad, {}).get(cliente)
+                if cola and espera in cola:
+                    cola.remove(espera)
+            else:
+                # El hueco llegó a concederse justo antes de la cancelación.
+                self.liberar(cliente)
+            raise
+
+    def intentar_adquirir(self, cliente: str = '') -> bool:
+        """Ocupa un hueco solo si lo hay ya y nadie espera (p. ej. para una cobertura)."""
+        if self.en_vuelo < int(self.limite) and not self._hay_esperas():
+            self._conceder(cliente)
+            return True
+        return False
+
+    def liberar(self, cliente: str = ''):
+        self.en_vuelo -= 1
+        self.en_vuelo_cliente[cliente] -= 1
+        if not self.en_vuelo_cliente[cliente]:
+            del self.en_vuelo_cliente[cliente]
+        self._despachar()
+
+    def ranura(self, cliente: str = '', prioridad: int = PRIORIDAD_NORMAL):
+        """Context manager asíncrono que ocupa un hueco durante la llamada."""
+        return _Ranura(self, cliente, prioridad)
+
+    async def __aenter__(self):
+        await self.adquirir()
+        return self
+
+    async def __aexit__(self, *exc):
+        self.liberar()
+
+    def exito(self):
+        super().exito()
+        self._despachar()
+
+    def metricas(self) -> dict:
+        return {
+            "limite_concurrencia": round(self.limite, 2),
+            "en_vuelo": self.en_vuelo,
+            "en_vuelo_por_cliente": dict(self.en_vuelo_cliente),
+            "esperando_por_prioridad": {
+                prioridad: sum(len(cola) for cola in clientes.values()) for prioridad, clientes in self._esperas.items()
+            }
+        }
+
+
+class _Ranura:
+    def __init__(self, reparto: RepartoJusto, cliente: str, prioridad: int):
+        self.reparto = reparto
+        self.cliente = cliente
+        self.prioridad = prioridad
+
+    async def __aenter__(self):
+        await self.reparto.adquirir(self.cliente, self.prioridad)
+        return self
+
+    async def __aexit__(self, *exc):
+        self.reparto.liberar(self.cliente)
+
+
+class PresupuestoLLM:
+    """
+    Límites de uso del LLM que pueden compartir varios planificadores: cubos de
+    peticiones (RPM) y tokens (TPM) por minuto y el reparto de la concurrencia.
+    Sus primitivas son de asyncio, así que solo debe usarse desde un mismo bucle de
+    eventos (el del servicio de evaluación, servicio_evaluacion.py).
+    """
+
+    def __init__(self, rpm: float = LIMITE_RPM, tpm: float = LIMITE_TPM,
+                 concurrencia_inicial: int = CONCURRENCIA_INICIAL, concurrencia_maxima: int = 70):
+        self.cubo_peticiones = CuboTokens(rpm)
+        self.cubo_tokens = CuboTokens(tpm)
+        self.concurrencia = RepartoJusto(concurrencia_inicial, CONCURRENCIA_MINIMA, concurrencia_maxima)
+
+    def metricas(self) -> dict:
+        metricas = self.concurrencia.metricas()
+        metricas.update({
+            "peticiones_disponibles": round(self.cubo_peticiones.disponibles, 1),
+            "tokens_disponibles": round(self.cubo_tokens.disponibles)
+        })
+        return metricas
+
+
+# Presupuesto, cliente y prioridad que usan los planificadores creados en el contexto
+# actual. El servicio de evaluación lo fija en cada ejecución que lanza; fuera de él
+# (benchmarks, scripts) cada planificador tiene su propio presupuesto.
+ASIGNACION_PRESUPUESTO = contextvars.ContextVar('asignacion_presupuesto_llm', default=None)
+
+
+class PlanificadorLLM:
+    """
+    Planificador de llamadas al LLM: respeta los límites de peticiones (RPM) y tokens
+    (TPM) por minuto, adapta la concurrencia con AIMD y reintenta los errores
+    transitorios con backoff exponencial con jitter. Cada intento tiene un plazo
+    propio, las llamadas rezagadas se cubren con una segunda petición y, si se fija
+    `fecha_limite`, ninguna llamada se alarga más allá del plazo global de la ejecución.
+    Es agnóstico del cliente: recibe una corrutina sin argumentos, por lo que puede
+    probarse con un modelo falso local.
+    """
+
+    def __init__(self, rpm: float = LIMITE_RPM, tpm: float = LIMITE_TPM,
+                 concurrencia_inicial: int = CONCURRENCIA_INICIAL, concurrencia_maxima: int = 70,
+                 max_reintentos: int = MAX_REINTENTOS, backoff_base: float = BACKOFF_BASE,
+                 backoff_maximo: float = BACKOFF_MAXIMO, timeout_llamada: float = TIMEOUT_LLAMADA,
+                 cobertura: bool = True, fecha_limite: Optional[float] = None,
+                 presupuesto: Optional[PresupuestoLLM] = None, cliente: str = '', prioridad: int = PRIORIDAD_NORMAL):
+        """
+        Args:
+            timeout_llamada (float): Plazo de cada intento individual, en segundos.
+            cobertura (bool): Activa las peticiones de cobertura para las rezagadas.
+            fecha_limite (float, opcional): Instante (time.monotonic()) en que vence
+                                            el plazo global de la ejecución.
+            presupuesto (PresupuestoLLM, opcional): Límites compartidos con otros planificadores.
+                                                    Por defecto, el de ASIGNACION_PRESUPUESTO
+                                                    o, si no hay, uno propio con rpm, tpm y
+                                                    concurrencia_inicial/maxima.
+            cliente (str): Nombre con el que se reparte el presupuesto (el puesto).
+            prioridad (int): Clase de prioridad en el presupuesto (PRIORIDAD_*).
+        """
+        asignacion = ASIGNACION_PRESUPUESTO.get()
+        if presupuesto is None and asignacion is not None:
+            presupuesto, cliente, prioridad = asignacion
+        self.presupuesto = presupuesto or PresupuestoLLM(rpm, tpm, concurrencia_inicial, concurrencia_maxima)
+        self.cliente = cliente
+        self.prioridad = prioridad
+        self.cubo_peticiones = self.presupuesto.cubo_peticiones
+        self.cubo_tokens = self.presupuesto.cubo_tokens
+        self.concurrencia = self.presupuesto.concurrencia
+        self.max_reintentos = max_reintentos
+        self.backoff_base = backoff_base
+        self.backoff_maximo = backoff_maximo
+        self.timeout_llamada = timeout_llamada
+        self.cobertura = cobertura
+        self.fecha_limite = fecha_limite
+        self._latencias = deque(maxlen=500)
+        self._metricas = {"llamadas": 0, "exitos": 0, "reintentos": 0, "limitaciones": 0, "fallos": 0,
+                          "timeouts": 0, "coberturas": 0, "coberturas_ganadoras": 0, "coberturas_omitidas": 0,
+                          "plazos_agotados": 0}
+
+    def _espera(self, intento: int) -> float:
+        # Backoff exponencial con "full jitter".
+        return random.uniform(0, min(self.backoff_maximo, self.backoff_base * (2 ** intento)))
+
+    def tiempo_restante(self) -> Optional[float]:
+        """Segundos que quedan del plazo global (None si no hay plazo)."""
+        if self.fecha_limite is None:
+            return None
+        return self.fecha_limite - time.monotonic()
+
+    def plazo_agotado(self) -> bool:
+        restante = self.tiempo_restante()
+        return restante is not None and restante <= 0
+
+    def _umbral_cobertura(self) -> Optional[float]:
+        """Latencia a partir de la cual se lanza una petición de cobertura."""
+        if not self.cobertura or len(self._latencias) < MIN_MUESTRAS_COBERTURA:
+            return None
+        if self._metricas["coberturas"] >= MAX_FRACCION_COBERTURAS * max(self._metricas["llamadas"], 1):
+            return None
+        cuantiles = statistics.quantiles(self._latencias, n=100)
+        return cuantiles[int(PERCENTIL_COBERTURA * 100) - 1]
+
+    def _reservar_cobertura(self, tokens_estimados: int) -> bool:
+        """
+        Reserva para una petición de cobertura lo mismo que una llamada normal (hueco de
+        concurrencia, petición y tokens), sin esperar: si algo no está disponible ya, no
+        se reserva nada y la llamada sigue sin cobertura. Así las coberturas nunca
+        superan los límites del presupuesto.
+        """
+        if not self.concurrencia.intentar_adquirir(self.cliente):
+            return False
+        if self.cubo_peticiones.intentar_adquirir(1):
+            if not tokens_estimados or self.cubo_tokens.intentar_adquirir(tokens_estimados):
+                return True
+            self.cubo_peticiones.devolver(1)
+        self.concurrencia.liberar(self.cliente)
+        return False
+
+    async def _llamar_con_plazo(self, llamada: Callable[[], Awaitable], plazo: float, tokens_estimados: int = 0):
+        """
+        Ejecuta una llamada con un plazo máximo. Si supera el umbral de cobertura y el
+        presupuesto tiene hueco, lanza una segunda petición idéntica y devuelve la
+        primera respuesta correcta.
+        """
+        inicio = time.monotonic()
+        umbral = self._umbral_cobertura()
+        primera = asyncio.ensure_future(llamada())
+        tareas = {primera}
+        cubierta = False
+        reservada = False
+        ultimo_error = None
+        try:
+            while tareas:
+                restante = plazo - (time.monotonic() - inicio)
+                if restante <= 0:
+                    raise asyncio.TimeoutError()
+                espera = restante
+                if not cubierta and umbral is not None:
+                    espera = min(restante, max(umbral - (time.monotonic() - inicio), 0))
+                hechas, tareas = await asyncio.wait(tareas, timeout=espera, return_when=asyncio.FIRST_COMPLETED)
+                for tarea in hechas:
+                    if tarea.exception() is None:
+                        if cubierta and tarea is not primera:
+                            self._metricas["coberturas_ganadoras"] += 1
+                        self._latencias.append(time.monotonic() - inicio)
+                        return tarea.result()
+                    ultimo_error = tarea.exception()
+                if not hechas and not cubierta and umbral is not None and plazo - (time.monotonic() - inicio) > 0:
+                    # La llamada es una rezagada: se lanza la cobertura si cabe en el presupuesto.
+                    cubierta = True
+                    reservada = self._reservar_cobertura(tokens_estimados)
+                    if reservada:
+                        self._metricas["coberturas"] += 1
+                        tareas.add(asyncio.ensure_future(llamada()))
+                    else:
+                        self._metricas["coberturas_omitidas"] += 1
+            raise ultimo_error
+        finally:
+            for tarea in tareas:
+                tarea.cancel()
+            if reservada:
+                self.concurrencia.liberar(self.cliente)
+
+    async def ejecutar(self, llamada: Callable[[], Awaitable], tokens_estimados: int = 0):
+        """
+        Ejecuta `llamada()` respetando los límites y reintentando si procede.
+        Lanza LLMFallido si no se consigue una respuesta válida, o PlazoAgotado si
+        vence el plazo global de la ejecución.
+        """
+        ultimo_error = None
+        for intento in range(self.max_reintentos + 1):
+            if self.plazo_agotado():
+                self._metricas["plazos_agotados"] += 1
+                raise PlazoAgotado(f"Plazo de la ejecución agotado tras {intento} intentos", intento, ultimo_error)
+            # El hueco se reserva antes que la cuota: así el orden de prioridad del reparto
+            # es también el orden en que se consumen peticiones y tokens.
+            async with self.concurrencia.ranura(self.cliente, self.prioridad):
+                await self.cubo_peticiones.adquirir(1)
+                if tokens_estimados:
+                    await self.cubo_tokens.adquirir(tokens_estimados)
+                self._metricas["llamadas"] += 1
+                restante = self.tiempo_restante()
+                plazo = self.timeout_llamada if restante is None else max(min(self.timeout_llamada, restante), 0)
+                try:
+                    resultado = await self._llamar_con_plazo(llamada, plazo, tokens_estimados)
+                except Exception as e:
+                    ultimo_error = e
+                    if isinstance(e, asyncio.TimeoutError):
+                        self._metricas["timeouts"] += 1
+                    elif es_limitacion(e):
+                        self._metricas["limitaciones"] += 1
+                        self.concurrencia.limitacion()
+                    elif not es_transitorio(e):
+                        self._metricas["fallos"] += 1
+                        raise LLMFallido(f"Error no recuperable del LLM: {e}", intento + 1, e) from e
+                else:
+                    self._metricas["exitos"] += 1
+                    self.concurrencia.exito()
+                    return resultado
+            if intento < self.max_reintentos:
+                self._metricas["reintentos"] += 1
+                espera = self._espera(intento)
+                restante = self.tiempo_restante()
+                await asyncio.sleep(espera if restante is None else max(min(espera, restante), 0))
+        self._metricas["fallos"] += 1
+        raise LLMFallido(f"El LLM falló tras {self.max_reintentos + 1} intentos: {ultimo_error!r}",
+                         self.max_reintentos + 1, ultimo_error)
+
+    def metricas(self) -> dict:
+        metricas = dict(self._metricas)
+        metricas.update({
+            "limite_concurrencia": round(self.concurrencia.limite, 2),
+            "en_vuelo": self.concurrencia.en_vuelo_cliente.get(self.cliente, 0)
+        })
+        if len(self._latencias) >= 2:
+            cuantiles = statistics.quantiles(self._latencias, n=100)
+            metricas.update({"latencia_p50_s": round(cuantiles[49], 3), "latencia_p95_s": round(cuantiles[94], 3)})
+        return metricas
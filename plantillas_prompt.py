@@ -0,0 +1,401 @@
+import json
+import os
+from typing import NamedTuple
+
+
+# Versión de la plantilla del prompt de evaluación. Forma parte de la huella de cada
+# evaluación, así que cambiarla obliga a re-evaluar a los candidatos del puesto.
+#   "1": prompt original, con los datos del candidato en medio y JSON indentado.
+#   "2": prefijo estático (instrucciones + requisitos) primero y JSON compacto.
+VERSION_PLANTILLA = os.getenv('PROMPT_TEMPLATE_VERSION', '2')
+
+# Campos del JSON 'Otros' del candidato que usa la evaluación (plantilla 2).
+CAMPOS_CANDIDATO = [
+    campo.strip() for campo in os.getenv(
+        'PROMPT_CANDIDATE_FIELDS', 'trayectoria_profesional,formacion,competencias_tecnicas,soft_skills,idiomas,miscelanea'
+    ).split(',') if campo.strip()
+]
+
+
+class PromptEvaluacion(NamedTuple):
+    """Prompt dividido en el prefijo común a toda la ejecución y la parte propia de la llamada."""
+    prefijo: str
+    sufijo: str
+
+    @property
+    def texto(self) -> str:
+        return self.prefijo + self.sufijo
+
+
+def estimar_tokens(texto: str) -> int:
+    """Estimación aproximada de tokens (≈4 caracteres por token)."""
+    return len(texto) // 4
+
+
+def json_compacto(datos) -> str:
+    return json.dumps(datos, ensure_ascii=False, separators=(',', ':'))
+
+
+# --- Plantilla 1 (prompt original) ---
+
+def _prompt_individual_v1(id, candidato_json, requisitos: dict, perfil_evaluador: str, evaluadores: dict) -> str:
+    """Prompt original de evaluación de un candidato por un perfil evaluador."""
+    candidato_str = json.dumps(candidato_json, indent=2, ensure_ascii=False)
+    requisitos_str = json.dumps(requisitos, indent=2, ensure_ascii=False)
+    requisitos_block = f"```json\n{requisitos_str}\n```"
+    candidato_block = f"```json\n{candidato_str}\n```"
+    
+    return f"""
+        **Tu perspectiva como evaluador**
+        {evaluadores[perfil_evaluador]}
+
+        Evalúa al siguiente candidato para el puesto definido en los requisitos, basándote **únicamente** en la información de su perfil en formato JSON.
+
+        **Requisitos del Puesto:**
+        {requisitos_block}
+
+        **Perfil del Candidato (JSON):**
+        {candidato_block}
+
+        **Tu Tarea:**
+        1.  Realiza un análisis siguiendo el **orden estricto de importancia**.
+        2.  **Genera 5 preguntas de entrevista** diseñadas para profundizar en las áreas más débiles o dudosas que hayas identificado en tu análisis.
+        3.  Devuelve toda tu evaluación en el formato JSON requerido.
+
+        **Orden de Análisis Obligatorio:**
+        1.  **Experiencia Profesional (`trayectoria_profesional`):** El factor más crítico.
+        2.  **Formación (`formacion`):** Segundo factor más importante.
+        3.  **Competencias Técnicas (`competencias_tecnicas`):** Evalúa el nivel de las competencias.
+        4.  **Soft Skills (`soft_skills`):** El factor de menor peso.
+
+        **Formato JSON de Salida Requerido:**
+        1.  `id_candidato`: El ID del candidato {id}.
+        2.  `perfil_evaluador`: El perfil del evaluador utilizado {perfil_evaluador}.
+        3.  `razonamiento_paso_a_paso`: Un texto donde analizas al candidato **siguiendo los 4 puntos del orden de análisis obligatorio**.
+        4.  `puntuaciones_parciales`: Un objeto JSON con una puntuación de 0 a 100 para cada categoría. Ejemplo: {{"experiencia": 80, "formacion": 90, "skills_tecnicas": 70, "soft_skills": 80}}
+        5.  `justificacion`: Un resumen breve (máximo 3 frases) de tu evaluación.
+        6.  `match_soft_skills`: Para cada habilidad, evalúa el nivel de evidencia en el texto y asigna una calificación: 'A' (evidencia mínima), 'B' (evidencia moderada), 'C' (evidencia sólida), 'D' (evidencia muy fuerte y demostrada). Si la habilidad no se menciona en absoluto, usa el valor 'A'.
+        7.  `match_skills_tecnicas`: Para cada habilidad, evalúa el nivel de evidencia en el texto y asigna una calificación: 'A' (evidencia mínima), 'B' (evidencia moderada), 'C' (evidencia sólida), 'D' (evidencia muy fuerte y demostrada). Si la habilidad no se menciona en absoluto, usa el valor 'A'.
+        8.  `preguntas_entrevista`: Una lista de 5 preguntas en formato string.
+
+        **Reglas Críticas de Puntuación:**
+        - **0-25 (Candidato Irrelevante):** Si la experiencia Y la formación son de un campo completamente diferente.
+        - **26-50 (Candidato Poco Relevante):** Si tiene la formación base pero carece de experiencia práctica y skills críticas.
+        - **51-75 (Candidato Viable):** Si demuestra buena alineación en formación O en experiencia, con algunas carencias en skills.
+        - **76-100 (Candidato Fuerte):** Si muestra fuerte alineación en experiencia Y formación, y domina la mayoría de skills.
+        **Reglas Críticas de Formato:**
+        - La salida debe ser **únicamente un objeto JSON válido** y nada más.
+        - No incluyas comentarios, texto introductorio o final fuera del bloque JSON.
+        - Asegúrate de que todos los campos estén separados por comas.
+        - Escapa correctamente todos los caracteres especiales dentro de los strings, como saltos de línea (usando \\n) o comillas dobles (usando \\\").
+    """
+
+
+def _prompt_lote_v1(candidatos: list, requisitos: dict, perfil_evaluador: str, evaluadores: dict) -> str:
+    """
+    Prompt de evaluación de varios candidatos por un mismo perfil evaluador. Las
+    instrucciones y los requisitos se envían una sola vez para todo el lote.
+    """
+    candidatos_str = json.dumps(
+        [{"id_candidato": id_candidato, "perfil": datos} for id_candidato, datos in candidatos],
+        indent=2, ensure_ascii=False
+    )
+    requisitos_str = json.dumps(requisitos, indent=2, ensure_ascii=False)
+    requisitos_block = f"```json\n{requisitos_str}\n```"
+    candidatos_block = f"```json\n{candidatos_str}\n```"
+
+    return f"""
+        **Tu perspectiva como evaluador**
+        {evaluadores[perfil_evaluador]}
+
+        Evalúa a **cada uno** de los siguientes {len(candidatos)} candidatos para el puesto definido en los requisitos, de forma **independiente** (no los compares entre sí), basándote **únicamente** en la información de su perfil en formato JSON.
+
+        **Requisitos del Puesto:**
+        {requisitos_block}
+
+        **Perfiles de los Candidatos (lista JSON, cada uno con su `id_candidato`):**
+        {candidatos_block}
+
+        **Tu Tarea (para cada candidato):**
+        1.  Realiza un análisis siguiendo el **orden estricto de importancia**.
+        2.  **Genera 5 preguntas de entrevista** diseñadas para profundizar en las áreas más débiles o dudosas que hayas identificado en tu análisis.
+        3.  Devuelve su evaluación en el formato JSON requerido.
+
+        **Orden de Análisis Obligatorio:**
+        1.  **Experiencia Profesional (`trayectoria_profesional`):** El factor más crítico.
+        2.  **Formación (`formacion`):** Segundo factor más importante.
+        3.  **Competencias Técnicas (`competencias_tecnicas`):** Evalúa el nivel de las competencias.
+        4.  **Soft Skills (`soft_skills`):** El factor de menor peso.
+
+        **Formato JSON de Salida Requerido:**
+        Un objeto `{{"evaluaciones": [...]}}` cuyo array contiene **exactamente un objeto por candidato**, con estos campos:
+        1.  `id_candidato`: El ID del candidato evaluado, tal como aparece en su perfil.
+        2.  `perfil_evaluador`: El perfil del evaluador utilizado {perfil_evaluador}.
+        3.  `razonamiento_paso_a_paso`: Un texto donde analizas al candidato **siguiendo los 4 puntos del orden de análisis obligatorio**.
+        4.  `puntuaciones_parciales`: Un objeto JSON con una puntuación de 0 a 100 para cada categoría. Ejemplo: {{"experiencia": 80, "formacion": 90, "skills_tecnicas": 70, "soft_skills": 80}}
+        5.  `justificacion`: Un resumen breve (máximo 3 frases) de tu evaluación.
+        6.  `match_soft_skills`: Para cada habilidad, evalúa el nivel de evidencia en el texto y asigna una calificación: 'A' (evidencia mínima), 'B' (evidencia moderada), 'C' (evidencia sólida), 'D' (evidencia muy fuerte y demostrada). Si la habilidad no se menciona en absoluto, usa el valor 'A'.
+        7.  `match_skills_tecnicas`: Para cada habilidad, evalúa el nivel de evidencia en el texto y asigna una calificación: 'A' (evidencia mínima), 'B' (evidencia moderada), 'C' (evidencia sólida), 'D' (evidencia muy fuerte y demostrada). Si la habilidad no se menciona en absoluto, usa el valor 'A'.
+        8.  `preguntas_entrevista`: Una lista de 5 preguntas en formato string.
+
+        **Reglas Críticas de Puntuación:**
+        - **0-25 (Candidato Irrelevante):** Si la experiencia Y la formación son de un campo completamente diferente.
+        - **26-50 (Candidato Poco Relevante):** Si tiene la formación base pero carece de experiencia práctica y skills críticas.
+        - **51-75 (Candidato Viable):** Si demuestra buena alineación en formación O en experiencia, con algunas carencias en skills.
+        - **76-100 (Candidato Fuerte):** Si muestra fuerte alineación en experiencia Y formación, y domina la mayoría de skills.
+        **Reglas Críticas de Formato:**
+        - La salida debe ser **únicamente un objeto JSON válido** y nada más.
+        - No incluyas comentarios, texto introductorio o final fuera del bloque JSON.
+        - Asegúrate de que todos los campos estén separados por comas.
+        - Escapa correctamente todos los caracteres especiales dentro de los strings, como saltos de línea (usando \\n) o comillas dobles (usando \\\").
+    """
+
+
+def _prompt_multiperfil_v1(id, candidato_json, requisitos: dict, perfiles: list, evaluadores: dict) -> str:
+    """
+    Prompt que pide en una sola respuesta la evaluación del candidato desde cada uno
+    de los `perfiles` evaluadores, cada una con la misma forma que la individual.
+    """
+    perfiles_str = json.dumps(
+        [{"perfil_evaluador": perfil, "perspectiva": evaluadores[perfil]} for perfil in perfiles],
+        indent=2, ensure_ascii=False
+    )
+    candidato_str = json.dumps(candidato_json, indent=2, ensure_ascii=False)
+    requisitos_str = json.dumps(requisitos, indent=2, ensure_ascii=False)
+    perfiles_block = f"```json\n{perfiles_str}\n```"
+    requisitos_block = f"```json\n{requisitos_str}\n```"
+    candidato_block = f"```json\n{candidato_str}\n```"
+
+    return f"""
+        **Tus perspectivas como evaluadores**
+        Vas a evaluar al candidato {len(perfiles)} veces, una por cada uno de estos perfiles evaluadores. Adopta **por separado** la perspectiva de cada perfil: cada evaluación debe ser independiente y reflejar únicamente el enfoque de su perfil.
+        {perfiles_block}
+
+        Evalúa al siguiente candidato para el puesto definido en los requisitos, basándote **únicamente** en la información de su perfil en formato JSON.
+
+        **Requisitos del Puesto:**
+        {requisitos_block}
+
+        **Perfil del Candidato (JSON):**
+        {candidato_block}
+
+        **Tu Tarea (para cada perfil evaluador):**
+        1.  Realiza un análisis siguiendo el **orden estricto de importancia**.
+        2.  **Genera 5 preguntas de entrevista** diseñadas para profundizar en las áreas más débiles o dudosas que hayas identificado en tu análisis.
+        3.  Devuelve la evaluación en el formato JSON requerido.
+
+        **Orden de Análisis Obligatorio:**
+        1.  **Experiencia Profesional (`trayectoria_profesional`):** El factor más crítico.
+        2.  **Formación (`formacion`):** Segundo factor más importante.
+        3.  **Competencias Técnicas (`competencias_tecnicas`):** Evalúa el nivel de las competencias.
+        4.  **Soft Skills (`soft_skills`):** El factor de menor peso.
+
+        **Formato JSON de Salida Requerido:**
+        Un objeto `{{"evaluaciones": [...]}}` cuyo array contiene **exactamente un objeto por perfil evaluador**, con estos campos:
+        1.  `id_candidato`: El ID del candidato {id}.
+        2.  `perfil_evaluador`: El nombre exacto del perfil evaluador, tal como aparece en la lista de perfiles.
+        3.  `razonamiento_paso_a_paso`: Un texto donde analizas al candidato **siguiendo los 4 puntos del orden de análisis obligatorio**.
+        4.  `puntuaciones_parciales`: Un objeto JSON con una puntuación de 0 a 100 para cada categoría. Ejemplo: {{"experiencia": 80, "formacion": 90, "skills_tecnicas": 70, "soft_skills": 80}}
+        5.  `justificacion`: Un resumen breve (máximo 3 frases) de tu evaluación.
+        6.  `match_soft_skills`: Para cada habilidad, evalúa el nivel de evidencia en el texto y asigna una calificación: 'A' (evidencia mínima), 'B' (evidencia moderada), 'C' (evidencia sólida), 'D' (evidencia muy fuerte y demostrada). Si la habilidad no se menciona en absoluto, usa el valor 'A'.
+        7.  `match_skills_tecnicas`: Para cada habilidad, evalúa el nivel de evidencia en el texto y asigna una calificación: 'A' (evidencia mínima), 'B' (evidencia moderada), 'C' (evidencia sólida), 'D' (evidencia muy fuerte y demostrada). Si la habilidad no se menciona en absoluto, usa el valor 'A'.
+        8.  `preguntas_entrevista`: Una lista de 5 preguntas en formato string.
+
+        **Reglas Críticas de Puntuación:**
+        - **0-25 (Candidato Irrelevante):** Si la experiencia Y la formación son de un campo completamente diferente.
+        - **26-50 (Candidato Poco Relevante):** Si tiene la formación base pero carece de experiencia práctica y skills críticas.
+        - **51-75 (Candidato Viable):** Si demuestra buena alineación en formación O en experiencia, con algunas carencias en skills.
+        - **76-100 (Candidato Fuerte):** Si muestra fuerte alineación en experiencia Y formación, y domina la mayoría de skills.
+        **Reglas Críticas de Formato:**
+        - La salida debe ser **únicamente un objeto JSON válido** y nada más.
+        - No incluyas comentarios, texto introductorio o final fuera del bloque JSON.
+        - Asegúrate de que todos los campos estén separados por comas.
+        - Escapa correctamente todos los caracteres especiales dentro de los strings, como saltos de línea (usando \\n) o comillas dobles (usando \\\").
+    """
+
+
+# --- Plantilla 2 (prefijo estático y JSON compacto) ---
+_PREFIJO_V2 = """**Instrucciones de evaluación**
+Formas parte de un panel que evalúa candidatos para el puesto definido en los requisitos. Basa cada evaluación **únicamente** en la información del perfil del candidato en formato JSON.
+
+**Orden de Análisis Obligatorio:**
+1. **Experiencia Profesional (`trayectoria_profesional`):** El factor más crítico.
+2. **Formación (`formacion`):** Segundo factor más importante.
+3. **Competencias Técnicas (`competencias_tecnicas`):** Evalúa el nivel de las competencias.
+4. **Soft Skills (`soft_skills`):** El factor de menor peso.
+
+**Formato de cada evaluación (objeto JSON):**
+- `id_candidato`: El ID del candidato evaluado.
+- `perfil_evaluador`: El nombre exacto del perfil evaluador.
+- `razonamiento_paso_a_paso`: Un texto donde analizas al candidato **siguiendo los 4 puntos del orden de análisis obligatorio**.
+- `puntuaciones_parciales`: Una puntuación de 0 a 100 para cada categoría. Ejemplo: {{"experiencia": 80, "formacion": 90, "skills_tecnicas": 70, "soft_skills": 80}}
+- `justificacion`: Un resumen breve (máximo 3 frases) de tu evaluación.
+- `match_soft_skills` y `match_skills_tecnicas`: Para cada habilidad de los requisitos, el nivel de evidencia en el perfil: 'A' (evidencia mínima o no se menciona), 'B' (moderada), 'C' (sólida), 'D' (muy fuerte y demostrada).
+- `preguntas_entrevista`: Una lista de 5 preguntas para profundizar en las áreas más débiles o dudosas de tu análisis.
+
+**Reglas Críticas de Puntuación:**
+- **0-25 (Candidato Irrelevante):** Si la experiencia Y la formación son de un campo completamente diferente.
+- **26-50 (Candidato Poco Relevante):** Si tiene la formación base pero carece de experiencia práctica y skills críticas.
+- **51-75 (Candidato Viable):** Si demuestra buena alineación en formación O en experiencia, con algunas carencias en skills.
+- **76-100 (Candidato Fuerte):** Si muestra fuerte alineación en experiencia Y formación, y domina la mayoría de skills.
+
+**Reglas Críticas de Formato:**
+- La salida debe ser **únicamente JSON válido**, sin comentarios ni texto fuera de él.
+- Escapa correctamente los caracteres especiales dentro de los strings, como saltos de línea (usando \\n) o comillas dobles (usando \\").
+
+**Requisitos del Puesto:**
+```json
+{requisitos}
+```
+"""
+
+_SUFIJO_INDIVIDUAL_V2 = """
+**Tu perspectiva como evaluador ({perfil})**
+{perspectiva}
+
+Evalúa al candidato {id}. Devuelve un único objeto JSON con `perfil_evaluador` = "{perfil}".
+
+**Perfil del Candidato (JSON):**
+```json
+{candidato}
+```
+"""
+
+_SUFIJO_LOTE_V2 = """
+**Tu perspectiva como evaluador ({perfil})**
+{perspectiva}
+
+Evalúa a **cada uno** de los siguientes {num} candidatos de forma **independiente** (no los compares entre sí). Devuelve un objeto `{{"evaluaciones": [...]}}` con **exactamente un objeto por candidato**, cada uno con su `id_candidato` y con `perfil_evaluador` = "{perfil}".
+
+**Perfiles de los Candidatos (lista JSON):**
+```json
+{candidatos}
+```
+"""
+
+_SUFIJO_MULTIPERFIL_V2 = """
+**Perfiles evaluadores**
+Evalúa al candidato {id} una vez por cada uno de estos perfiles, adoptando **por separado** la perspectiva de cada uno: cada evaluación debe ser independiente y reflejar únicamente el enfoque de su perfil.
+```json
+{perfiles}
+```
+Devuelve un objeto `{{"evaluaciones": [...]}}` con **exactamente un objeto por perfil evaluador**.
+
+**Perfil del Candidato (JSON):**
+```json
+{candidato}
+```
+"""
+
+
+class PlantillaEvaluacion:
+    """
+    Construye los prompts de evaluación de un puesto. Se crea una vez por ejecución:
+    lo que no depende del candidato (el prefijo) se calcula en el constructor.
+    Lleva la cuenta de los tokens estimados de los prompts que construye.
+    """
+
+    version = None
+
+    def __init__(self, requisitos: dict, evaluadores: dict):
+        self.requisitos = requisitos if isinstance(requisitos, dict) else {}
+        self.evaluadores = evaluadores
+        self.prefijo = self._construir_prefijo()
+        self._contadores = {"prompts": 0, "tokens_prefijo": 0, "tokens_sufijo": 0}
+
+    def _construir_prefijo(self) -> str:
+        return ''
+
+    def preparar_candidato(self, candidato: dict) -> dict:
+        """Datos del candidato que se envían al LLM (y que entran en la huella)."""
+        return candidato
+
+    def _registrar(self, prompt: PromptEvaluacion) -> PromptEvaluacion:
+        self._contadores["prompts"] += 1
+        self._contadores["tokens_prefijo"] += estimar_tokens(prompt.prefijo)
+        self._contadores["tokens_sufijo"] += estimar_tokens(prompt.sufijo)
+        return prompt
+
+    def individual(self, id, candidato: dict, perfil_evaluador: str) -> PromptEvaluacion:
+        raise NotImplementedError
+
+    def lote(self, candidatos: list, perfil_evaluador: str) -> PromptEvaluacion:
+        raise NotImplementedError
+
+    def multiperfil(self, id, candidato: dict, perfiles: list) -> PromptEvaluacion:
+        raise NotImplementedError
+
+    def estadisticas(self) -> dict:
+        prompts = self._contadores["prompts"]
+        return {
+            "version": self.version,
+            "prompts": prompts,
+            "tokens_prefijo": estimar_tokens(self.prefijo),
+            "tokens_medios_por_prompt": round((self._contadores["tokens_prefijo"] + self._contadores["tokens_sufijo"]) / prompts, 1) if prompts else 0,
+            "tokens_medios_variables": round(self._contadores["tokens_sufijo"] / prompts, 1) if prompts else 0
+        }
+
+
+class PlantillaV1(PlantillaEvaluacion):
+    """Prompt original: sin prefijo común y con JSON indentado."""
+
+    version = "1"
+
+    def individual(self, id, candidato, perfil_evaluador):
+        return self._registrar(PromptEvaluacion('', _prompt_individual_v1(id, candidato, self.requisitos, perfil_evaluador, self.evaluadores)))
+
+    def lote(self, candidatos, perfil_evaluador):
+        return self._registrar(PromptEvaluacion('', _prompt_lote_v1(candidatos, self.requisitos, perfil_evaluador, self.evaluadores)))
+
+    def multiperfil(self, id, candidato, perfiles):
+        return self._registrar(PromptEvaluacion('', _prompt_multiperfil_v1(id, candidato, self.requisitos, perfiles, self.evaluadores)))
+
+
+class PlantillaV2(PlantillaEvaluacion):
+    """
+    Instrucciones y requisitos del puesto al principio, idénticos en todas las llamadas
+    de la ejecución (aprovechables por la caché de prefijos del proveedor), y después
+    la perspectiva del evaluador y los datos del candidato. JSON compacto y solo con
+    los campos de 'Otros' que usa la evaluación.
+    """
+
+    version = "2"
+
+    def _construir_prefijo(self):
+        return _PREFIJO_V2.format(requisitos=json_compacto(self.requisitos))
+
+    def preparar_candidato(self, candidato):
+        if not isinstance(candidato, dict):
+            return candidato
+        vacio = (None, '', [], {})
+        filtrado = {campo: candidato[campo] for campo in CAMPOS_CANDIDATO if candidato.get(campo) not in vacio}
+        # Si el JSON no sigue el esquema esperado se envía entero, sin los campos vacíos.
+        return filtrado or {campo: valor for campo, valor in candidato.items() if valor not in vacio}
+
+    def individual(self, id, candidato, perfil_evaluador):
+        return self._registrar(PromptEvaluacion(self.prefijo, _SUFIJO_INDIVIDUAL_V2.format(
+            perfil=perfil_evaluador, perspectiva=self.evaluadores[perfil_evaluador], id=id,
+            candidato=json_compacto(candidato)
+        )))
+
+    def lote(self, candidatos, perfil_evaluador):
+        return self._registrar(PromptEvaluacion(self.prefijo, _SUFIJO_LOTE_V2.format(
+            perfil=perfil_evaluador, perspectiva=self.evaluadores[perfil_evaluador], num=len(candidatos),
+            candidatos=json_compacto([{"id_candidato": id_candidato, "perfil": datos} for id_candidato, datos in candidatos])
+        )))
+
+    def multiperfil(self, id, candidato, perfiles):
+        return self._registrar(PromptEvaluacion(self.prefijo, _SUFIJO_MULTIPERFIL_V2.format(
+            id=id, candidato=json_compacto(candidato),
+            perfiles=json_compacto([{"perfil_evaluador": perfil, "perspectiva": self.evaluadores[perfil]} for perfil in perfiles])
+        )))
+
+
+PLANTILLAS = {"1": PlantillaV1, "2": PlantillaV2}
+
+
+def crear_plantilla(requisitos: dict, evaluadores: dict, version: str = VERSION_PLANTILLA) -> PlantillaEvaluacion:
+    """Crea la plantilla de la versión indicada para los requisitos de un puesto."""
+    if version not in PLANTILLAS:
+        raise ValueError(f"Versión de plantilla de prompt desconocida: {version}")
+    return PLANTILLAS[version](requisitos, evaluadores)
@@ -0,0 +1,125 @@
+import math
+import os
+import re
+from collections import Counter
+from typing import Callable, Iterable
+
+
+# Preselección local de candidatos antes de llamar al LLM. Valores por defecto para los
+# puestos sin configuración propia (PUESTOS_PREDEFINIDOS.PRESELECCION_TOP_K / _UMBRAL):
+#   top_k:  solo pasan al LLM los K candidatos más afines (0 = sin límite).
+#   umbral: afinidad mínima, relativa a la del mejor candidato (0-1, 0 = sin umbral).
+# Con los dos a 0 la preselección está desactivada y se evalúa a todos los candidatos.
+TOP_K_PRESELECCION = int(os.getenv('EVAL_PRESCREEN_TOP_K', '0'))
+UMBRAL_PRESELECCION = float(os.getenv('EVAL_PRESCREEN_THRESHOLD', '0'))
+
+# Parámetros de BM25.
+K1 = 1.2
+B = 0.75
+
+# Palabras vacías que no aportan a la afinidad (el texto ya está normalizado sin tildes).
+PALABRAS_VACIAS = {
+    'de', 'la', 'el', 'en', 'y', 'a', 'los', 'las', 'del', 'con', 'por', 'para', 'un', 'una', 'que',
+    'se', 'al', 'o', 'su', 'sus', 'como', 'mas', 'lo', 'e', 'u', 'es', 'the', 'and', 'of', 'to', 'in'
+}
+_PATRON_TOKEN = re.compile(r"[a-z0-9][a-z0-9+#]*")
+
+
+def tokenizar(texto: str, normalizar: Callable[[str], str]) -> list:
+    """Divide el texto normalizado en términos, sin palabras vacías ni letras sueltas."""
+    return [
+        token for token in _PATRON_TOKEN.findall(normalizar(texto))
+        if len(token) > 1 and token not in PALABRAS_VACIAS
+    ]
+
+
+def aplanar_texto(datos) -> str:
+    """Concatena todos los textos de una estructura JSON (dicts, listas y valores sueltos)."""
+    if isinstance(datos, dict):
+        return ' '.join(aplanar_texto(valor) for valor in datos.values())
+    if isinstance(datos, (list, tuple)):
+        return ' '.join(aplanar_texto(valor) for valor in datos)
+    return '' if datos is None else str(datos)
+
+
+def idf(num_documentos: int, frecuencia_documental: int) -> float:
+    """IDF de BM25 (siempre positivo)."""
+    return math.log(1 + (num_documentos - frecuencia_documental + 0.5) / (frecuencia_documental + 0.5))
+
+
+def peso_bm25(tf: int, longitud: int, longitud_media: float, idf_termino: float, k1: float = K1, b: float = B) -> float:
+    """Contribución de un término con frecuencia `tf` a la puntuación de un documento."""
+    return idf_termino * tf * (k1 + 1) / (tf + k1 * (1 - b + b * longitud / (longitud_media or 1)))
+
+
+def consulta_puesto(requisitos: dict) -> str:
+    """Texto de la consulta: skills técnicas requeridas y misión del puesto."""
+    return ' '.join([*requisitos.get('skills_tecnicas_requeridas', []), requisitos.get('mision') or ''])
+
+
+class IndiceBM25:
+    """
+    Índice BM25 en memoria de los candidatos frente a la consulta de un puesto. Para no
+    guardar el texto de toda la tabla, de cada candidato solo se conserva su longitud
+    y la frecuencia de los términos de la consulta.
+    """
+
+    def __init__(self, consulta: str, normalizar: Callable[[str], str], k1: float = K1, b: float = B):
+        self.normalizar = normalizar
+        self.terminos = set(tokenizar(consulta, normalizar))
+        self.k1 = k1
+        self.b = b
+        self.documentos = {}
+        self.frecuencia_documental = Counter()
+        self.longitud_total = 0
+
+    def anadir(self, id_candidato, datos_candidato):
+        tokens = tokenizar(aplanar_texto(datos_candidato), self.normalizar)
+        frecuencias = Counter(token for token in tokens if token in self.terminos)
+        self.documentos[id_candidato] = (len(tokens), frecuencias)
+        self.frecuencia_documental.update(frecuencias.keys())
+        self.longitud_total += len(tokens)
+
+    def puntuaciones(self) -> dict:
+        """Devuelve {id_candidato: puntuación BM25}."""
+        num_documentos = len(self.documentos)
+        if not num_documentos:
+            return {}
+        longitud_media = self.longitud_total / num_documentos
+        idfs = {termino: idf(num_documentos, df) for termino, df in self.frecuencia_documental.items()}
+        return {
+            id_candidato: sum(
+                peso_bm25(tf, longitud, longitud_media, idfs[termino], self.k1, self.b)
+                for termino, tf in frecuencias.items()
+            )
+            for id_candidato, (longitud, frecuencias) in self.documentos.items()
+        }
+
+
+def seleccionar(puntuaciones: dict, top_k: int = 0, umbral: float = 0) -> set:
+    """
+    Candidatos que pasan la preselección: los que alcanzan `umbral` (fracción de la
+    puntuación del mejor) y, entre ellos, como mucho los `top_k` mejores.
+    """
+    mejor = max(puntuaciones.values(), default=0)
+    candidatos = [
+        (puntuacion, id_candidato) for id_candidato, puntuacion in puntuaciones.items()
+        if not umbral or (mejor > 0 and puntuacion >= umbral * mejor)
+    ]
+    candidatos.sort(key=lambda par: par[0], reverse=True)
+    if top_k:
+        candidatos = candidatos[:top_k]
+    return {id_candidato for _, id_candidato in candidatos}
+
+
+def preseleccionar(candidatos: Iterable, requisitos: dict, normalizar: Callable[[str], str],
+                   top_k: int = TOP_K_PRESELECCION, umbral: float = UMBRAL_PRESELECCION):
+    """
+    Puntúa con BM25 los candidatos (pares (id_candidato, datos_candidato)) frente a los
+    requisitos del puesto y devuelve (admitidos, puntuaciones).
+    """
+    indice = IndiceBM25(consulta_puesto(requisitos), normalizar)
+    for id_candidato, datos_candidato in candidatos:
+        indice.anadir(id_candidato, datos_candidato)
+    puntuaciones = indice.puntuaciones()
+    return seleccionar(puntuaciones, top_k, umbral), puntuaciones
@@ -0,0 +1,112 @@
+"""
+Prueba de carga de la API.
+
+Simula N usuarios concurrentes (un hilo cada uno, sin pausas entre peticiones) que
+recorren en bucle las rutas de lectura de /api/* contra un servidor ya arrancado
+(app.run o gunicorn) durante el tiempo indicado, e informa por ruta de peticiones/s,
+latencias p50/p99 y errores. Sirve para comparar el servidor de desarrollo con
+gunicorn y para ajustar WEB_CONCURRENCY y WEB_THREADS.
+
+Uso:
+    python prueba_carga.py --url http://localhost:8000 --usuarios 50 --duracion 30
+    python prueba_carga.py --usuarios 100 --rutas /api/puestos /api/candidatos/count
+"""
+import argparse
+import json
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+
+def _parsear_argumentos():
+    parser = argparse.ArgumentParser(description="Prueba de carga de las rutas de lectura de la API.")
+    parser.add_argument('--url', default='http://localhost:8000', help="URL base del servidor.")
+    parser.add_argument('--usuarios', type=int, default=20, help="Usuarios concurrentes.")
+    parser.add_argument('--duracion', type=float, default=30.0, help="Duración de la prueba en segundos.")
+    parser.add_argument('--rutas', nargs='+', default=None,
+                        help="Rutas a probar (por defecto, las de lectura principales de /api).")
+    parser.add_argument('--timeout', type=float, default=30.0, help="Timeout de cada petición en segundos.")
+    return parser.parse_args()
+
+
+def _rutas_por_defecto(url: str, timeout: float) -> list:
+    rutas = ['/api/puestos', '/api/candidatos/count', '/api/jobs', '/api/db/pool']
+    # El ranking de candidatos necesita un puesto existente: se toma el primero con vacante.
+    try:
+        with urllib.request.urlopen(url + '/api/puestos', timeout=timeout) as respuesta:
+            puestos = json.loads(respuesta.read())
+        con_vacante = [p for p in puestos if p.get('VACANTE')] or puestos
+        if con_vacante:
+            rutas.append('/api/vacante/' + urllib.parse.quote(con_vacante[0]['id']) + '/candidatos')
+    except (urllib.error.URLError, ValueError, KeyError) as e:
+        print(f"⚠️  No se pudo obtener un puesto para el ranking de candidatos: {e}")
+    return rutas
+
+
+def _percentil(valores: list, p: float) -> float:
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))]
+
+
+def _usuario(url: str, rutas: list, indice: int, fin: float, timeout: float, resultados: dict, lock: threading.Lock):
+    # Cada usuario empieza en una ruta distinta para no sincronizar a todos sobre la misma.
+    i = indice
+    while time.perf_counter() < fin:
+        ruta = rutas[i % len(rutas)]
+        i += 1
+        inicio = time.perf_counter()
+        error = False
+        try:
+            with urllib.request.urlopen(url + ruta, timeout=timeout) as respuesta:
+                respuesta.read()
+        except (urllib.error.URLError, OSError):
+            # HTTPError (4xx/5xx) es subclase de URLError.
+            error = True
+        latencia = time.perf_counter() - inicio
+        with lock:
+            resultados[ruta]["latencias"].append(latencia)
+            resultados[ruta]["errores"] += int(error)
+
+
+def _ejecutar(args):
+    url = args.url.rstrip('/')
+    rutas = args.rutas or _rutas_por_defecto(url, args.timeout)
+    resultados = {ruta: {"latencias": [], "errores": 0} for ruta in rutas}
+    lock = threading.Lock()
+
+    print(f"🏁 {args.usuarios} usuarios concurrentes durante {args.duracion:.0f}s contra {url} ({len(rutas)} rutas).")
+    inicio = time.perf_counter()
+    fin = inicio + args.duracion
+    hilos = [threading.Thread(target=_usuario, args=(url, rutas, i, fin, args.timeout, resultados, lock), daemon=True)
+             for i in range(args.usuarios)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    duracion = time.perf_counter() - inicio
+
+    print(f"\n{'='*20} RESULTADOS POR RUTA {'='*20}")
+    todas = []
+    errores = 0
+    for ruta, datos in resultados.items():
+        latencias = datos["latencias"]
+        todas.extend(latencias)
+        errores += datos["errores"]
+        if not latencias:
+            print(f"   -> {ruta}: sin peticiones completadas")
+            continue
+        print(f"   -> {ruta:<45} {len(latencias) / duracion:7.1f} req/s | p50 {_percentil(latencias, 50) * 1000:7.1f} ms | "
+              f"p99 {_percentil(latencias, 99) * 1000:7.1f} ms | errores {datos['errores']}")
+
+    if todas:
+        print(f"\n{'='*20} TOTAL {'='*20}")
+        print(f"   -> {len(todas)} peticiones en {duracion:.1f}s | {len(todas) / duracion:.1f} req/s | "
+              f"media {statistics.mean(todas) * 1000:.1f} ms | p50 {_percentil(todas, 50) * 1000:.1f} ms | "
+              f"p99 {_percentil(todas, 99) * 1000:.1f} ms | errores {errores} ({errores / len(todas):.1%})")
+
+
+if __name__ == '__main__':
+    _ejecutar(_parsear_argumentos())
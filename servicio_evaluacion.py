@@ -0,0 +1,140 @@
+"""
+Servicio de evaluación del proceso: un hilo con un bucle de eventos propio y de larga
+duración en el que se ejecutan todas las evaluaciones de puestos.
+
+Todas las ejecuciones comparten así un único PresupuestoLLM (cuota de peticiones y
+tokens por minuto y límite global de llamadas concurrentes), repartido entre los
+puestos activos y por clase de prioridad, en lugar de que cada ejecución abra su
+propio bucle con su propio límite y entre todas superen la cuota del proveedor.
+"""
+import asyncio
+import os
+import threading
+import time
+import concurrent.futures
+from concurrent.futures import Future
+from typing import Optional
+
+from planificador_llm import (ASIGNACION_PRESUPUESTO, LIMITE_RPM, LIMITE_TPM, CONCURRENCIA_INICIAL,
+                              PRIORIDAD_NORMAL, PresupuestoLLM)
+
+
+# Llamadas concurrentes al LLM entre todas las ejecuciones del proceso.
+CONCURRENCIA_GLOBAL = int(os.getenv('LLM_GLOBAL_CONCURRENCY', '70'))
+
+
+class ServicioEvaluacion:
+    """
+    Hilo con un bucle de eventos que ejecuta corrutinas de evaluación enviadas desde
+    otros hilos (los workers de la cola de trabajos). Cada corrutina se ejecuta con el
+    presupuesto compartido asignado a su puesto y prioridad.
+    """
+
+    def __init__(self, rpm: float = LIMITE_RPM, tpm: float = LIMITE_TPM,
+                 concurrencia_inicial: int = CONCURRENCIA_INICIAL, concurrencia_maxima: int = CONCURRENCIA_GLOBAL):
+        self.presupuesto = PresupuestoLLM(rpm, tpm, concurrencia_inicial, concurrencia_maxima)
+        self._bucle = None
+        self._hilo = None
+        self._lock = threading.Lock()
+        self._en_curso = {}
+        self._tareas = set()
+        self._ejecuciones = 0
+
+    def iniciar(self):
+        """Arranca el hilo del servicio (idempotente)."""
+        with self._lock:
+            if self._hilo and self._hilo.is_alive():
+                return
+            listo = threading.Event()
+            self._hilo = threading.Thread(target=self._bucle_servicio, args=(listo,), name="cvision-evaluacion", daemon=True)
+            self._hilo.start()
+            listo.wait()
+            print(f"✅ Servicio de evaluación iniciado (concurrencia global del LLM: {self.presupuesto.concurrencia.maximo}).")
+
+    def _bucle_servicio(self, listo: threading.Event):
+        self._bucle = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._bucle)
+        listo.set()
+        try:
+            self._bucle.run_forever()
+        finally:
+            self._bucle.run_until_complete(self._bucle.shutdown_asyncgens())
+            self._bucle.close()
+
+    async def _ejecutar_con_presupuesto(self, corrutina, cliente: str, prioridad: int):
+        # La tarea tiene su propia copia del contexto: la asignación solo afecta a esta ejecución
+        # y a las subtareas que cree.
+        ASIGNACION_PRESUPUESTO.set((self.presupuesto, cliente, prioridad))
+        tarea = asyncio.current_task()
+        self._tareas.add(tarea)
+        try:
+            return await corrutina
+        finally:
+            self._tareas.discard(tarea)
+
+    def enviar(self, corrutina, cliente: str = '', prioridad: int = PRIORIDAD_NORMAL) -> Future:
+        """Programa la corrutina en el bucle del servicio y devuelve un Future de concurrent.futures."""
+        self.iniciar()
+        futuro = asyncio.run_coroutine_threadsafe(self._ejecutar_con_presupuesto(corrutina, cliente, prioridad), self._bucle)
+        with self._lock:
+            self._ejecuciones += 1
+            self._en_curso[futuro] = {"cliente": cliente, "prioridad": prioridad, "inicio": time.time()}
+        futuro.add_done_callback(self._terminada)
+        return futuro
+
+    def _terminada(self, futuro: Future):
+        with self._lock:
+            self._en_curso.pop(futuro, None)
+
+    def ejecutar(self, corrutina, cliente: str = '', prioridad: int = PRIORIDAD_NORMAL):
+        """Ejecuta la corrutina en el servicio y espera su resultado (bloquea el hilo que llama)."""
+        return self.enviar(corrutina, cliente, prioridad).result()
+
+    async def _cancelar_tareas(self, gracia: float):
+        tareas = set(self._tareas)
+        for tarea in tareas:
+            tarea.cancel()
+        if tareas:
+            await asyncio.wait(tareas, timeout=gracia)
+
+    def detener(self, timeout: Optional[float] = None, gracia: float = 10.0) -> bool:
+        """
+        Apagado ordenado: espera como máximo `timeout` segundos a que terminen las
+        ejecuciones en curso; las que no terminan se cancelan y tienen `gracia` segundos
+        para guardar su punto de control (quedan reanudables). Después para el bucle.
+        Devuelve False si hubo que cancelar alguna ejecución.
+        """
+        with self._lock:
+            pendientes = list(self._en_curso)
+        if pendientes:
+            print(f"⏳ Esperando a {len(pendientes)} ejecuciones de evaluación en curso...")
+        _, sin_terminar = concurrent.futures.wait(pendientes, timeout)
+        activo = self._bucle and self._hilo and self._hilo.is_alive()
+        if sin_terminar and activo:
+            print(f"⚠️  Cancelando {len(sin_terminar)} ejecuciones sin terminar; se podrán reanudar.")
+            asyncio.run_coroutine_threadsafe(self._cancelar_tareas(gracia), self._bucle).result()
+        if activo:
+            self._bucle.call_soon_threadsafe(self._bucle.stop)
+            self._hilo.join(gracia)
+        return not sin_terminar
+
+    async def _metricas_presupuesto(self) -> dict:
+        return self.presupuesto.metricas()
+
+    def estadisticas(self) -> dict:
+        with self._lock:
+            en_curso = [dict(info) for info in self._en_curso.values()]
+            ejecuciones = self._ejecuciones
+        activo = bool(self._hilo and self._hilo.is_alive())
+        # El presupuesto solo se toca desde el bucle del servicio: las métricas se leen allí.
+        presupuesto = (asyncio.run_coroutine_threadsafe(self._metricas_presupuesto(), self._bucle).result(5)
+                       if activo else self.presupuesto.metricas())
+        return {
+            "activo": activo,
+            "ejecuciones": ejecuciones,
+            "en_curso": en_curso,
+            "presupuesto": presupuesto
+        }
+
+
+SERVICIO = ServicioEvaluacion()
@@ -0,0 +1,18 @@
+import os
+import sys
+import tempfile
+
+
+# Los módulos de CVision están en la raíz del repositorio, sin paquete.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Configuración sin red ni ficheros en el repositorio, antes de que los módulos la lean al
+# importarse: backend falso, sin caché de respuestas del LLM, cachés de lectura en memoria
+# y la cola de app.py en un directorio temporal y sin workers.
+_DIRECTORIO_PRUEBAS = tempfile.mkdtemp(prefix='cvision-pruebas-')
+os.environ.setdefault('LLM_BACKEND', 'falso')
+os.environ.setdefault('LLM_CACHE', 'none')
+os.environ.setdefault('RANKING_CACHE', 'memoria')
+os.environ.setdefault('REPORT_CACHE', 'memoria')
+os.environ.setdefault('JOBS_EMBEDDED', '0')
+os.environ.setdefault('JOBS_DB_PATH', os.path.join(_DIRECTORIO_PRUEBAS, 'trabajos.sqlite3'))
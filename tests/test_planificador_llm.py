@@ -0,0 +1,135 @@
+"""Pruebas del planificador de llamadas al LLM contra el backend falso (sin red)."""
+import asyncio
+import json
+
+import pytest
+
+from backends_llm import BackendFalso, ErrorSimulado
+from planificador_llm import FACTOR_REDUCCION, LLMFallido, PlanificadorLLM, es_limitacion
+
+
+def _planificador(**kwargs) -> PlanificadorLLM:
+    # Esperas de backoff de milisegundos y sin coberturas, salvo que la prueba diga otra cosa.
+    opciones = dict(rpm=60000, tpm=10 ** 9, backoff_base=0.001, backoff_maximo=0.005, cobertura=False)
+    opciones.update(kwargs)
+    return PlanificadorLLM(**opciones)
+
+
+def _llamada(backend: BackendFalso, prompt: str):
+    return lambda: backend.generar(prompt, {})
+
+
+def test_reintenta_errores_transitorios_hasta_responder():
+    backend = BackendFalso(latencia_mediana=0, tasa_error=0.5, semilla=7)
+    planificador = _planificador(max_reintentos=20)
+
+    async def evaluar():
+        return [await planificador.ejecutar(_llamada(backend, f"candidato {i}")) for i in range(20)]
+
+    respuestas = asyncio.run(evaluar())
+
+    assert all(json.loads(respuesta)["puntuaciones_parciales"] for respuesta in respuestas)
+    metricas = planificador.metricas()
+    assert metricas["exitos"] == 20
+    assert metricas["reintentos"] > 0
+    assert metricas["llamadas"] == backend.llamadas == 20 + metricas["reintentos"]
+
+
+def test_limitacion_reduce_la_concurrencia_y_agota_los_reintentos():
+    backend = BackendFalso(latencia_mediana=0, tasa_limitacion=1.0)
+    planificador = _planificador(concurrencia_inicial=16, max_reintentos=3)
+
+    with pytest.raises(LLMFallido) as excinfo:
+        asyncio.run(planificador.ejecutar(_llamada(backend, "candidato")))
+
+    assert excinfo.value.intentos == 4
+    assert isinstance(excinfo.value.ultimo_error, ErrorSimulado)
+    metricas = planificador.metricas()
+    assert metricas["limitaciones"] == 4
+    assert metricas["limite_concurrencia"] == 16 * FACTOR_REDUCCION ** 4
+
+
+def test_exitos_aumentan_la_concurrencia_hasta_el_maximo():
+    backend = BackendFalso(latencia_mediana=0)
+    planificador = _planificador(concurrencia_inicial=2, concurrencia_maxima=3)
+
+    async def evaluar():
+        for i in range(50):
+            await planificador.ejecutar(_llamada(backend, f"candidato {i}"))
+
+    asyncio.run(evaluar())
+
+    assert planificador.metricas()["limite_concurrencia"] == 3
+
+
+def test_error_no_recuperable_no_se_reintenta():
+    planificador = _planificador(max_reintentos=5)
+    intentos = []
+
+    async def llamada():
+        intentos.append(1)
+        raise ValueError("clave de API no válida")
+
+    with pytest.raises(LLMFallido) as excinfo:
+        asyncio.run(planificador.ejecutar(llamada))
+
+    assert len(intentos) == 1
+    assert excinfo.value.intentos == 1
+
+
+def test_cobertura_omitida_sin_hueco_de_concurrencia():
+    planificador = _planificador(concurrencia_inicial=1, concurrencia_maxima=1, cobertura=True, timeout_llamada=2)
+    planificador._umbral_cobertura = lambda: 0.01
+
+    async def lenta():
+        await asyncio.sleep(0.05)
+        return "ok"
+
+    assert asyncio.run(planificador.ejecutar(lenta, tokens_estimados=100)) == "ok"
+    metricas = planificador.metricas()
+    assert metricas["coberturas"] == 0
+    assert metricas["coberturas_omitidas"] == 1
+    assert planificador.concurrencia.en_vuelo == 0
+
+
+def test_cobertura_reserva_y_libera_su_hueco():
+    # Un TPM bajo para que el cubo no se rellene durante la prueba.
+    planificador = _planificador(tpm=600, concurrencia_inicial=2, concurrencia_maxima=2, cobertura=True,
+                                 timeout_llamada=2)
+    planificador._umbral_cobertura = lambda: 0.01
+    tokens_iniciales = planificador.cubo_tokens.disponibles
+
+    async def lenta():
+        await asyncio.sleep(0.05)
+        return "ok"
+
+    assert asyncio.run(planificador.ejecutar(lenta, tokens_estimados=100)) == "ok"
+    assert planificador.metricas()["coberturas"] == 1
+    assert planificador.concurrencia.en_vuelo == 0
+    # La llamada y su cobertura consumen tokens cada una.
+    assert planificador.cubo_tokens.disponibles <= tokens_iniciales - 200 + 1
+
+
+class ResourceExhausted(Exception):
+    pass
+
+
+class ErrorHTTP(Exception):
+    def __init__(self, mensaje: str, status_code: int):
+        super().__init__(mensaje)
+        self.status_code = status_code
+
+
+@pytest.mark.parametrize("error, esperado", [
+    (ErrorSimulado("429 Resource exhausted (simulado)", 429), True),
+    (ErrorSimulado("503 Service unavailable (simulado)", 503), False),
+    (ErrorHTTP("Too Many Requests", 429), True),
+    (ErrorHTTP("rate limit del proxy", 500), False),
+    (ResourceExhausted("cuota agotada"), True),
+    (Exception("429 Too Many Requests"), True),
+    (Exception("Resource has been exhausted (e.g. check quota)."), True),
+    (Exception("Respuesta truncada en la columna 4290"), False),
+    (json.JSONDecodeError("Expecting value", "x" * 5000, 4290), False),
+])
+def test_es_limitacion(error, esperado):
+    assert es_limitacion(error) is esperado
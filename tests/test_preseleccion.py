@@ -0,0 +1,43 @@
+"""Pruebas de la preselección BM25 de candidatos."""
+import pytest
+
+import preseleccion
+
+
+PUNTUACIONES = {1: 10.0, 2: 4.0, 3: 7.5, 4: 0.0, 5: 5.0}
+
+
+@pytest.mark.parametrize('top_k, umbral, esperado', [
+    (0, 0, {1, 2, 3, 4, 5}),
+    (2, 0, {1, 3}),
+    (10, 0, {1, 2, 3, 4, 5}),
+    (0, 0.5, {1, 3, 5}),
+    (0, 0.75, {1, 3}),
+    (1, 0.5, {1}),
+    (5, 0.45, {1, 3, 5}),
+])
+def test_seleccionar(top_k, umbral, esperado):
+    assert preseleccion.seleccionar(PUNTUACIONES, top_k, umbral) == esperado
+
+
+def test_seleccionar_sin_candidatos():
+    assert preseleccion.seleccionar({}, top_k=3, umbral=0.5) == set()
+
+
+def test_con_umbral_nadie_pasa_si_ninguno_tiene_afinidad():
+    assert preseleccion.seleccionar({1: 0.0, 2: 0.0}, umbral=0.1) == set()
+    assert preseleccion.seleccionar({1: 0.0, 2: 0.0}, top_k=1) in ({1}, {2})
+
+
+def test_preseleccionar_prioriza_a_los_candidatos_afines():
+    requisitos = {'skills_tecnicas_requeridas': ['Python', 'SQL'], 'mision': 'Analizar datos de ventas'}
+    candidatos = [
+        (1, {'experiencia': [{'puesto': 'Camarero', 'descripcion': 'Atención al cliente'}]}),
+        (2, {'experiencia': [{'puesto': 'Analista', 'descripcion': 'Python y SQL para datos de ventas'}]}),
+        (3, {'formacion': 'Curso de SQL', 'idiomas': ['inglés']}),
+    ]
+
+    admitidos, puntuaciones = preseleccion.preseleccionar(candidatos, requisitos, str.lower, top_k=2)
+
+    assert admitidos == {2, 3}
+    assert puntuaciones[2] > puntuaciones[3] > puntuaciones[1] == 0
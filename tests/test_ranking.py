@@ -0,0 +1,141 @@
+"""Pruebas de la paginación por cursor del ranking de una vacante, sobre SQLite en memoria."""
+import sqlite3
+from decimal import Decimal
+
+import pytest
+
+import app
+import esquema
+import utils
+
+
+PUESTO = 'Analista de Datos'
+
+# (ID_CANDIDATO, APTO, ESTADO_EVALUACION, SCORE_PONDERADO): hay empates de puntuación,
+# candidatos sin puntuar y una fila de otro puesto que no debe aparecer.
+FILAS_SCORING = [
+    (1, 0, 'EVALUADA', 80.0),
+    (2, 1, 'EVALUADA', 91.5),
+    (3, 0, 'EVALUADA', 80.0),
+    (4, None, 'FALLIDA', None),
+    (5, 0, 'EVALUADA', 62.25),
+    (6, 1, 'EVALUADA', 80.0),
+    (7, None, 'NO_PRESELECCIONADO', None),
+    (8, 0, 'EVALUADA', 99.0),
+    (9, None, 'NO_PRESELECCIONADO', None),
+]
+# Orden esperado: puntuación descendente, a igual puntuación ID descendente y los no
+# puntuados al final, también por ID descendente.
+ORDEN_ESPERADO = [8, 2, 6, 3, 1, 5, 9, 7, 4]
+
+
+class _Cursor:
+    """Cursor de mysql.connector (paramstyle %s, dictionary=True) sobre sqlite3."""
+
+    def __init__(self, cursor: sqlite3.Cursor, dictionary: bool):
+        self._cursor = cursor
+        self._dictionary = dictionary
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._cursor.close()
+
+    def execute(self, sql, parametros=()):
+        parametros = [float(v) if isinstance(v, Decimal) else v for v in parametros]
+        self._cursor.execute(sql.replace('%s', '?'), parametros)
+
+    def fetchall(self):
+        filas = self._cursor.fetchall()
+        if not self._dictionary:
+            return filas
+        columnas = [columna[0] for columna in self._cursor.description]
+        return [dict(zip(columnas, fila)) for fila in filas]
+
+
+class _Conexion:
+    def __init__(self, conn: sqlite3.Connection):
+        self._conn = conn
+
+    def cursor(self, dictionary: bool = False):
+        return _Cursor(self._conn.cursor(), dictionary)
+
+    def is_connected(self):
+        return True
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def cliente(monkeypatch):
+    conn = sqlite3.connect(':memory:', check_same_thread=False)
+    conn.executescript("""
+        CREATE TABLE CANDIDATOS (ID_CANDIDATO INTEGER PRIMARY KEY, nombre_completo TEXT, ciudad_residencia TEXT);
+        CREATE TABLE SCORING (PUESTO TEXT, ID_CANDIDATO INTEGER, APTO INTEGER, ESTADO_EVALUACION TEXT,
+                              SCORE_PONDERADO REAL);
+    """)
+    conn.executemany("INSERT INTO CANDIDATOS VALUES (?, ?, ?);",
+                     [(i, f"Candidato {i}", 'Madrid' if i % 2 else 'Sevilla') for i in range(1, 11)])
+    conn.executemany("INSERT INTO SCORING VALUES (?, ?, ?, ?, ?);", [(PUESTO, *fila) for fila in FILAS_SCORING])
+    conn.execute("INSERT INTO SCORING VALUES ('Otro Puesto', 10, 1, 'EVALUADA', 95.0);")
+    monkeypatch.setattr(app, 'get_db_connection', lambda: _Conexion(conn))
+    monkeypatch.setattr(esquema, 'asegurar_esquema', lambda: None)
+    utils.CACHE_RANKING.vaciar()
+    yield app.app.test_client()
+    utils.CACHE_RANKING.vaciar()
+    conn.close()
+
+
+def _recorrer(cliente, limite: int, **filtros) -> list:
+    """Sigue siguiente_cursor hasta el final y devuelve los IDs en orden."""
+    ids, cursor, paginas = [], None, 0
+    while True:
+        parametros = dict(filtros, limit=limite)
+        if cursor:
+            parametros['cursor'] = cursor
+        respuesta = cliente.get(f'/api/vacante/{PUESTO}/candidatos', query_string=parametros)
+        assert respuesta.status_code == 200
+        pagina = respuesta.get_json()
+        assert len(pagina['candidatos']) <= limite
+        ids += [candidato['id'] for candidato in pagina['candidatos']]
+        paginas += 1
+        cursor = pagina['siguiente_cursor']
+        if not cursor:
+            return ids
+        assert paginas <= len(FILAS_SCORING)
+
+
+@pytest.mark.parametrize('limite', [1, 2, 3, 4, 9, 50])
+def test_las_paginas_recorren_el_ranking_sin_huecos_ni_repetidos(cliente, limite):
+    assert _recorrer(cliente, limite) == ORDEN_ESPERADO
+
+
+def test_sin_paginar_devuelve_el_ranking_completo(cliente):
+    respuesta = cliente.get(f'/api/vacante/{PUESTO}/candidatos')
+
+    assert [candidato['id'] for candidato in respuesta.get_json()] == ORDEN_ESPERADO
+
+
+@pytest.mark.parametrize('apto, esperado', [
+    ('1', [2, 6]),
+    ('0', [8, 3, 1, 5, 9, 7, 4]),
+])
+def test_el_cursor_respeta_el_filtro_de_aptos(cliente, apto, esperado):
+    assert _recorrer(cliente, 2, apto=apto) == esperado
+
+
+def test_con_rango_de_puntuacion_no_incluye_a_los_no_puntuados(cliente):
+    assert _recorrer(cliente, 2, score_min=70) == [8, 2, 6, 3, 1]
+
+
+def test_cursor_no_valido(cliente):
+    respuesta = cliente.get(f'/api/vacante/{PUESTO}/candidatos', query_string={'limit': 2, 'cursor': 'no-es-un-cursor'})
+
+    assert respuesta.status_code == 400
+
+
+@pytest.mark.parametrize('score, id_candidato', [(Decimal('80.25'), 3), (None, 9)])
+def test_el_cursor_conserva_puntuacion_e_id(score, id_candidato):
+    assert app.decodificar_cursor(app.codificar_cursor(score, id_candidato)) == (score, id_candidato)
@@ -0,0 +1,164 @@
+"""Pruebas de la cola de trabajos sobre un fichero SQLite temporal."""
+import asyncio
+import sqlite3
+import time
+
+import pytest
+
+import trabajos
+from planificador_llm import PRIORIDAD_INTERACTIVA, PRIORIDAD_MASIVA, PRIORIDAD_NORMAL
+
+
+async def _evaluar(puesto, progreso, registrar_ejecucion, **parametros):
+    registrar_ejecucion(7)
+    progreso(1, 1, 0)
+
+
+async def _fallar(puesto, progreso, registrar_ejecucion, **parametros):
+    raise RuntimeError("sin conexión con la BD")
+
+
+async def _interrumpir(puesto, progreso, registrar_ejecucion, **parametros):
+    raise asyncio.CancelledError()
+
+
+@pytest.fixture
+def ruta_bd(tmp_path):
+    return str(tmp_path / "trabajos.sqlite3")
+
+
+def _cola(ruta_bd, propietario=None, **ejecutores) -> trabajos.ColaTrabajos:
+    cola = trabajos.ColaTrabajos(
+        ejecutores or {'evaluar': _evaluar, 'reanudar': _evaluar},
+        ruta_bd=ruta_bd, prioridades={'evaluar': PRIORIDAD_MASIVA}, arrancar_al_encolar=False
+    )
+    if propietario:
+        cola.propietario = propietario
+    return cola
+
+
+def _sql(ruta_bd, sentencia, valores=()):
+    conn = sqlite3.connect(ruta_bd)
+    try:
+        with conn:
+            conn.execute(sentencia, valores)
+    finally:
+        conn.close()
+
+
+def test_reclama_por_prioridad_y_antiguedad(ruta_bd):
+    cola = _cola(ruta_bd)
+    masivo = cola.encolar('evaluar', 'Puesto A')
+    normal_antiguo = cola.encolar('evaluar', 'Puesto B', prioridad=PRIORIDAD_NORMAL)
+    normal_reciente = cola.encolar('evaluar', 'Puesto C', prioridad=PRIORIDAD_NORMAL)
+    interactivo = cola.encolar('evaluar', 'Puesto D', prioridad=PRIORIDAD_INTERACTIVA)
+
+    reclamados = [cola._reclamar_siguiente()["id"] for _ in range(4)]
+
+    assert reclamados == [interactivo, normal_antiguo, normal_reciente, masivo]
+    assert cola._reclamar_siguiente() is None
+    assert cola.obtener(masivo)["estado"] == trabajos.ESTADO_EN_CURSO
+
+
+def test_prioridad_maxima_solo_reclama_los_urgentes(ruta_bd):
+    cola = _cola(ruta_bd)
+    cola.encolar('evaluar', 'Puesto A')
+
+    assert cola._reclamar_siguiente(PRIORIDAD_INTERACTIVA) is None
+    interactivo = cola.encolar('evaluar', 'Puesto B', prioridad=PRIORIDAD_INTERACTIVA)
+    assert cola._reclamar_siguiente(PRIORIDAD_INTERACTIVA)["id"] == interactivo
+
+
+def test_no_reclama_dos_trabajos_del_mismo_puesto(ruta_bd):
+    cola = _cola(ruta_bd)
+    otro_proceso = _cola(ruta_bd, propietario="otra-maquina:1")
+    primero = cola.encolar('evaluar', 'Puesto A')
+    segundo = cola.encolar('evaluar', 'Puesto A', prioridad=PRIORIDAD_INTERACTIVA)
+    otro_puesto = cola.encolar('evaluar', 'Puesto B')
+
+    assert cola._reclamar_siguiente()["id"] == segundo
+    # Ni este proceso ni otro empiezan el otro trabajo del puesto mientras siga en curso.
+    assert otro_proceso._reclamar_siguiente()["id"] == otro_puesto
+    assert cola._reclamar_siguiente() is None
+
+    cola._finalizar(segundo, trabajos.ESTADO_COMPLETADO)
+    assert otro_proceso._reclamar_siguiente()["id"] == primero
+
+
+def test_no_recupera_los_trabajos_de_otro_proceso_que_late(ruta_bd):
+    cola = _cola(ruta_bd)
+    otro_proceso = _cola(ruta_bd, propietario="otra-maquina:1")
+    id_trabajo = cola.encolar('evaluar', 'Puesto A')
+    otro_proceso._reclamar_siguiente()
+
+    cola._recuperar_huerfanos()
+
+    assert cola.obtener(id_trabajo)["estado"] == trabajos.ESTADO_EN_CURSO
+
+
+def test_recupera_para_reanudar_los_trabajos_sin_latido(ruta_bd):
+    cola = _cola(ruta_bd)
+    otro_proceso = _cola(ruta_bd, propietario="otra-maquina:1")
+    id_trabajo = cola.encolar('evaluar', 'Puesto A')
+    id_reanudar = cola.encolar('reanudar', 'Puesto B', {"id_ejecucion": 3})
+    otro_proceso._reclamar_siguiente()
+    otro_proceso._reclamar_siguiente()
+    _sql(ruta_bd, "UPDATE TRABAJOS SET LATIDO = ?;", (time.time() - trabajos.PLAZO_LATIDO - 1,))
+
+    cola._recuperar_huerfanos()
+
+    trabajo = cola.obtener(id_trabajo)
+    assert trabajo["estado"] == trabajos.ESTADO_PENDIENTE
+    assert trabajo["parametros"] == {"reanudar": True}
+    assert cola.obtener(id_reanudar)["parametros"] == {"id_ejecucion": 3}
+    assert cola._reclamar_siguiente()["id"] in (id_trabajo, id_reanudar)
+
+
+def test_recupera_los_trabajos_de_un_proceso_anterior_con_el_mismo_pid(ruta_bd):
+    anterior = _cola(ruta_bd)
+    id_anterior = anterior.encolar('evaluar', 'Puesto A')
+    anterior._reclamar_siguiente()
+    # Un proceso nuevo con el mismo host:pid (p. ej. un contenedor reiniciado) sigue latiendo.
+    actual = _cola(ruta_bd)
+    id_actual = actual.encolar('evaluar', 'Puesto B')
+    actual._reclamar_siguiente()
+
+    actual._recuperar_huerfanos()
+
+    assert actual.obtener(id_anterior)["estado"] == trabajos.ESTADO_PENDIENTE
+    assert actual.obtener(id_actual)["estado"] == trabajos.ESTADO_EN_CURSO
+
+
+def test_ejecuta_y_registra_la_ejecucion(ruta_bd):
+    cola = _cola(ruta_bd)
+    id_trabajo = cola.encolar('evaluar', 'Puesto A')
+
+    cola._ejecutar(cola._reclamar_siguiente())
+
+    trabajo = cola.obtener(id_trabajo)
+    assert trabajo["estado"] == trabajos.ESTADO_COMPLETADO
+    assert trabajo["parametros"] == {"id_ejecucion": 7}
+    assert trabajo["progreso"] == {"total": 1, "completados": 1, "errores": 0}
+    assert id_trabajo not in cola._trabajos_propios
+
+
+def test_un_trabajo_que_falla_queda_fallido(ruta_bd):
+    cola = _cola(ruta_bd, evaluar=_fallar)
+    id_trabajo = cola.encolar('evaluar', 'Puesto A')
+
+    cola._ejecutar(cola._reclamar_siguiente())
+
+    trabajo = cola.obtener(id_trabajo)
+    assert trabajo["estado"] == trabajos.ESTADO_FALLIDO
+    assert trabajo["error"] == "sin conexión con la BD"
+
+
+def test_un_trabajo_interrumpido_vuelve_a_la_cola_para_reanudarse(ruta_bd):
+    cola = _cola(ruta_bd, evaluar=_interrumpir)
+    id_trabajo = cola.encolar('evaluar', 'Puesto A')
+
+    cola._ejecutar(cola._reclamar_siguiente())
+
+    trabajo = cola.obtener(id_trabajo)
+    assert trabajo["estado"] == trabajos.ESTADO_PENDIENTE
+    assert trabajo["parametros"] == {"reanudar": True}
@@ -0,0 +1,443 @@
+import asyncio
+import concurrent.futures
+import functools
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import traceback
+import uuid
+from typing import Callable, Dict, Optional
+
+from planificador_llm import PRIORIDAD_INTERACTIVA, PRIORIDAD_NORMAL
+
+
+RUTA_BD_TRABAJOS = os.getenv('JOBS_DB_PATH', 'cvision_jobs.sqlite3')
+NUM_WORKERS = int(os.getenv('JOBS_WORKERS', '2'))
+INTERVALO_SONDEO = 1.0
+INTERVALO_PROGRESO = 1.0
+# Cada proceso renueva periódicamente el latido de sus trabajos en curso; los de un
+# proceso sin latido durante PLAZO_LATIDO segundos se consideran huérfanos.
+INTERVALO_LATIDO = float(os.getenv('JOBS_HEARTBEAT_INTERVAL', '10'))
+PLAZO_LATIDO = float(os.getenv('JOBS_HEARTBEAT_TIMEOUT', '60'))
+
+ESTADO_PENDIENTE = 'pendiente'
+ESTADO_EN_CURSO = 'en_curso'
+ESTADO_COMPLETADO = 'completado'
+ESTADO_FALLIDO = 'fallido'
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS TRABAJOS (
+    ID TEXT PRIMARY KEY,
+    TIPO TEXT NOT NULL,
+    PUESTO TEXT NOT NULL,
+    PARAMETROS TEXT,
+    ESTADO TEXT NOT NULL,
+    TOTAL INTEGER NOT NULL DEFAULT 0,
+    COMPLETADOS INTEGER NOT NULL DEFAULT 0,
+    ERRORES INTEGER NOT NULL DEFAULT 0,
+    ERROR TEXT,
+    CREADO REAL NOT NULL,
+    INICIADO REAL,
+    FINALIZADO REAL
+);
+CREATE INDEX IF NOT EXISTS IDX_TRABAJOS_ESTADO ON TRABAJOS (ESTADO, CREADO);
+CREATE INDEX IF NOT EXISTS IDX_TRABAJOS_PUESTO ON TRABAJOS (PUESTO, CREADO);
+"""
+
+# Columnas añadidas después de la primera versión de la cola (se ignoran si ya existen).
+_MIGRACIONES = [
+    "ALTER TABLE TRABAJOS ADD COLUMN PRIORIDAD INTEGER NOT NULL DEFAULT 1;",
+    "CREATE INDEX IF NOT EXISTS IDX_TRABAJOS_PRIORIDAD ON TRABAJOS (ESTADO, PRIORIDAD, CREADO);",
+    "ALTER TABLE TRABAJOS ADD COLUMN PROPIETARIO TEXT;",
+    "ALTER TABLE TRABAJOS ADD COLUMN LATIDO REAL;",
+]
+
+
+def _ejecutar_en_bucle_propio(corrutina, cliente: str, prioridad: int):
+    """Ejecutor por defecto: cada trabajo en su propio bucle de eventos."""
+    return asyncio.run(corrutina)
+
+
+def _propietario_vivo(propietario: Optional[str]) -> bool:
+    """
+    Comprueba si sigue vivo el proceso 'host:pid' que reclamó un trabajo. Solo se puede
+    saber en la misma máquina; para las demás se confía en el latido.
+    """
+    if not propietario:
+        return False
+    host, _, pid = propietario.rpartition(':')
+    if host != socket.gethostname():
+        return True
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, ValueError):
+        pass
+    return True
+
+
+class ColaTrabajos:
+    """
+    Cola de trabajos persistente (SQLite) con un pool local de workers.
+    Cada trabajo ejecuta un orquestador de evaluación en su propio hilo y
+    va registrando el progreso para que la API pueda consultarlo.
+
+    Los trabajos se reclaman por prioridad y, dentro de ella, por antigüedad. Además de
+    los `num_workers` generales hay un worker reservado a los trabajos de prioridad
+    interactiva, para que no esperen a que termine una evaluación masiva.
+
+    Varios procesos pueden compartir el fichero de la cola: cada trabajo en curso
+    registra el proceso que lo reclamó y un latido, y solo se recupera si ese proceso
+    ha muerto o ha dejado de latir.
+    """
+
+    def __init__(self, ejecutores: Dict[str, Callable], ruta_bd: str = RUTA_BD_TRABAJOS,
+                 num_workers: int = NUM_WORKERS, prioridades: Optional[Dict[str, int]] = None,
+                 ejecutar_corrutina: Callable = _ejecutar_en_bucle_propio, arrancar_al_encolar: bool = True):
+        """
+        Args:
+            ejecutores (dict): Mapa {tipo_trabajo: corrutina}. Cada corrutina recibe
+                               el nombre del puesto, un callback `progreso` y un callback
+                               `registrar_ejecucion(id_ejecucion)` con el que anota en el
+                               trabajo la ejecución que crea, para reanudar esa misma.
+            ruta_bd (str): Fichero SQLite donde se persiste la cola.
+            num_workers (int): Número de hilos que procesan trabajos en paralelo.
+            prioridades (dict, opcional): {tipo_trabajo: prioridad} (PRIORIDAD_* de
+                                          planificador_llm; por defecto PRIORIDAD_NORMAL).
+            ejecutar_corrutina (callable): ejecutar_corrutina(corrutina, cliente, prioridad)
+                                           ejecuta el orquestador y espera a que termine
+                                           (p. ej. servicio_evaluacion.SERVICIO.ejecutar).
+            arrancar_al_encolar (bool): Si es False, encolar no arranca los workers: los
+                                        trabajos los procesa otro proceso (worker.py).
+        """
+        self.ejecutores = ejecutores
+        self.ruta_bd = ruta_bd
+        self.num_workers = num_workers
+        self.prioridades = prioridades or {}
+        self.ejecutar_corrutina = ejecutar_corrutina
+        self.arrancar_al_encolar = arrancar_al_encolar
+        self._hilos = []
+        self._parar = threading.Event()
+        self._lock_inicio = threading.Lock()
+        self._parar_latido = threading.Event()
+        self._hilo_latido = None
+        self.propietario = f"{socket.gethostname()}:{os.getpid()}"
+        self._trabajos_propios = set()
+        self._crear_esquema()
+
+    # --- Persistencia ---
+    def _conectar(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.ruta_bd, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL;")
+        return conn
+
+    def _crear_esquema(self):
+        conn = self._conectar()
+        try:
+            conn.executescript(_ESQUEMA)
+            for sentencia in _MIGRACIONES:
+                try:
+                    conn.execute(sentencia)
+                except sqlite3.OperationalError as e:
+                    if 'duplicate column' not in str(e):
+                        raise
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _fila_a_dict(fila: sqlite3.Row) -> dict:
+        return {
+            "id": fila["ID"],
+            "tipo": fila["TIPO"],
+            "puesto": fila["PUESTO"],
+            "parametros": json.loads(fila["PARAMETROS"]) if fila["PARAMETROS"] else {},
+            "prioridad": fila["PRIORIDAD"],
+            "estado": fila["ESTADO"],
+            "progreso": {
+                "total": fila["TOTAL"],
+                "completados": fila["COMPLETADOS"],
+                "errores": fila["ERRORES"]
+            },
+            "error": fila["ERROR"],
+            "creado": fila["CREADO"],
+            "iniciado": fila["INICIADO"],
+            "finalizado": fila["FINALIZADO"]
+        }
+
+    def encolar(self, tipo: str, puesto: str, parametros: Optional[dict] = None, prioridad: Optional[int] = None) -> str:
+        """Registra un trabajo pendiente y devuelve su identificador. Por defecto, con la prioridad de su tipo."""
+        if tipo not in self.ejecutores:
+            raise ValueError(f"Tipo de trabajo desconocido: {tipo}")
+        if prioridad is None:
+            prioridad = self.prioridades.get(tipo, PRIORIDAD_NORMAL)
+        id_trabajo = uuid.uuid4().hex
+        conn = self._conectar()
+        try:
+            conn.execute(
+                "INSERT INTO TRABAJOS (ID, TIPO, PUESTO, PARAMETROS, ESTADO, PRIORIDAD, CREADO) VALUES (?, ?, ?, ?, ?, ?, ?);",
+                (id_trabajo, tipo, puesto, json.dumps(parametros or {}, ensure_ascii=False), ESTADO_PENDIENTE, prioridad,
+                 time.time())
+            )
+        finally:
+            conn.close()
+        if self.arrancar_al_encolar:
+            self.iniciar()
+        return id_trabajo
+
+    def obtener(self, id_trabajo: str) -> Optional[dict]:
+        """Devuelve el estado de un trabajo o None si no existe."""
+        conn = self._conectar()
+        try:
+            fila = conn.execute("SELECT * FROM TRABAJOS WHERE ID = ?;", (id_trabajo,)).fetchone()
+            return self._fila_a_dict(fila) if fila else None
+        finally:
+            conn.close()
+
+    def listar(self, puesto: Optional[str] = None, limite: int = 50) -> list:
+        """Lista los trabajos más recientes, opcionalmente filtrados por puesto."""
+        conn = self._conectar()
+        try:
+            if puesto:
+                filas = conn.execute("SELECT * FROM TRABAJOS WHERE PUESTO = ? ORDER BY CREADO DESC LIMIT ?;", (puesto, limite)).fetchall()
+            else:
+                filas = conn.execute("SELECT * FROM TRABAJOS ORDER BY CREADO DESC LIMIT ?;", (limite,)).fetchall()
+            return [self._fila_a_dict(f) for f in filas]
+        finally:
+            conn.close()
+
+    def actualizar_progreso(self, id_trabajo: str, total: int, completados: int, errores: int):
+        conn = self._conectar()
+        try:
+            conn.execute(
+                "UPDATE TRABAJOS SET TOTAL = ?, COMPLETADOS = ?, ERRORES = ? WHERE ID = ?;",
+                (total, completados, errores, id_trabajo)
+            )
+        finally:
+            conn.close()
+
+    def registrar_ejecucion(self, id_trabajo: str, id_ejecucion: int):
+        """
+        Anota en los parámetros del trabajo la ejecución de evaluación que ha creado: si el
+        trabajo se interrumpe, se reanuda esa ejecución y no la última del puesto.
+        """
+        conn = self._conectar()
+        try:
+            conn.execute("BEGIN IMMEDIATE;")
+            fila = conn.execute("SELECT PARAMETROS FROM TRABAJOS WHERE ID = ?;", (id_trabajo,)).fetchone()
+            if fila:
+                parametros = json.loads(fila["PARAMETROS"]) if fila["PARAMETROS"] else {}
+                parametros["id_ejecucion"] = id_ejecucion
+                conn.execute("UPDATE TRABAJOS SET PARAMETROS = ? WHERE ID = ?;",
+                             (json.dumps(parametros, ensure_ascii=False), id_trabajo))
+            conn.execute("COMMIT;")
+        except sqlite3.Error:
+            conn.execute("ROLLBACK;")
+            raise
+        finally:
+            conn.close()
+
+    def _finalizar(self, id_trabajo: str, estado: str, error: Optional[str] = None):
+        conn = self._conectar()
+        try:
+            conn.execute(
+                "UPDATE TRABAJOS SET ESTADO = ?, ERROR = ?, FINALIZADO = ? WHERE ID = ?;",
+                (estado, error, time.time(), id_trabajo)
+            )
+        finally:
+            conn.close()
+
+    def _reclamar_siguiente(self, prioridad_maxima: Optional[int] = None) -> Optional[dict]:
+        """
+        Marca como 'en_curso' el trabajo pendiente más prioritario (y, a igual prioridad,
+        el más antiguo) de forma atómica. Con `prioridad_maxima` solo considera los
+        trabajos de esa prioridad o más urgentes.
+
+        Se salta los puestos que ya tienen un trabajo en curso (en cualquier proceso): dos
+        evaluaciones del mismo puesto a la vez se pisarían el SCORING y las huellas.
+        """
+        conn = self._conectar()
+        fila = None
+        try:
+            conn.execute("BEGIN IMMEDIATE;")
+            sql = ("SELECT * FROM TRABAJOS WHERE ESTADO = ? "
+                   "AND PUESTO NOT IN (SELECT PUESTO FROM TRABAJOS WHERE ESTADO = ?)")
+            valores = [ESTADO_PENDIENTE, ESTADO_EN_CURSO]
+            if prioridad_maxima is not None:
+                sql += " AND PRIORIDAD <= ?"
+                valores.append(prioridad_maxima)
+            fila = conn.execute(sql + " ORDER BY PRIORIDAD, CREADO LIMIT 1;", valores).fetchone()
+            if not fila:
+                conn.execute("COMMIT;")
+                return None
+            ahora = time.time()
+            # Se registra antes del COMMIT para que el latido de este proceso no lo tome por huérfano.
+            self._trabajos_propios.add(fila["ID"])
+            conn.execute(
+                "UPDATE TRABAJOS SET ESTADO = ?, INICIADO = ?, PROPIETARIO = ?, LATIDO = ? WHERE ID = ?;",
+                (ESTADO_EN_CURSO, ahora, self.propietario, ahora, fila["ID"])
+            )
+            conn.execute("COMMIT;")
+            return self._fila_a_dict(fila)
+        except sqlite3.Error:
+            conn.execute("ROLLBACK;")
+            if fila:
+                self._trabajos_propios.discard(fila["ID"])
+            raise
+        finally:
+            conn.close()
+
+    def _latir(self):
+        """Renueva el latido de los trabajos en curso de este proceso."""
+        conn = self._conectar()
+        try:
+            conn.execute("UPDATE TRABAJOS SET LATIDO = ? WHERE ESTADO = ? AND PROPIETARIO = ?;",
+                         (time.time(), ESTADO_EN_CURSO, self.propietario))
+        finally:
+            conn.close()
+
+    def _recuperar_huerfanos(self, id_trabajo: Optional[str] = None):
+        """
+        Los trabajos 'en_curso' cuyo proceso murió o dejó de latir (o, con `id_trabajo`,
+        ese trabajo, interrumpido al apagar) vuelven a la cola marcados para reanudar la
+        ejecución interrumpida en lugar de empezar de cero. Los que siguen en marcha en
+        otro proceso no se tocan.
+        """
+        conn = self._conectar()
+        try:
+            conn.execute("BEGIN IMMEDIATE;")
+            if id_trabajo is None:
+                caducado = time.time() - PLAZO_LATIDO
+                filas = [
+                    fila for fila in conn.execute(
+                        "SELECT ID, TIPO, PARAMETROS, PROPIETARIO, LATIDO FROM TRABAJOS WHERE ESTADO = ?;", (ESTADO_EN_CURSO,)
+                    ).fetchall()
+                    if fila["LATIDO"] is None or fila["LATIDO"] < caducado or not _propietario_vivo(fila["PROPIETARIO"])
+                    # Mismo host:pid que un proceso anterior (p. ej. un contenedor reiniciado) pero
+                    # el trabajo no lo está ejecutando este proceso.
+                    or (fila["PROPIETARIO"] == self.propietario and fila["ID"] not in self._trabajos_propios)
+                ]
+            else:
+                filas = conn.execute("SELECT ID, TIPO, PARAMETROS FROM TRABAJOS WHERE ESTADO = ? AND ID = ?;",
+                                     (ESTADO_EN_CURSO, id_trabajo)).fetchall()
+            for fila in filas:
+                parametros = json.loads(fila["PARAMETROS"]) if fila["PARAMETROS"] else {}
+                if fila["TIPO"] != 'reanudar':
+                    parametros["reanudar"] = True
+                conn.execute(
+                    "UPDATE TRABAJOS SET ESTADO = ?, INICIADO = NULL, PROPIETARIO = NULL, LATIDO = NULL, PARAMETROS = ? "
+                    "WHERE ID = ?;",
+                    (ESTADO_PENDIENTE, json.dumps(parametros, ensure_ascii=False), fila["ID"])
+                )
+            conn.execute("COMMIT;")
+            if filas:
+                print(f"⚠️  {len(filas)} trabajos interrumpidos se han vuelto a encolar para reanudarse.")
+        except sqlite3.Error:
+            conn.execute("ROLLBACK;")
+            raise
+        finally:
+            conn.close()
+
+    # --- Workers ---
+    def iniciar(self):
+        """Arranca el pool de workers (idempotente)."""
+        with self._lock_inicio:
+            if self._hilos:
+                return
+            self._recuperar_huerfanos()
+            self._parar.clear()
+            for i in range(self.num_workers):
+                hilo = threading.Thread(target=self._bucle_worker, name=f"cvision-worker-{i}", daemon=True)
+                hilo.start()
+                self._hilos.append(hilo)
+            hilo = threading.Thread(target=self._bucle_worker, args=(PRIORIDAD_INTERACTIVA,),
+                                    name="cvision-worker-interactivo", daemon=True)
+            hilo.start()
+            self._hilos.append(hilo)
+            self._parar_latido.clear()
+            self._hilo_latido = threading.Thread(target=self._bucle_latido, name="cvision-latido", daemon=True)
+            self._hilo_latido.start()
+            print(f"✅ Cola de trabajos iniciada con {self.num_workers} workers (+1 para trabajos interactivos).")
+
+    def dejar_de_reclamar(self):
+        """Los workers no empiezan trabajos nuevos; los que están en curso continúan."""
+        self._parar.set()
+
+    def detener(self, timeout: Optional[float] = None):
+        """Pide a los workers que terminen tras el trabajo en curso y los espera."""
+        self._parar.set()
+        for hilo in self._hilos:
+            hilo.join(timeout)
+        self._hilos = []
+        # El latido se mantiene hasta aquí: mientras se drenan los trabajos en curso, otro
+        # proceso no debe darlos por huérfanos.
+        self._parar_latido.set()
+        if self._hilo_latido:
+            self._hilo_latido.join(timeout)
+            self._hilo_latido = None
+
+    def _bucle_latido(self):
+        # Además de latir, recupera periódicamente los trabajos de procesos que murieron
+        # mientras este seguía en marcha.
+        while not self._parar_latido.wait(INTERVALO_LATIDO):
+            try:
+                self._latir()
+                self._recuperar_huerfanos()
+            except sqlite3.Error as e:
+                print(f"⚠️  No se pudo renovar el latido de los trabajos: {e}")
+
+    def _bucle_worker(self, prioridad_maxima: Optional[int] = None):
+        while not self._parar.is_set():
+            try:
+                trabajo = self._reclamar_siguiente(prioridad_maxima)
+            except sqlite3.Error as e:
+                print(f"❌ Error al leer la cola de trabajos: {e}")
+                trabajo = None
+            if not trabajo:
+                self._parar.wait(INTERVALO_SONDEO)
+                continue
+            self._ejecutar(trabajo)
+
+    def _crear_callback_progreso(self, id_trabajo: str) -> Callable:
+        ultimo = {"t": 0.0}
+
+        def progreso(total: int, completados: int, errores: int):
+            # Se limita la frecuencia de escritura para no saturar SQLite.
+            ahora = time.monotonic()
+            if completados < total and ahora - ultimo["t"] < INTERVALO_PROGRESO:
+                return
+            ultimo["t"] = ahora
+            try:
+                self.actualizar_progreso(id_trabajo, total, completados, errores)
+            except sqlite3.Error as e:
+                print(f"⚠️  No se pudo registrar el progreso del trabajo {id_trabajo}: {e}")
+
+        return progreso
+
+    def _ejecutar(self, trabajo: dict):
+        id_trabajo = trabajo["id"]
+        print(f"\n▶️  Trabajo {id_trabajo} ({trabajo['tipo']}) para el puesto '{trabajo['puesto']}'")
+        ejecutor = self.ejecutores[trabajo["tipo"]]
+        try:
+            self.ejecutar_corrutina(
+                ejecutor(trabajo["puesto"], progreso=self._crear_callback_progreso(id_trabajo),
+                         registrar_ejecucion=functools.partial(self.registrar_ejecucion, id_trabajo),
+                         **trabajo["parametros"]),
+                trabajo["puesto"], trabajo["prioridad"]
+            )
+            self._finalizar(id_trabajo, ESTADO_COMPLETADO)
+            print(f"✅ Trabajo {id_trabajo} completado.")
+        except (asyncio.CancelledError, concurrent.futures.CancelledError):
+            # Cancelado al apagar sin terminar de drenar: su ejecución es reanudable.
+            self._recuperar_huerfanos(id_trabajo)
+            print(f"⚠️  Trabajo {id_trabajo} interrumpido al apagar; se reanudará en el próximo arranque.")
+        except Exception as e:
+            traceback.print_exc()
+            self._finalizar(id_trabajo, ESTADO_FALLIDO, str(e))
+            print(f"❌ Trabajo {id_trabajo} fallido: {e}")
+        finally:
+            self._trabajos_propios.discard(id_trabajo)
@@ -1,7 +1,6 @@
 import asyncio
+import contextlib
 from flask import logging
-from openai import OpenAI
-import google.generativeai as genai
 import json
 import mysql.connector
 from mysql.connector import Error
@@ -9,22 +8,27 @@ from collections import defaultdict
 import statistics
 from unidecode import unidecode
 import os
+import re
 from dotenv import load_dotenv
 import time
+import hashlib
 from collections import defaultdict
 from typing import List, Dict, Any
+import db
+import esquema
+import cache_llm
+import cache_ranking
+import escritura_masiva
+import bd_async
+import backends_llm
+import plantillas_prompt
+import preseleccion
+from planificador_llm import PlanificadorLLM, LLMFallido, PlazoAgotado, TIMEOUT_LLAMADA
 
 
 load_dotenv()
-GOOGLE_API_KEY = os.getenv('GOOGLE_API_KEY')
-genai.configure(api_key=GOOGLE_API_KEY)
-DB_CONFIG = {
-    "database": os.getenv('DB_NAME'),
-    "user": os.getenv('DB_USER'),
-    "password": os.getenv('DB_PASS'),
-    "host": os.getenv('DB_HOST'),
-    "port": "3306"
-}
+# Las conexiones salen del pool compartido de db.py (el mismo que usa app.py).
+DB_CONFIG = db.DB_CONFIG
 
 PESOS = {
     "experiencia": 0.25, "formacion": 0.25,
@@ -33,7 +37,67 @@ PESOS = {
 
 
 MAX_CONSULTAS_CONCURRENTES = 70
-TIMEOUT = 35
+# Plazo global de una ejecución de evaluación (segundos, 0 = sin límite). Al vencer,
+# la ejecución termina con lo completado y puede reanudarse más tarde.
+PLAZO_EJECUCION = float(os.getenv('EVAL_RUN_DEADLINE', '7200'))
+TAMANO_PAGINA_CANDIDATOS = 500
+# Candidatos completos que se acumulan antes de guardarlos en una transacción.
+# Con 0 se guarda todo al final en una única transacción (modo clásico).
+TAMANO_LOTE_GUARDADO = int(os.getenv('EVAL_BATCH_SIZE', '50'))
+# Respuestas del LLM que se acumulan antes de escribir el punto de control de la ejecución.
+TAMANO_LOTE_PUNTO_CONTROL = 25
+
+ESTADO_EJECUCION_EN_CURSO = 'en_curso'
+ESTADO_EJECUCION_COMPLETADA = 'completada'
+ESTADO_EJECUCION_FALLIDA = 'fallida'
+ESTADO_EJECUCION_PLAZO_AGOTADO = 'plazo_agotado'
+
+# Valores de SCORING.ESTADO_EVALUACION
+ESTADO_EVALUACION_EVALUADA = 'EVALUADA'
+ESTADO_EVALUACION_FALLIDA = 'FALLIDA'
+# Descartado por la preselección local: no se llegó a evaluar con el LLM.
+ESTADO_EVALUACION_NO_PRESELECCIONADO = 'NO_PRESELECCIONADO'
+
+# Proveedor del LLM de evaluación, elegido con LLM_BACKEND ('gemini', 'openai' o 'falso').
+BACKEND_LLM = backends_llm.crear_backend()
+MODELO_LLM = BACKEND_LLM.identificador
+# Versión de la plantilla del prompt de evaluación (plantillas_prompt.py). Entra en la
+# huella de cada evaluación: cambiarla invalida las huellas guardadas.
+VERSION_PROMPT = plantillas_prompt.VERSION_PLANTILLA
+GENERATION_CONFIG = {"response_mime_type": "application/json", "temperature": 0.1}
+TOKENS_SALIDA_ESTIMADOS = 1500
+# Candidatos por llamada en el modo de evaluación en lote (opcional). Con 1 cada
+# par (candidato, evaluador) se evalúa con su propia llamada, como hasta ahora.
+TAMANO_LOTE_LLM = max(1, int(os.getenv('LLM_BATCH_CANDIDATES', '1')))
+
+# Valores de PUESTOS_PREDEFINIDOS.MODO_EVALUACION: una llamada al LLM por evaluador,
+# una única llamada que devuelve las evaluaciones de todos los perfiles, o evaluadores
+# en secuencia que se detienen en cuanto el resultado está claro (muestreo adaptativo).
+MODO_EVALUACION_INDIVIDUAL = 'individual'
+MODO_EVALUACION_MULTIPERFIL = 'multiperfil'
+MODO_EVALUACION_ADAPTATIVO = 'adaptativo'
+MODOS_EVALUACION = (MODO_EVALUACION_INDIVIDUAL, MODO_EVALUACION_MULTIPERFIL, MODO_EVALUACION_ADAPTATIVO)
+
+# Muestreo adaptativo: orden en que se consultan los evaluadores (el escéptico primero)
+# y criterios para omitir los restantes. Se para si las puntuaciones globales obtenidas
+# difieren como mucho TOLERANCIA_CONSENSO puntos, o si todas caen en una banda de
+# BANDAS_PARADA tras al menos MIN_EVALUACIONES_BANDA evaluaciones.
+ORDEN_EVALUADORES_ADAPTATIVO = ["Evaluador Técnico", "Evaluador Manager", "Evaluador RRHH"]
+TOLERANCIA_CONSENSO = float(os.getenv('EVAL_CONSENSUS_TOLERANCE', '8'))
+BANDAS_PARADA = [
+    tuple(float(limite) for limite in banda.split('-'))
+    for banda in os.getenv('EVAL_STOP_BANDS', '0-25').split(',') if banda.strip()
+]
+MIN_EVALUACIONES_BANDA = int(os.getenv('EVAL_STOP_BAND_MIN_EVALS', '1'))
+
+# Caché persistente de respuestas del LLM (prompt idéntico -> misma respuesta).
+CACHE_RESPUESTAS = cache_llm.crear_cache()
+
+# Cachés de lectura que sirve app.py: rankings por puesto e informes por candidato.
+# Toda escritura de evaluaciones debe invalidarlas después del commit (invalidar_caches_lectura).
+CACHE_RANKING = cache_ranking.crear_cache()
+CACHE_INFORMES = cache_ranking.crear_cache(cache_ranking.TIPO_CACHE_INFORMES, cache_ranking.RUTA_CACHE_INFORMES,
+                                           cache_ranking.TTL_CACHE_INFORMES, cache_ranking.MAX_ENTRADAS_CACHE_INFORMES)
 
 EVALUADORES = {
         "Evaluador Técnico": "Eres un evaluador técnico con un enfoque escéptico especialista en el área de {nombre_vacante}. Tu tarea es analizar la información del candidato con un alto grado de escepticismo, buscando inconsistencias y áreas de mejora. Eres meticuloso en tu evaluación y no aceptas afirmaciones sin evidencia sólida.",
@@ -53,6 +117,56 @@ def _calcular_consenso_skill(lista_ratings: list) -> str:
 def _unique_list(lst: list) -> list:
     return list(dict.fromkeys(lst))
 
+def _evaluacion_no_preseleccionada(puntuacion_preseleccion: float) -> dict:
+    """Evaluación consolidada de un candidato descartado en la preselección, sin puntuación."""
+    return {
+        'estado_evaluacion': ESTADO_EVALUACION_NO_PRESELECCIONADO,
+        'puntuacion_global': None,
+        'razonamiento_paso_a_paso': '',
+        'puntuaciones_parciales_promediadas': {},
+        'justificaciones': [],
+        'justificacion_consolidada': f"Candidato no preseleccionado para la evaluación con IA (afinidad léxica con el puesto: {puntuacion_preseleccion:.2f}).",
+        'match_soft_skills_consenso': {},
+        'match_skills_tecnicas_consenso': {},
+        'PREGUNTAS_TECNICAS': [],
+        'PREGUNTAS_RRHH': [],
+        'PREGUNTAS_MANAGER': []
+    }
+
+def justificaciones_evaluadores(evaluaciones_con_clave) -> list:
+    """
+    Justificación y razonamiento de cada evaluador (pares (evaluación, perfil)), en el
+    formato que se guarda en SCORING.JUSTIFICACIONES y que devuelve el informe.
+    """
+    return [
+        {
+            'evaluador': clave,
+            'texto': eval.get('justificacion', 'No proporcionada.'),
+            'razonamiento': eval.get('razonamiento_paso_a_paso', 'No proporcionado.')
+        }
+        for eval, clave in evaluaciones_con_clave
+    ]
+
+# Cabecera de cada evaluador en la justificación consolidada de texto ("- Justificación del X: ...").
+_PATRON_CABECERA_JUSTIFICACION = re.compile(r'^-[ \t]*(?:Justificación del[ \t]+)?([^:\n]+):[ \t]*', re.MULTILINE)
+
+def parsear_justificacion_consolidada(texto: str) -> list:
+    """
+    Separa por evaluador una justificación consolidada de texto (las filas de SCORING
+    anteriores a JUSTIFICACIONES). Solo busca cabeceras al principio de línea, así que
+    es lineal y no se confunde con guiones o dos puntos dentro de los textos.
+    """
+    if not texto or not isinstance(texto, str):
+        return []
+    cabeceras = list(_PATRON_CABECERA_JUSTIFICACION.finditer(texto))
+    justificaciones = []
+    for i, cabecera in enumerate(cabeceras):
+        fin = cabeceras[i + 1].start() if i + 1 < len(cabeceras) else len(texto)
+        contenido = texto[cabecera.end():fin].strip()
+        if contenido:
+            justificaciones.append({'evaluador': cabecera.group(1).strip(), 'texto': contenido, 'razonamiento': None})
+    return justificaciones
+
 # --- Procesamiento Principal ---
 def _procesar_evaluaciones(data: list) -> dict:
     """
@@ -60,11 +174,40 @@ def _procesar_evaluaciones(data: list) -> dict:
     y calcula una puntuación final consolidada y otros datos de consenso.
     """
     candidatos_agrupados = defaultdict(list)
+    fallidas_por_candidato = defaultdict(int)
+    omitidas_por_candidato = defaultdict(int)
     for evaluacion in data:
+        # Las evaluaciones fallidas (tras agotar reintentos) no entran en el consenso.
+        if evaluacion.get('error'):
+            fallidas_por_candidato[evaluacion['id_candidato']] += 1
+            continue
+        # Los evaluadores omitidos por el muestreo adaptativo tampoco: el consenso
+        # se calcula con las evaluaciones que haya, sean una, dos o tres.
+        if evaluacion.get('omitido'):
+            omitidas_por_candidato[evaluacion['id_candidato']] += 1
+            continue
         candidatos_agrupados[evaluacion['id_candidato']].append(evaluacion)
 
     resultados_finales = {}
 
+    # Candidatos sin ninguna evaluación válida: se marcan como fallidos, sin puntuación.
+    for candidato_id, num_fallidas in fallidas_por_candidato.items():
+        if candidato_id not in candidatos_agrupados:
+            resultados_finales[candidato_id] = {
+                'estado_evaluacion': ESTADO_EVALUACION_FALLIDA,
+                'evaluaciones_fallidas': num_fallidas,
+                'puntuacion_global': None,
+                'razonamiento_paso_a_paso': '',
+                'puntuaciones_parciales_promediadas': {},
+                'justificaciones': [],
+                'justificacion_consolidada': 'La evaluación con IA falló para todos los evaluadores.',
+                'match_soft_skills_consenso': {},
+                'match_skills_tecnicas_consenso': {},
+                'PREGUNTAS_TECNICAS': [],
+                'PREGUNTAS_RRHH': [],
+                'PREGUNTAS_MANAGER': []
+            }
+
     for candidato_id, evaluaciones in candidatos_agrupados.items():
         evaluaciones_con_clave = [
             (eval, eval.get('perfil_evaluador', ''))
@@ -132,9 +275,13 @@ def _procesar_evaluaciones(data: list) -> dict:
             preguntas_por_perfil[clave].extend(eval.get('preguntas_entrevista', []))
         
         evaluacion_final_candidato = {
+            'estado_evaluacion': ESTADO_EVALUACION_EVALUADA,
+            'evaluaciones_fallidas': fallidas_por_candidato.get(candidato_id, 0),
+            'evaluaciones_omitidas': omitidas_por_candidato.get(candidato_id, 0),
             'puntuacion_global': puntuacion_global_final,
             'razonamiento_paso_a_paso': razonamiento_final,
             'puntuaciones_parciales_promediadas': puntuaciones_promediadas,
+            'justificaciones': justificaciones_evaluadores(evaluaciones_con_clave),
             'justificacion_consolidada': justificacion_final,
             'match_soft_skills_consenso': soft_skills_consenso,
             'match_skills_tecnicas_consenso': hard_skills_consenso,
@@ -155,7 +302,7 @@ def obtener_datos_todos_los_candidatos() -> dict:
     conn = None
     todos_los_candidatos = {}
     try:
-        conn = mysql.connector.connect(**DB_CONFIG)
+        conn = db.obtener_conexion()
         cursor = conn.cursor(dictionary=True)
 
         query = "SELECT id_candidato, Otros FROM CANDIDATOS;"
@@ -177,27 +324,115 @@ def obtener_datos_todos_los_candidatos() -> dict:
         if conn and conn.is_connected():
             conn.close()
     
-def _eliminar_evaluaciones_por_puesto(nombre_vacante: str):
+def contar_candidatos() -> int:
+    """Devuelve el número total de candidatos (para informar del progreso)."""
+    conn = None
+    try:
+        conn = db.obtener_conexion()
+        with conn.cursor() as cur:
+            cur.execute("SELECT COUNT(*) FROM CANDIDATOS;")
+            return cur.fetchone()[0]
+    except Error as e:
+        print(f"❌ Error al contar los candidatos: {e}")
+        return 0
+    finally:
+        if conn and conn.is_connected():
+            conn.close()
+
+def _parsear_otros(json_string) -> dict:
+    """Parsea el JSON de la columna 'Otros' de un candidato."""
+    if not json_string:
+        return {}
+    try:
+        return json.loads(json_string)
+    except (json.JSONDecodeError, TypeError):
+        return {}
+
+def iterar_candidatos(tamano_pagina: int = TAMANO_PAGINA_CANDIDATOS, ids_candidatos=None):
+    """
+    Recorre la tabla CANDIDATOS por páginas (paginación por clave sobre id_candidato)
+    y va entregando (id_candidato, otros_json_sin_parsear). El JSON se deja sin parsear
+    para que el consumidor lo decodifique solo cuando lo vaya a usar. Con
+    `ids_candidatos` solo se leen esos candidatos.
+    """
+    conn = None
+    ultimo_id = None
+    try:
+        conn = db.obtener_conexion()
+        with conn.cursor() as cur:
+            if ids_candidatos is not None:
+                ids = sorted(ids_candidatos)
+                for i in range(0, len(ids), tamano_pagina):
+                    pagina = ids[i:i + tamano_pagina]
+                    cur.execute(
+                        f"SELECT id_candidato, Otros FROM CANDIDATOS WHERE id_candidato IN ({', '.join(['%s'] * len(pagina))}) "
+                        "ORDER BY id_candidato;", pagina
+                    )
+                    yield from cur.fetchall()
+                return
+            while True:
+                if ultimo_id is None:
+                    cur.execute("SELECT id_candidato, Otros FROM CANDIDATOS ORDER BY id_candidato LIMIT %s;", (tamano_pagina,))
+                else:
+                    cur.execute(
+                        "SELECT id_candidato, Otros FROM CANDIDATOS WHERE id_candidato > %s ORDER BY id_candidato LIMIT %s;",
+                        (ultimo_id, tamano_pagina)
+                    )
+                pagina = cur.fetchall()
+                if not pagina:
+                    return
+                for id_candidato, otros in pagina:
+                    yield id_candidato, otros
+                ultimo_id = pagina[-1][0]
+                if len(pagina) < tamano_pagina:
+                    return
+    except Error as e:
+        print(f"❌ Error al recorrer los candidatos: {e}")
+    finally:
+        if conn and conn.is_connected():
+            conn.close()
+
+def invalidar_caches_lectura(nombre_vacante: str, ids_candidatos=None):
+    """
+    Invalida el ranking del puesto y los informes de los candidatos indicados (de todos
+    si no se indican). Los informes se agrupan por candidato, no por puesto, porque las
+    soft skills del candidato son comunes a todos sus puestos.
     """
-    Elimina todas las evaluaciones de SCORING y VALORACION_HARD_SKILL
-    asociadas a un puesto específico. Es el paso previo a una re-evaluación.
+    CACHE_RANKING.invalidar(nombre_vacante)
+    if ids_candidatos is None:
+        CACHE_INFORMES.vaciar()
+    else:
+        for id_candidato in ids_candidatos:
+            CACHE_INFORMES.invalidar(str(id_candidato))
+
+def _eliminar_evaluaciones_por_puesto(nombre_vacante: str, ids_candidatos, incluir_huellas: bool = False):
     """
+    Elimina el SCORING y las VALORACION_HARD_SKILL de los candidatos indicados para un
+    puesto. Es el paso previo a re-evaluarlos. Con `incluir_huellas` borra también sus
+    huellas del puesto, para que se vuelvan a evaluar aunque sus datos no cambien.
+    VALORACION_SOFT_SKILL no se toca: es común a todos los puestos del candidato y
+    guardar_evaluaciones_masivamente solo la rellena si el candidato no tiene ninguna.
+    """
+    ids = list(ids_candidatos)
+    if not ids:
+        return
     conn = None
     try:
-        conn = mysql.connector.connect(**DB_CONFIG)
+        conn = db.obtener_conexion()
         conn.autocommit = False
         cursor = conn.cursor()
         print(f"   -> Eliminando evaluaciones antiguas del puesto '{nombre_vacante}'...")
 
         # El orden es importante para no violar restricciones de claves foráneas.
         # Primero borramos de la tabla que tiene la dependencia.
-        cursor.execute("DELETE FROM VALORACION_SOFT_SKILL")
-        cursor.execute("DELETE FROM VALORACION_HARD_SKILL WHERE PUESTO = %s;", (nombre_vacante,))
-        cursor.execute("DELETE FROM SCORING WHERE PUESTO = %s;", (nombre_vacante,))
-
-        # Nota: VALORACION_SOFT_SKILL no se ve afectada, ya que es agnóstica al puesto.
+        placeholders = ', '.join(['%s'] * len(ids))
+        if incluir_huellas:
+            cursor.execute(f"DELETE FROM HUELLA_EVALUACION WHERE PUESTO = %s AND ID_CANDIDATO IN ({placeholders});", (nombre_vacante, *ids))
+        cursor.execute(f"DELETE FROM VALORACION_HARD_SKILL WHERE PUESTO = %s AND ID_CANDIDATO IN ({placeholders});", (nombre_vacante, *ids))
+        cursor.execute(f"DELETE FROM SCORING WHERE PUESTO = %s AND ID_CANDIDATO IN ({placeholders});", (nombre_vacante, *ids))
 
         conn.commit()
+        invalidar_caches_lectura(nombre_vacante, ids)
         print(f"   -> OK. {cursor.rowcount} evaluaciones eliminadas de la tabla SCORING.")
     except Error as e:
         print(f"❌ Error al eliminar las evaluaciones del puesto '{nombre_vacante}': {e}")
@@ -208,84 +443,236 @@ def _eliminar_evaluaciones_por_puesto(nombre_vacante: str):
             cursor.close()
             conn.close()
 
-async def evaluar_candidato_con_llm(semaphore,id, candidato_json, requisitos, perfil_evaluador):
+async def evaluar_candidato_con_llm(planificador, id, candidato_json, requisitos, perfil_evaluador, usar_cache=True,
+                                    plantilla: plantillas_prompt.PlantillaEvaluacion = None):
     """
     Realiza una evaluación detallada y, además, genera 5 preguntas de entrevista.
+    Si `usar_cache` es True, reutiliza la respuesta guardada para un prompt idéntico.
+    La llamada pasa por el `planificador` (límites RPM/TPM, concurrencia adaptativa y
+    reintentos); si aun así falla, devuelve un resultado marcado con 'error'.
+    `plantilla` es la plantilla del prompt de la ejecución; si no se indica, se crea
+    una para los `requisitos`.
     """
-    async with semaphore:
-        if not isinstance(requisitos, dict):
-            requisitos = {}
+    if not isinstance(requisitos, dict):
+        requisitos = {}
+    plantilla = plantilla or plantillas_prompt.crear_plantilla(requisitos, EVALUADORES)
+
+    prompt = plantilla.individual(id, candidato_json, perfil_evaluador)
+
+    clave_cache = cache_llm.calcular_clave(MODELO_LLM, GENERATION_CONFIG, prompt.texto)
+    if usar_cache:
+        texto_cache = await bd_async.ejecutar(CACHE_RESPUESTAS.obtener, clave_cache)
+        if texto_cache is not None:
+            try:
+                return json.loads(texto_cache)
+            except json.JSONDecodeError:
+                pass
+
+    async def llamar_modelo():
+        texto = await BACKEND_LLM.generar(prompt.sufijo, GENERATION_CONFIG, prefijo=prompt.prefijo)
+        # Un JSON corrupto lanza JSONDecodeError, que el planificador trata como transitorio.
+        return texto, json.loads(texto)
 
-        candidato_str = json.dumps(candidato_json, indent=2, ensure_ascii=False)
-        requisitos_str = json.dumps(requisitos, indent=2, ensure_ascii=False)
-        requisitos_block = f"```json\n{requisitos_str}\n```"
-        candidato_block = f"```json\n{candidato_str}\n```"
-        
-        prompt = f"""
-        **Tu perspectiva como evaluador**
-        {EVALUADORES[perfil_evaluador]}
-
-        Evalúa al siguiente candidato para el puesto definido en los requisitos, basándote **únicamente** en la información de su perfil en formato JSON.
-
-        **Requisitos del Puesto:**
-        {requisitos_block}
-
-        **Perfil del Candidato (JSON):**
-        {candidato_block}
-
-        **Tu Tarea:**
-        1.  Realiza un análisis siguiendo el **orden estricto de importancia**.
-        2.  **Genera 5 preguntas de entrevista** diseñadas para profundizar en las áreas más débiles o dudosas que hayas identificado en tu análisis.
-        3.  Devuelve toda tu evaluación en el formato JSON requerido.
-
-        **Orden de Análisis Obligatorio:**
-        1.  **Experiencia Profesional (`trayectoria_profesional`):** El factor más crítico.
-        2.  **Formación (`formacion`):** Segundo factor más importante.
-        3.  **Competencias Técnicas (`competencias_tecnicas`):** Evalúa el nivel de las competencias.
-        4.  **Soft Skills (`soft_skills`):** El factor de menor peso.
-
-        **Formato JSON de Salida Requerido:**
-        1.  `id_candidato`: El ID del candidato {id}.
-        2.  `perfil_evaluador`: El perfil del evaluador utilizado {perfil_evaluador}.
-        3.  `razonamiento_paso_a_paso`: Un texto donde analizas al candidato **siguiendo los 4 puntos del orden de análisis obligatorio**.
-        4.  `puntuaciones_parciales`: Un objeto JSON con una puntuación de 0 a 100 para cada categoría. Ejemplo: {{"experiencia": 80, "formacion": 90, "skills_tecnicas": 70, "soft_skills": 80}}
-        5.  `justificacion`: Un resumen breve (máximo 3 frases) de tu evaluación.
-        6.  `match_soft_skills`: Para cada habilidad, evalúa el nivel de evidencia en el texto y asigna una calificación: 'A' (evidencia mínima), 'B' (evidencia moderada), 'C' (evidencia sólida), 'D' (evidencia muy fuerte y demostrada). Si la habilidad no se menciona en absoluto, usa el valor 'A'.
-        7.  `match_skills_tecnicas`: Para cada habilidad, evalúa el nivel de evidencia en el texto y asigna una calificación: 'A' (evidencia mínima), 'B' (evidencia moderada), 'C' (evidencia sólida), 'D' (evidencia muy fuerte y demostrada). Si la habilidad no se menciona en absoluto, usa el valor 'A'.
-        8.  `preguntas_entrevista`: Una lista de 5 preguntas en formato string.
-
-        **Reglas Críticas de Puntuación:**
-        - **0-25 (Candidato Irrelevante):** Si la experiencia Y la formación son de un campo completamente diferente.
-        - **26-50 (Candidato Poco Relevante):** Si tiene la formación base pero carece de experiencia práctica y skills críticas.
-        - **51-75 (Candidato Viable):** Si demuestra buena alineación en formación O en experiencia, con algunas carencias en skills.
-        - **76-100 (Candidato Fuerte):** Si muestra fuerte alineación en experiencia Y formación, y domina la mayoría de skills.
-        **Reglas Críticas de Formato:**
-        - La salida debe ser **únicamente un objeto JSON válido** y nada más.
-        - No incluyas comentarios, texto introductorio o final fuera del bloque JSON.
-        - Asegúrate de que todos los campos estén separados por comas.
-        - Escapa correctamente todos los caracteres especiales dentro de los strings, como saltos de línea (usando \\n) o comillas dobles (usando \\\").
-        """
+    try:
+        texto, resultado = await planificador.ejecutar(llamar_modelo, tokens_estimados=_estimar_tokens(prompt.texto) + TOKENS_SALIDA_ESTIMADOS)
+        # Solo se cachean las respuestas que son JSON válido.
+        await bd_async.ejecutar(CACHE_RESPUESTAS.guardar, clave_cache, texto, puesto=requisitos.get('puesto'))
+        return resultado
+    except LLMFallido as e:
+        print(f"Error al evaluar con el LLM ({BACKEND_LLM.nombre}) tras {e.intentos} intentos: {e}")
+        # Se marca explícitamente como fallida: no se inventan puntuaciones que
+        # acabarían guardadas en SCORING como si fueran reales.
+        return {
+            "error": str(e),
+            "rezagado": isinstance(e, PlazoAgotado),
+            "id_candidato": id,
+            "perfil_evaluador": perfil_evaluador
+        }
+
+def _puntuacion_global_evaluacion(evaluacion: dict):
+    """Puntuación global (0-100) de una sola evaluación, con los mismos PESOS que el consenso."""
+    puntuaciones = evaluacion.get('puntuaciones_parciales') or {}
+    try:
+        return sum(float(puntuaciones.get(categoria, 0)) * peso for categoria, peso in PESOS.items())
+    except (TypeError, ValueError):
+        return None
 
+def _motivo_parada(evaluaciones: list):
+    """
+    Decide si el muestreo adaptativo puede omitir los evaluadores restantes.
+    Devuelve 'banda', 'consenso' o None si hace falta otra evaluación.
+    """
+    puntuaciones = [p for p in map(_puntuacion_global_evaluacion, evaluaciones) if p is not None]
+    if not puntuaciones:
+        return None
+    if len(puntuaciones) >= MIN_EVALUACIONES_BANDA:
+        for minimo, maximo in BANDAS_PARADA:
+            if all(minimo <= p <= maximo for p in puntuaciones):
+                return 'banda'
+    if len(puntuaciones) >= 2 and max(puntuaciones) - min(puntuaciones) <= TOLERANCIA_CONSENSO:
+        return 'consenso'
+    return None
+
+def _evaluacion_valida(evaluacion) -> bool:
+    """Comprueba que una evaluación devuelta por el LLM tiene la forma mínima esperada."""
+    if not isinstance(evaluacion, dict):
+        return False
+    puntuaciones = evaluacion.get('puntuaciones_parciales')
+    if not isinstance(puntuaciones, dict) or not puntuaciones:
+        return False
+    try:
+        return all(0 <= float(v) <= 100 for v in puntuaciones.values())
+    except (TypeError, ValueError):
+        return False
+
+def _separar_respuesta_lote(respuesta, ids_esperados, campo: str = 'id_candidato') -> dict:
+    """
+    Reparte la respuesta de un lote por candidato (o por perfil evaluador si `campo`
+    es 'perfil_evaluador'). Acepta el objeto {"evaluaciones": [...]} o directamente el
+    array. Devuelve {id: evaluación} solo con las entradas válidas de ids esperados;
+    las ausentes, repetidas o mal formadas se descartan.
+    """
+    if isinstance(respuesta, dict):
+        respuesta = respuesta.get('evaluaciones', next((v for v in respuesta.values() if isinstance(v, list)), []))
+    if not isinstance(respuesta, list):
+        return {}
+    ids_por_texto = {str(id_candidato): id_candidato for id_candidato in ids_esperados}
+    separadas, repetidas = {}, set()
+    for evaluacion in respuesta:
+        if not isinstance(evaluacion, dict):
+            continue
+        id_candidato = ids_por_texto.get(str(evaluacion.get(campo)))
+        if id_candidato is None:
+            continue
+        if id_candidato in separadas:
+            repetidas.add(id_candidato)
+        elif _evaluacion_valida(evaluacion):
+            separadas[id_candidato] = evaluacion
+    # Si el modelo devuelve dos evaluaciones para el mismo id no se sabe cuál es la buena.
+    for id_candidato in repetidas:
+        separadas.pop(id_candidato, None)
+    return separadas
+
+async def evaluar_lote_con_llm(planificador, candidatos: list, requisitos, perfil_evaluador, usar_cache=True,
+                               estadisticas: dict = None, plantilla: plantillas_prompt.PlantillaEvaluacion = None) -> list:
+    """
+    Evalúa varios candidatos con una sola llamada al LLM para un perfil evaluador.
+    Las entradas que falten o no sean válidas en la respuesta se vuelven a pedir con
+    la llamada individual de siempre (evaluar_candidato_con_llm).
+
+    Args:
+        candidatos (list): Pares (id_candidato, datos_candidato).
+        estadisticas (dict, opcional): Contadores 'llamadas_lote', 'candidatos_lote' y
+                                       'recuperados_individualmente' que se van acumulando.
+
+    Returns:
+        list: Una evaluación por candidato, en el mismo orden que `candidatos`.
+    """
+    if not isinstance(requisitos, dict):
+        requisitos = {}
+    estadisticas = estadisticas if estadisticas is not None else defaultdict(int)
+    plantilla = plantilla or plantillas_prompt.crear_plantilla(requisitos, EVALUADORES)
+    ids = [id_candidato for id_candidato, _ in candidatos]
+    prompt = plantilla.lote(candidatos, perfil_evaluador)
+    clave_cache = cache_llm.calcular_clave(MODELO_LLM, GENERATION_CONFIG, prompt.texto)
+
+    separadas = {}
+    if usar_cache:
+        texto_cache = await bd_async.ejecutar(CACHE_RESPUESTAS.obtener, clave_cache)
+        if texto_cache is not None:
+            try:
+                separadas = _separar_respuesta_lote(json.loads(texto_cache), ids)
+            except json.JSONDecodeError:
+                pass
+
+    if not separadas:
+        async def llamar_modelo():
+            texto = await BACKEND_LLM.generar(prompt.sufijo, GENERATION_CONFIG, prefijo=prompt.prefijo)
+            return texto, json.loads(texto)
+
+        estadisticas["llamadas_lote"] += 1
         try:
-            model = genai.GenerativeModel(
-                'gemini-2.0-flash',
-                generation_config={"response_mime_type": "application/json", "temperature": 0.1}
+            texto, respuesta = await planificador.ejecutar(
+                llamar_modelo, tokens_estimados=_estimar_tokens(prompt.texto) + TOKENS_SALIDA_ESTIMADOS * len(candidatos)
             )
-            response = await model.generate_content_async(prompt)
-            return json.loads(response.text)
-        except Exception as e:
-            print(f"Error al evaluar con la API de Gemini: {e}")
-            # Devuelve una estructura de error consistente que incluye el campo de preguntas
-            return {
-                "id_candidato": id,
-                "perfil_evaluador": perfil_evaluador,
-                "razonamiento_paso_a_paso": f"Error en el procesamiento con Gemini: {e}",
-                "puntuaciones_parciales": {"experiencia": 0, "formacion": 0, "skills_tecnicas": 0, "soft_skills": 0},
-                "justificacion": "Error en el procesamiento.",
-                "match_soft_skills": {},
-                "match_skills_tecnicas": {},
-                "preguntas_entrevista": ["Error al generar preguntas."]
-            }
+            separadas = _separar_respuesta_lote(respuesta, ids)
+            if len(separadas) == len(ids):
+                await bd_async.ejecutar(CACHE_RESPUESTAS.guardar, clave_cache, texto, puesto=requisitos.get('puesto'))
+        except PlazoAgotado as e:
+            # Sin tiempo para repetir las llamadas una a una: todo el lote queda rezagado.
+            return [{"error": str(e), "rezagado": True, "id_candidato": id_candidato, "perfil_evaluador": perfil_evaluador}
+                    for id_candidato in ids]
+        except LLMFallido as e:
+            print(f"⚠️  Falló la evaluación en lote de {len(ids)} candidatos ({perfil_evaluador}): {e}. Se evalúan uno a uno.")
+    estadisticas["candidatos_lote"] += len(separadas)
+
+    faltan = [(id_candidato, datos) for id_candidato, datos in candidatos if id_candidato not in separadas]
+    if faltan:
+        estadisticas["recuperados_individualmente"] += len(faltan)
+        individuales = await asyncio.gather(*(
+            evaluar_candidato_con_llm(planificador, id_candidato, datos, requisitos, perfil_evaluador, usar_cache, plantilla)
+            for id_candidato, datos in faltan
+        ))
+        separadas.update(zip((id_candidato for id_candidato, _ in faltan), individuales))
+    return [separadas[id_candidato] for id_candidato in ids]
+
+async def evaluar_multiperfil_con_llm(planificador, id, candidato_json, requisitos, perfiles: list, usar_cache=True,
+                                      estadisticas: dict = None,
+                                      plantilla: plantillas_prompt.PlantillaEvaluacion = None) -> list:
+    """
+    Evalúa a un candidato desde varios perfiles evaluadores con una sola llamada al LLM.
+    Cada evaluación conserva la forma de la individual (perfil_evaluador,
+    puntuaciones_parciales, match_*, preguntas_entrevista...). Los perfiles que falten
+    o no sean válidos en la respuesta se piden con la llamada individual de siempre.
+
+    Returns:
+        list: Una evaluación por perfil, en el mismo orden que `perfiles`.
+    """
+    if not isinstance(requisitos, dict):
+        requisitos = {}
+    estadisticas = estadisticas if estadisticas is not None else defaultdict(int)
+    plantilla = plantilla or plantillas_prompt.crear_plantilla(requisitos, EVALUADORES)
+    prompt = plantilla.multiperfil(id, candidato_json, perfiles)
+    clave_cache = cache_llm.calcular_clave(MODELO_LLM, GENERATION_CONFIG, prompt.texto)
+
+    separadas = {}
+    if usar_cache:
+        texto_cache = await bd_async.ejecutar(CACHE_RESPUESTAS.obtener, clave_cache)
+        if texto_cache is not None:
+            try:
+                separadas = _separar_respuesta_lote(json.loads(texto_cache), perfiles, campo='perfil_evaluador')
+            except json.JSONDecodeError:
+                pass
+
+    if not separadas:
+        async def llamar_modelo():
+            texto = await BACKEND_LLM.generar(prompt.sufijo, GENERATION_CONFIG, prefijo=prompt.prefijo)
+            return texto, json.loads(texto)
+
+        estadisticas["llamadas_multiperfil"] += 1
+        try:
+            texto, respuesta = await planificador.ejecutar(
+                llamar_modelo, tokens_estimados=_estimar_tokens(prompt.texto) + TOKENS_SALIDA_ESTIMADOS * len(perfiles)
+            )
+            separadas = _separar_respuesta_lote(respuesta, perfiles, campo='perfil_evaluador')
+            if len(separadas) == len(perfiles):
+                await bd_async.ejecutar(CACHE_RESPUESTAS.guardar, clave_cache, texto, puesto=requisitos.get('puesto'))
+        except PlazoAgotado as e:
+            return [{"error": str(e), "rezagado": True, "id_candidato": id, "perfil_evaluador": perfil}
+                    for perfil in perfiles]
+        except LLMFallido as e:
+            print(f"⚠️  Falló la evaluación multiperfil del candidato {id}: {e}. Se evalúa perfil a perfil.")
+    estadisticas["perfiles_multiperfil"] += len(separadas)
+
+    faltan = [perfil for perfil in perfiles if perfil not in separadas]
+    if faltan:
+        estadisticas["recuperados_individualmente"] += len(faltan)
+        individuales = await asyncio.gather(*(
+            evaluar_candidato_con_llm(planificador, id, candidato_json, requisitos, perfil, usar_cache, plantilla)
+            for perfil in faltan
+        ))
+        separadas.update(zip(faltan, individuales))
+    return [separadas[perfil] for perfil in perfiles]
 
     
 def _calcular_consenso_skill(lista_ratings: list) -> str:
@@ -310,7 +697,7 @@ def obtener_requisitos_puesto(puesto: str) -> dict:
     }
 
     try:
-        conn = mysql.connector.connect(**DB_CONFIG)
+        conn = db.obtener_conexion()
         with conn.cursor() as cur:
             # 2. Recuperar la MISION del puesto
             query_mision = "SELECT MISION FROM PUESTOS_PREDEFINIDOS WHERE PUESTO = %s;"
@@ -321,15 +708,17 @@ def obtener_requisitos_puesto(puesto: str) -> dict:
             else:
                 print(f"⚠️  No se encontró el puesto '{puesto}' en la tabla PUESTOS_PREDEFINIDOS.")
 
-            # 3. Recuperar las HARD SKILLS del puesto
-            query_hard_skills = "SELECT HARD_SKILL FROM CAT_HARD_SKILL WHERE PUESTO = %s;"
+            # 3. Recuperar las HARD SKILLS del puesto. Se ordenan para que los requisitos (y con
+            # ellos el prompt y la huella de evaluación) no dependan del orden en que MySQL
+            # devuelva las filas.
+            query_hard_skills = "SELECT HARD_SKILL FROM CAT_HARD_SKILL WHERE PUESTO = %s ORDER BY HARD_SKILL;"
             cur.execute(query_hard_skills, (puesto,))
             # El resultado es una lista de tuplas [(skill1,), (skill2,)...], la aplanamos.
             resultados_hard_skills = cur.fetchall()
             requisitos_puesto['skills_tecnicas_requeridas'] = [item[0] for item in resultados_hard_skills]
 
             # 4. Recuperar todas las SOFT SKILLS
-            query_soft_skills = "SELECT SOFT_SKILL FROM CAT_SOFT_SKILL;"
+            query_soft_skills = "SELECT SOFT_SKILL FROM CAT_SOFT_SKILL ORDER BY SOFT_SKILL;"
             cur.execute(query_soft_skills)
             resultados_soft_skills = cur.fetchall()
             requisitos_puesto['soft_skills_deseadas'] = [item[0] for item in resultados_soft_skills]
@@ -344,30 +733,412 @@ def obtener_requisitos_puesto(puesto: str) -> dict:
         if conn and conn.is_connected():
             conn.close()
 
+def obtener_modo_evaluacion(puesto: str) -> str:
+    """Devuelve el modo de evaluación configurado para el puesto ('individual' por defecto)."""
+    esquema.asegurar_esquema()
+    conn = None
+    try:
+        conn = db.obtener_conexion()
+        with conn.cursor() as cur:
+            cur.execute("SELECT MODO_EVALUACION FROM PUESTOS_PREDEFINIDOS WHERE PUESTO = %s;", (puesto,))
+            fila = cur.fetchone()
+            if fila and fila[0] in MODOS_EVALUACION:
+                return fila[0]
+    except Error as error:
+        print(f"⚠️  No se pudo leer el modo de evaluación del puesto '{puesto}': {error}")
+    finally:
+        if conn and conn.is_connected():
+            conn.close()
+    return MODO_EVALUACION_INDIVIDUAL
+
+
+def obtener_configuracion_preseleccion(puesto: str) -> tuple:
+    """
+    Devuelve (top_k, umbral) de la preselección del puesto. Si el puesto no tiene
+    valores propios se usan los de preseleccion.py; (0, 0) la desactiva.
+    """
+    esquema.asegurar_esquema()
+    top_k, umbral = preseleccion.TOP_K_PRESELECCION, preseleccion.UMBRAL_PRESELECCION
+    conn = None
+    try:
+        conn = db.obtener_conexion()
+        with conn.cursor() as cur:
+            cur.execute("SELECT PRESELECCION_TOP_K, PRESELECCION_UMBRAL FROM PUESTOS_PREDEFINIDOS WHERE PUESTO = %s;", (puesto,))
+            fila = cur.fetchone()
+            if fila:
+                top_k = top_k if fila[0] is None else int(fila[0])
+                umbral = umbral if fila[1] is None else float(fila[1])
+    except Error as error:
+        print(f"⚠️  No se pudo leer la preselección del puesto '{puesto}': {error}")
+    finally:
+        if conn and conn.is_connected():
+            conn.close()
+    return top_k, umbral
+
+
+def _estimar_tokens(texto: str) -> int:
+    """Estimación aproximada de tokens (≈4 caracteres por token) para el límite TPM."""
+    return len(texto) // 4
 
 def normalizar_texto(texto: str) -> str:
     """Convierte texto a minúsculas, sin tildes ni espacios extra."""
     if not isinstance(texto, str): return ""
     return unidecode(texto).lower().strip()
 
-def guardar_evaluaciones_masivamente(lista_evaluaciones: dict, nombre_vacante: str):
+def calcular_huella_evaluacion(requisitos: dict, candidato_json: dict, perfil_evaluador: str,
+                               modo: str = MODO_EVALUACION_INDIVIDUAL) -> str:
+    """
+    Calcula una huella (SHA-256) de todas las entradas que determinan la respuesta
+    de `evaluar_candidato_con_llm`: requisitos del puesto, JSON 'Otros' del candidato
+    (los campos que envía la plantilla), perfil del evaluador y versión del prompt. Si la huella no cambia, la evaluación
+    tampoco debería cambiar. El modo solo entra en la huella si no es el individual,
+    para que las huellas ya guardadas sigan siendo válidas.
+    """
+    entradas = {
+        "version_prompt": VERSION_PROMPT,
+        "modelo": MODELO_LLM,
+        "requisitos": requisitos,
+        "candidato": candidato_json,
+        "perfil_evaluador": perfil_evaluador,
+        "perspectiva": EVALUADORES.get(perfil_evaluador, '')
+    }
+    if modo != MODO_EVALUACION_INDIVIDUAL:
+        entradas["modo"] = modo
+    contenido = json.dumps(entradas, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(contenido.encode('utf-8')).hexdigest()
+
+def obtener_huellas_evaluacion(nombre_vacante: str) -> dict:
+    """
+    Recupera las huellas guardadas de un puesto con el formato
+    {(id_candidato, perfil_evaluador): huella}. Las respuestas no se cargan aquí
+    para no materializar en memoria todas las evaluaciones del puesto.
+    """
+    esquema.asegurar_esquema()
+    conn = None
+    try:
+        conn = db.obtener_conexion()
+        with conn.cursor() as cur:
+            cur.execute(
+                "SELECT ID_CANDIDATO, PERFIL_EVALUADOR, HUELLA FROM HUELLA_EVALUACION WHERE PUESTO = %s;",
+                (nombre_vacante,)
+            )
+            return {(id_candidato, perfil): huella for id_candidato, perfil, huella in cur.fetchall()}
+    except Error as e:
+        print(f"❌ Error al recuperar las huellas del puesto '{nombre_vacante}': {e}")
+        return {}
+    finally:
+        if conn and conn.is_connected():
+            conn.close()
+
+def obtener_respuestas_evaluacion(nombre_vacante: str, ids_candidatos, tamano_lote: int = 1000) -> list:
+    """
+    Recupera las respuestas crudas guardadas del LLM para los candidatos indicados,
+    consultando por lotes para no construir listas IN gigantes.
+    """
+    ids = list(ids_candidatos)
+    if not ids:
+        return []
+    conn = None
+    respuestas = []
+    try:
+        conn = db.obtener_conexion()
+        with conn.cursor() as cur:
+            for inicio in range(0, len(ids), tamano_lote):
+                lote = ids[inicio:inicio + tamano_lote]
+                placeholders = ', '.join(['%s'] * len(lote))
+                cur.execute(
+                    f"SELECT RESPUESTA FROM HUELLA_EVALUACION WHERE PUESTO = %s AND ID_CANDIDATO IN ({placeholders});",
+                    (nombre_vacante, *lote)
+                )
+                for (respuesta,) in cur.fetchall():
+                    try:
+                        respuestas.append(json.loads(respuesta))
+                    except (json.JSONDecodeError, TypeError):
+                        continue
+        return respuestas
+    except Error as e:
+        print(f"❌ Error al recuperar las respuestas guardadas del puesto '{nombre_vacante}': {e}")
+        return []
+    finally:
+        if conn and conn.is_connected():
+            conn.close()
+
+def obtener_no_preseleccionados(nombre_vacante: str) -> set:
+    """IDs de los candidatos cuyo SCORING publicado del puesto es NO_PRESELECCIONADO."""
+    conn = None
+    try:
+        conn = db.obtener_conexion()
+        with conn.cursor() as cur:
+            cur.execute("SELECT ID_CANDIDATO FROM SCORING WHERE PUESTO = %s AND ESTADO_EVALUACION = %s;",
+                        (nombre_vacante, ESTADO_EVALUACION_NO_PRESELECCIONADO))
+            return {fila[0] for fila in cur.fetchall()}
+    except Error as e:
+        print(f"❌ Error al recuperar los candidatos no preseleccionados del puesto '{nombre_vacante}': {e}")
+        return set()
+    finally:
+        if conn and conn.is_connected():
+            conn.close()
+
+def guardar_huellas_evaluacion(nombre_vacante: str, registros: list, id_ejecucion: int = None):
+    """
+    Guarda (o actualiza) la huella y la respuesta cruda del LLM de cada par.
+
+    Args:
+        registros (list): Tuplas (id_candidato, perfil_evaluador, huella, respuesta_dict).
+        id_ejecucion (int, opcional): Si se indica, se guardan en la preparación de esa
+                                      ejecución y se hacen efectivas al publicarla.
+    """
+    if not registros:
+        return
+    esquema.asegurar_esquema()
+    conn = None
+    try:
+        conn = db.obtener_conexion()
+        with conn.cursor() as cur:
+            filas = [
+                (nombre_vacante, id_candidato, perfil, huella, json.dumps(respuesta, ensure_ascii=False))
+                for id_candidato, perfil, huella, respuesta in registros
+            ]
+            columnas = ('PUESTO', 'ID_CANDIDATO', 'PERFIL_EVALUADOR', 'HUELLA', 'RESPUESTA')
+            if id_ejecucion is None:
+                escritura_masiva.insertar_filas(cur, 'HUELLA_EVALUACION', columnas, filas, actualizar=('HUELLA', 'RESPUESTA'))
+            else:
+                escritura_masiva.insertar_filas(cur, 'HUELLA_EVALUACION_PREPARACION', ('ID_EJECUCION',) + columnas,
+                                                [(id_ejecucion, *fila) for fila in filas], actualizar=('HUELLA', 'RESPUESTA'))
+        conn.commit()
+        print(f"✅ {len(registros)} huellas de evaluación guardadas.")
+    except Error as e:
+        print(f"❌ Error al guardar las huellas del puesto '{nombre_vacante}': {e}")
+        if conn:
+            conn.rollback()
+    finally:
+        if conn and conn.is_connected():
+            conn.close()
+
+def crear_ejecucion(nombre_vacante: str, tipo: str, parametros: dict) -> int:
+    """Registra una nueva ejecución de evaluación y devuelve su ID_EJECUCION."""
+    esquema.asegurar_esquema()
+    conn = None
+    try:
+        conn = db.obtener_conexion()
+        with conn.cursor() as cur:
+            cur.execute(
+                "INSERT INTO EJECUCION_EVALUACION (PUESTO, TIPO, ESTADO, PARAMETROS) VALUES (%s, %s, %s, %s);",
+                (nombre_vacante, tipo, ESTADO_EJECUCION_EN_CURSO, json.dumps(parametros, ensure_ascii=False))
+            )
+            conn.commit()
+            return cur.lastrowid
+    except Error as e:
+        print(f"❌ Error al registrar la ejecución del puesto '{nombre_vacante}': {e}")
+        return None
+    finally:
+        if conn and conn.is_connected():
+            conn.close()
+
+def finalizar_ejecucion(id_ejecucion: int, estado: str, error: str = None, estadisticas: dict = None):
+    """
+    Marca una ejecución como terminada con el estado indicado. Las `estadisticas`
+    (pares evaluados, sin cambios, omitidos por el muestreo adaptativo...) se guardan
+    junto a la ejecución.
+    """
+    if id_ejecucion is None:
+        return
+    conn = None
+    try:
+        conn = db.obtener_conexion()
+        with conn.cursor() as cur:
+            cur.execute(
+                "UPDATE EJECUCION_EVALUACION SET ESTADO = %s, ERROR = %s, ESTADISTICAS = %s, FIN = CURRENT_TIMESTAMP "
+                "WHERE ID_EJECUCION = %s;",
+                (estado, error, json.dumps(estadisticas, ensure_ascii=False) if estadisticas else None, id_ejecucion)
+            )
+        conn.commit()
+    except Error as e:
+        print(f"❌ Error al cerrar la ejecución {id_ejecucion}: {e}")
+    finally:
+        if conn and conn.is_connected():
+            conn.close()
+
+def obtener_ejecucion(id_ejecucion: int = None, nombre_vacante: str = None, solo_incompletas: bool = False) -> dict:
+    """
+    Recupera una ejecución por su ID o, si no se indica, la más reciente del puesto.
+    Con `solo_incompletas` solo se consideran ejecuciones que no terminaron.
+    """
+    esquema.asegurar_esquema()
+    conn = None
+    condiciones, valores = [], []
+    if id_ejecucion is not None:
+        condiciones.append("ID_EJECUCION = %s")
+        valores.append(id_ejecucion)
+    if nombre_vacante is not None:
+        condiciones.append("PUESTO = %s")
+        valores.append(nombre_vacante)
+    if solo_incompletas:
+        condiciones.append("ESTADO <> %s")
+        valores.append(ESTADO_EJECUCION_COMPLETADA)
+    where = f"WHERE {' AND '.join(condiciones)}" if condiciones else ""
+    try:
+        conn = db.obtener_conexion()
+        with conn.cursor(dictionary=True) as cur:
+            cur.execute(f"SELECT * FROM EJECUCION_EVALUACION {where} ORDER BY ID_EJECUCION DESC LIMIT 1;", valores)
+            ejecucion = cur.fetchone()
+            if ejecucion:
+                ejecucion['PARAMETROS'] = _parsear_otros(ejecucion.get('PARAMETROS'))
+                ejecucion['ESTADISTICAS'] = _parsear_otros(ejecucion.get('ESTADISTICAS'))
+            return ejecucion
+    except Error as e:
+        print(f"❌ Error al recuperar la ejecución: {e}")
+        return None
+    finally:
+        if conn and conn.is_connected():
+            conn.close()
+
+def listar_ejecuciones(nombre_vacante: str = None, limite: int = 50) -> list:
+    """Lista las ejecuciones más recientes, opcionalmente filtradas por puesto."""
+    esquema.asegurar_esquema()
+    conn = None
+    try:
+        conn = db.obtener_conexion()
+        with conn.cursor(dictionary=True) as cur:
+            sql = "SELECT ID_EJECUCION, PUESTO, TIPO, ESTADO, COMPLETADOS, ERROR, ESTADISTICAS, INICIO, FIN FROM EJECUCION_EVALUACION"
+            if nombre_vacante:
+                cur.execute(sql + " WHERE PUESTO = %s ORDER BY ID_EJECUCION DESC LIMIT %s;", (nombre_vacante, limite))
+            else:
+                cur.execute(sql + " ORDER BY ID_EJECUCION DESC LIMIT %s;", (limite,))
+            ejecuciones = cur.fetchall()
+            for ejecucion in ejecuciones:
+                ejecucion['ESTADISTICAS'] = _parsear_otros(ejecucion.get('ESTADISTICAS'))
+            return ejecuciones
+    except Error as e:
+        print(f"❌ Error al listar las ejecuciones: {e}")
+        return []
+    finally:
+        if conn and conn.is_connected():
+            conn.close()
+
+def guardar_resultados_ejecucion(id_ejecucion: int, resultados: list):
+    """Guarda el punto de control: la respuesta cruda de cada par completado."""
+    if id_ejecucion is None or not resultados:
+        return
+    conn = None
+    try:
+        conn = db.obtener_conexion()
+        with conn.cursor() as cur:
+            escritura_masiva.insertar_filas(
+                cur, 'EJECUCION_RESULTADO', ('ID_EJECUCION', 'ID_CANDIDATO', 'PERFIL_EVALUADOR', 'RESPUESTA', 'ERROR'),
+                [
+                    (id_ejecucion, r['id_candidato'], r['perfil_evaluador'], json.dumps(r, ensure_ascii=False), 1 if r.get('error') else 0)
+                    for r in resultados
+                ],
+                actualizar=('RESPUESTA', 'ERROR')
+            )
+            cur.execute(
+                "UPDATE EJECUCION_EVALUACION SET COMPLETADOS = COMPLETADOS + %s WHERE ID_EJECUCION = %s;",
+                (len(resultados), id_ejecucion)
+            )
+        conn.commit()
+    except Error as e:
+        print(f"❌ Error al guardar el punto de control de la ejecución {id_ejecucion}: {e}")
+        if conn:
+            conn.rollback()
+    finally:
+        if conn and conn.is_connected():
+            conn.close()
+
+def obtener_resultados_ejecucion(id_ejecucion: int) -> dict:
+    """
+    Recupera las respuestas correctas ya registradas de una ejecución con el formato
+    {(id_candidato, perfil_evaluador): respuesta_dict}.
+    """
+    conn = None
+    resultados = {}
+    try:
+        conn = db.obtener_conexion()
+        with conn.cursor() as cur:
+            cur.execute(
+                "SELECT ID_CANDIDATO, PERFIL_EVALUADOR, RESPUESTA FROM EJECUCION_RESULTADO WHERE ID_EJECUCION = %s AND ERROR = 0;",
+                (id_ejecucion,)
+            )
+            for id_candidato, perfil, respuesta in cur:
+                try:
+                    resultados[(id_candidato, perfil)] = json.loads(respuesta)
+                except (json.JSONDecodeError, TypeError):
+                    continue
+        return resultados
+    except Error as e:
+        print(f"❌ Error al recuperar los resultados de la ejecución {id_ejecucion}: {e}")
+        return {}
+    finally:
+        if conn and conn.is_connected():
+            conn.close()
+
+def actualizar_puntuacion_ponderada(cursor, nombre_vacante: str, ids_candidatos=None):
+    """
+    Recalcula SCORING.SCORE_PONDERADO (puntuación 0-100 con las ponderaciones del
+    puesto) con el cursor recibido, dentro de la transacción de quien llama. Si se
+    indica `ids_candidatos`, solo la de esos candidatos.
+    """
+    sql = """
+        UPDATE SCORING s JOIN PUESTOS_PREDEFINIDOS pp ON s.PUESTO = pp.PUESTO
+        SET s.SCORE_PONDERADO = (
+            pp.POND_FORMACION * (s.SCORE_FORMACION * 10) +
+            pp.POND_EXPERIENCIA * (s.SCORE_EXPERIENCIA * 10) +
+            pp.POND_SOFT_SKILL * (s.SCORE_SOFT_SKILL * 10) +
+            pp.POND_HARD_SKILL * (s.SCORE_HARD_SKILL * 10)
+        )
+        WHERE s.PUESTO = %s
+    """
+    if ids_candidatos is None:
+        cursor.execute(sql, (nombre_vacante,))
+        return
+    ids = list(ids_candidatos)
+    if ids:
+        placeholders = ', '.join(['%s'] * len(ids))
+        cursor.execute(f"{sql} AND s.ID_CANDIDATO IN ({placeholders})", (nombre_vacante, *ids))
+
+def guardar_evaluaciones_masivamente(lista_evaluaciones: dict, nombre_vacante: str, id_ejecucion: int = None):
     """
     Guarda una lista de evaluaciones en la BD de forma masiva y eficiente.
-    Utiliza una única transacción y minimiza las consultas a la BD.
+    Los candidatos se procesan en bloques de DB_BULK_CHUNK_CANDIDATES, cada uno en su
+    propia transacción y con INSERT multi-fila (escritura_masiva): si falla un bloque se
+    revierte solo ese y los anteriores quedan guardados.
     
     Args:
         lista_evaluaciones (list): Una lista de diccionarios. Cada diccionario
                                   debe contener 'id_candidato' y 'evaluacion'.
         nombre_vacante (str): El nombre de la vacante para la que se evalúa.
+        id_ejecucion (int, opcional): Si se indica, las evaluaciones se escriben en las
+                                      tablas de preparación de esa ejecución (reemplazando
+                                      las que ya tuviera de esos candidatos) y no son
+                                      visibles hasta publicar_ejecucion.
     """
         
     if not lista_evaluaciones:
         print("La lista de evaluaciones está vacía. No hay nada que hacer.")
         return
 
+    esquema.asegurar_esquema()
     conn = None
+    preparacion = id_ejecucion is not None
+    # En preparación, las mismas filas van a las tablas *_PREPARACION con el ID_EJECUCION delante.
+    sufijo = '_PREPARACION' if preparacion else ''
+    columna_ejecucion = ('ID_EJECUCION',) if preparacion else ()
+    columnas_scoring = columna_ejecucion + (
+        'PUESTO', 'ID_CANDIDATO', 'ESTADO_EVALUACION', 'SCORE', 'Justificacion', 'JUSTIFICACIONES', 'SCORE_FORMACION',
+        'SCORE_EXPERIENCIA', 'SCORE_SOFT_SKILL', 'SCORE_HARD_SKILL', 'PREGUNTAS_TECNICAS',
+        'PREGUNTAS_RRHH', 'PREGUNTAS_MANAGER'
+    )
+    columnas_soft_skills = columna_ejecucion + ('ID_CANDIDATO', 'ID_SOFT_SKILL', 'VALORACION', 'MARCA_IA')
+    columnas_hard_skills = columna_ejecucion + ('PUESTO', 'ID_CANDIDATO', 'ID_HARD_SKILL', 'VALORACION', 'MARCA_IA')
+
+    def filas(datos):
+        return [(id_ejecucion, *fila) for fila in datos] if preparacion else datos
+
+    candidatos = list(lista_evaluaciones.items())
+    num_bloques = (len(candidatos) + escritura_masiva.TAMANO_BLOQUE_CANDIDATOS - 1) // escritura_masiva.TAMANO_BLOQUE_CANDIDATOS
+    totales = {'scoring': 0, 'soft': 0, 'hard': 0}
     try:
-        conn = mysql.connector.connect(**DB_CONFIG)
+        conn = db.obtener_conexion()
         conn.autocommit = False
         cursor = conn.cursor()
 
@@ -379,95 +1150,102 @@ def guardar_evaluaciones_masivamente(lista_evaluaciones: dict, nombre_vacante: s
         
         cursor.execute("SELECT ID_HARD_SKILL, HARD_SKILL FROM CAT_HARD_SKILL WHERE PUESTO = %s;", (nombre_vacante,))
         mapa_hard_skill_id = {normalizar_texto(nombre): id_skill for id_skill, nombre in cursor.fetchall()}
-        
-        # Comprobar duplicados de SCORING de forma masiva
-        ids_candidatos_entrantes = [candidato_id for candidato_id, item in lista_evaluaciones.items()]
-        placeholders = ', '.join(['%s'] * len(ids_candidatos_entrantes))
-        query_check_scoring = f"SELECT ID_CANDIDATO FROM SCORING WHERE PUESTO = %s AND ID_CANDIDATO IN ({placeholders});"
-        cursor.execute(query_check_scoring, (nombre_vacante, *ids_candidatos_entrantes))
-        candidatos_con_scoring = {row[0] for row in cursor.fetchall()}
-
-        # Comprobar qué candidatos ya tienen soft skills de forma masiva
-        query_check_soft = f"SELECT DISTINCT ID_CANDIDATO FROM VALORACION_SOFT_SKILL WHERE ID_CANDIDATO IN ({placeholders});"
-        cursor.execute(query_check_soft, (*ids_candidatos_entrantes,))
-        candidatos_con_soft_skills = {row[0] for row in cursor.fetchall()}
-
-        # --- 2. PREPARAR DATOS PARA INSERCIÓN MASIVA ---
-
-        datos_para_scoring = []
-        datos_para_soft_skills = []
-        datos_para_hard_skills = []
-
-        for key, item in lista_evaluaciones.items():
-            id_candidato = key
-            evaluacion = item
-
-            # Omitir si ya existe una evaluación para este puesto
-            if id_candidato in candidatos_con_scoring:
-                print(f"⚠️  AVISO: Ya existe SCORING para el candidato {id_candidato}. Se omite.")
-                continue
+        conn.commit()
 
-            # Preparar datos para la tabla SCORING
-            puntuaciones_parciales = evaluacion.get('puntuaciones_parciales_promediadas', {})
-            datos_para_scoring.append((
-                nombre_vacante,
-                id_candidato,
-                evaluacion.get('puntuacion_global'),
-                evaluacion.get('justificacion_consolidada'),
-                puntuaciones_parciales.get('formacion'),
-                puntuaciones_parciales.get('experiencia'),
-                puntuaciones_parciales.get('soft_skills'),
-                puntuaciones_parciales.get('skills_tecnicas'),
-                json.dumps(evaluacion.get('PREGUNTAS_TECNICAS', []), ensure_ascii=False),
-                json.dumps(evaluacion.get('PREGUNTAS_RRHH', []), ensure_ascii=False),
-                json.dumps(evaluacion.get('PREGUNTAS_MANAGER', []), ensure_ascii=False)
-            ))
-
-            # Preparar datos para VALORACION_HARD_SKILL
-            for nombre_skill, valoracion in evaluacion.get('match_skills_tecnicas_consenso', {}).items():
-                id_skill = mapa_hard_skill_id.get(normalizar_texto(nombre_skill))
-                if id_skill:
-                    # Se añade una entrada por cada marca (IA y Humano, por ejemplo)
-                    datos_para_hard_skills.append((nombre_vacante, id_candidato, id_skill, valoracion, 0))
-                    datos_para_hard_skills.append((nombre_vacante, id_candidato, id_skill, valoracion, 1))
-
-            # Preparar datos para VALORACION_SOFT_SKILL (solo si no existen previamente)
-            if id_candidato not in candidatos_con_soft_skills:
-                for nombre_skill, valoracion in evaluacion.get('match_soft_skills_consenso', {}).items():
-                    id_skill = mapa_soft_skill_id.get(normalizar_texto(nombre_skill))
+        for num_bloque, bloque in enumerate(escritura_masiva.bloques(candidatos, escritura_masiva.TAMANO_BLOQUE_CANDIDATOS), 1):
+            ids_candidatos_entrantes = [candidato_id for candidato_id, item in bloque]
+            placeholders = ', '.join(['%s'] * len(ids_candidatos_entrantes))
+            if preparacion:
+                # Lo publicado no se toca ni se consulta: se sustituye lo que esta misma ejecución
+                # hubiera preparado ya para estos candidatos (p. ej. antes de reanudarla).
+                for tabla in ('SCORING_PREPARACION', 'VALORACION_SOFT_SKILL_PREPARACION', 'VALORACION_HARD_SKILL_PREPARACION'):
+                    cursor.execute(f"DELETE FROM {tabla} WHERE ID_EJECUCION = %s AND ID_CANDIDATO IN ({placeholders});",
+                                   (id_ejecucion, *ids_candidatos_entrantes))
+                candidatos_con_scoring, candidatos_con_soft_skills = set(), set()
+            else:
+                # Comprobar duplicados de SCORING de forma masiva
+                query_check_scoring = f"SELECT ID_CANDIDATO FROM SCORING WHERE PUESTO = %s AND ID_CANDIDATO IN ({placeholders});"
+                cursor.execute(query_check_scoring, (nombre_vacante, *ids_candidatos_entrantes))
+                candidatos_con_scoring = {row[0] for row in cursor.fetchall()}
+
+                # Comprobar qué candidatos ya tienen soft skills de forma masiva
+                query_check_soft = f"SELECT DISTINCT ID_CANDIDATO FROM VALORACION_SOFT_SKILL WHERE ID_CANDIDATO IN ({placeholders});"
+                cursor.execute(query_check_soft, (*ids_candidatos_entrantes,))
+                candidatos_con_soft_skills = {row[0] for row in cursor.fetchall()}
+
+            # --- 2. PREPARAR DATOS PARA INSERCIÓN MASIVA ---
+
+            datos_para_scoring = []
+            datos_para_soft_skills = []
+            datos_para_hard_skills = []
+
+            for key, item in bloque:
+                id_candidato = key
+                evaluacion = item
+
+                # Omitir si ya existe una evaluación para este puesto
+                if id_candidato in candidatos_con_scoring:
+                    print(f"⚠️  AVISO: Ya existe SCORING para el candidato {id_candidato}. Se omite.")
+                    continue
+
+                # Preparar datos para la tabla SCORING
+                puntuaciones_parciales = evaluacion.get('puntuaciones_parciales_promediadas', {})
+                datos_para_scoring.append((
+                    nombre_vacante,
+                    id_candidato,
+                    evaluacion.get('estado_evaluacion', ESTADO_EVALUACION_EVALUADA),
+                    evaluacion.get('puntuacion_global'),
+                    evaluacion.get('justificacion_consolidada'),
+                    json.dumps(evaluacion.get('justificaciones', []), ensure_ascii=False),
+                    puntuaciones_parciales.get('formacion'),
+                    puntuaciones_parciales.get('experiencia'),
+                    puntuaciones_parciales.get('soft_skills'),
+                    puntuaciones_parciales.get('skills_tecnicas'),
+                    json.dumps(evaluacion.get('PREGUNTAS_TECNICAS', []), ensure_ascii=False),
+                    json.dumps(evaluacion.get('PREGUNTAS_RRHH', []), ensure_ascii=False),
+                    json.dumps(evaluacion.get('PREGUNTAS_MANAGER', []), ensure_ascii=False)
+                ))
+
+                # Preparar datos para VALORACION_HARD_SKILL
+                for nombre_skill, valoracion in evaluacion.get('match_skills_tecnicas_consenso', {}).items():
+                    id_skill = mapa_hard_skill_id.get(normalizar_texto(nombre_skill))
                     if id_skill:
-                        datos_para_soft_skills.append((id_candidato, id_skill, valoracion, 0))
-                        datos_para_soft_skills.append((id_candidato, id_skill, valoracion, 1))
-        
-        # --- 3. EJECUTAR INSERCIONES MASIVAS ---
-        
-        if datos_para_scoring:
-            print(f"1/3 - Insertando {len(datos_para_scoring)} registros en SCORING...")
-            query_scoring = """INSERT INTO SCORING (PUESTO, ID_CANDIDATO, SCORE, Justificacion, SCORE_FORMACION, 
-                               SCORE_EXPERIENCIA, SCORE_SOFT_SKILL, SCORE_HARD_SKILL, PREGUNTAS_TECNICAS, 
-                               PREGUNTAS_RRHH, PREGUNTAS_MANAGER) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s);"""
-            cursor.executemany(query_scoring, datos_para_scoring)
-            print("  -> OK")
-
-        if datos_para_soft_skills:
-            print(f"2/3 - Insertando {len(datos_para_soft_skills)} registros en VALORACION_SOFT_SKILL...")
-            query_soft_skills = "INSERT INTO VALORACION_SOFT_SKILL (ID_CANDIDATO, ID_SOFT_SKILL, VALORACION, MARCA_IA) VALUES (%s, %s, %s, %s);"
-            cursor.executemany(query_soft_skills, datos_para_soft_skills)
-            print("  -> OK")
-
-        if datos_para_hard_skills:
-            print(f"3/3 - Insertando {len(datos_para_hard_skills)} registros en VALORACION_HARD_SKILL...")
-            query_hard_skills = "INSERT INTO VALORACION_HARD_SKILL (PUESTO, ID_CANDIDATO, ID_HARD_SKILL, VALORACION, MARCA_IA) VALUES (%s, %s, %s, %s, %s);"
-            cursor.executemany(query_hard_skills, datos_para_hard_skills)
-            print("  -> OK")
-
-        conn.commit()
-        print("\n✅ Transacción completada. Todos los datos han sido guardados.")
+                        # Se añade una entrada por cada marca (IA y Humano, por ejemplo)
+                        datos_para_hard_skills.append((nombre_vacante, id_candidato, id_skill, valoracion, 0))
+                        datos_para_hard_skills.append((nombre_vacante, id_candidato, id_skill, valoracion, 1))
+
+                # Preparar datos para VALORACION_SOFT_SKILL (solo si no existen previamente)
+                if id_candidato not in candidatos_con_soft_skills:
+                    for nombre_skill, valoracion in evaluacion.get('match_soft_skills_consenso', {}).items():
+                        id_skill = mapa_soft_skill_id.get(normalizar_texto(nombre_skill))
+                        if id_skill:
+                            datos_para_soft_skills.append((id_candidato, id_skill, valoracion, 0))
+                            datos_para_soft_skills.append((id_candidato, id_skill, valoracion, 1))
+
+            # --- 3. EJECUTAR INSERCIONES MASIVAS (una transacción por bloque) ---
+
+            escritura_masiva.insertar_filas(cursor, f"SCORING{sufijo}", columnas_scoring, filas(datos_para_scoring))
+            if datos_para_scoring and not preparacion:
+                actualizar_puntuacion_ponderada(cursor, nombre_vacante, [fila[1] for fila in datos_para_scoring])
+            escritura_masiva.insertar_filas(cursor, f"VALORACION_SOFT_SKILL{sufijo}", columnas_soft_skills, filas(datos_para_soft_skills))
+            escritura_masiva.insertar_filas(cursor, f"VALORACION_HARD_SKILL{sufijo}", columnas_hard_skills, filas(datos_para_hard_skills))
+
+            conn.commit()
+            if not preparacion:
+                invalidar_caches_lectura(nombre_vacante, ids_candidatos_entrantes)
+            totales['scoring'] += len(datos_para_scoring)
+            totales['soft'] += len(datos_para_soft_skills)
+            totales['hard'] += len(datos_para_hard_skills)
+            if num_bloques > 1:
+                print(f"   -> Bloque {num_bloque}/{num_bloques} guardado ({len(bloque)} candidatos).")
+
+        print(f"\n✅ Evaluaciones guardadas en {num_bloques} bloque(s): {totales['scoring']} en SCORING{sufijo}, "
+              f"{totales['soft']} en VALORACION_SOFT_SKILL{sufijo}, {totales['hard']} en VALORACION_HARD_SKILL{sufijo}.")
 
     except Error as error:
         print(f"\n❌ Error durante la transacción masiva: {error}")
         if conn:
-            print("  -> Revertiendo cambios (rollback)...")
+            print("  -> Revertiendo el bloque en curso (rollback); los bloques anteriores quedan guardados...")
             conn.rollback()
     finally:
         if conn and conn.is_connected():
@@ -475,6 +1253,124 @@ def guardar_evaluaciones_masivamente(lista_evaluaciones: dict, nombre_vacante: s
             conn.close()
             print("  -> Conexión a la base de datos cerrada.")
 
+TABLAS_PREPARACION = ('SCORING_PREPARACION', 'VALORACION_HARD_SKILL_PREPARACION',
+                      'VALORACION_SOFT_SKILL_PREPARACION', 'HUELLA_EVALUACION_PREPARACION')
+
+def publicar_ejecucion(id_ejecucion: int, nombre_vacante: str):
+    """
+    Publica en una sola transacción lo preparado por una ejecución: sustituye el SCORING,
+    las hard skills y las soft skills de los candidatos preparados, actualiza sus huellas
+    (y borra las de los descartados en la preselección) y vacía la preparación. Los
+    lectores ven la evaluación anterior completa hasta el commit y la nueva completa después.
+
+    Returns:
+        int: candidatos publicados, o None si hubo un error (la preparación se conserva
+             y la ejecución se puede reanudar).
+    """
+    esquema.asegurar_esquema()
+    conn = None
+    try:
+        conn = db.obtener_conexion()
+        conn.autocommit = False
+        with conn.cursor() as cur:
+            cur.execute("SELECT ID_CANDIDATO FROM SCORING_PREPARACION WHERE ID_EJECUCION = %s;", (id_ejecucion,))
+            ids = [fila[0] for fila in cur.fetchall()]
+            print(f"   -> Publicando la ejecución {id_ejecucion}: {len(ids)} candidatos preparados...")
+
+            cur.execute("""
+                DELETE s FROM SCORING s
+                JOIN SCORING_PREPARACION p ON p.PUESTO = s.PUESTO AND p.ID_CANDIDATO = s.ID_CANDIDATO
+                WHERE p.ID_EJECUCION = %s;
+            """, (id_ejecucion,))
+            cur.execute("""
+                DELETE h FROM VALORACION_HARD_SKILL h
+                JOIN SCORING_PREPARACION p ON p.PUESTO = h.PUESTO AND p.ID_CANDIDATO = h.ID_CANDIDATO
+                WHERE p.ID_EJECUCION = %s;
+            """, (id_ejecucion,))
+            # Los descartados en la preselección pierden sus huellas, para volver a evaluarlos
+            # si más adelante pasan la preselección aunque sus datos no hayan cambiado.
+            cur.execute("""
+                DELETE h FROM HUELLA_EVALUACION h
+                JOIN SCORING_PREPARACION p ON p.PUESTO = h.PUESTO AND p.ID_CANDIDATO = h.ID_CANDIDATO
+                WHERE p.ID_EJECUCION = %s AND p.ESTADO_EVALUACION = %s;
+            """, (id_ejecucion, ESTADO_EVALUACION_NO_PRESELECCIONADO))
+            # Las soft skills no dependen del puesto: solo se sustituyen las de los candidatos que
+            # tienen soft skills preparadas. Los descartados en la preselección o con la evaluación
+            # fallida no traen ninguna y conservan las que tenían.
+            cur.execute("""
+                DELETE v FROM VALORACION_SOFT_SKILL v
+                JOIN (SELECT DISTINCT ID_CANDIDATO FROM VALORACION_SOFT_SKILL_PREPARACION WHERE ID_EJECUCION = %s) p
+                  ON p.ID_CANDIDATO = v.ID_CANDIDATO;
+            """, (id_ejecucion,))
+
+            cur.execute("""
+                INSERT INTO SCORING (PUESTO, ID_CANDIDATO, ESTADO_EVALUACION, SCORE, Justificacion, JUSTIFICACIONES,
+                                     SCORE_FORMACION, SCORE_EXPERIENCIA, SCORE_SOFT_SKILL, SCORE_HARD_SKILL,
+                                     PREGUNTAS_TECNICAS, PREGUNTAS_RRHH, PREGUNTAS_MANAGER)
+                SELECT PUESTO, ID_CANDIDATO, ESTADO_EVALUACION, SCORE, Justificacion, JUSTIFICACIONES,
+                       SCORE_FORMACION, SCORE_EXPERIENCIA, SCORE_SOFT_SKILL, SCORE_HARD_SKILL,
+                       PREGUNTAS_TECNICAS, PREGUNTAS_RRHH, PREGUNTAS_MANAGER
+                FROM SCORING_PREPARACION WHERE ID_EJECUCION = %s;
+            """, (id_ejecucion,))
+            cur.execute("""
+                INSERT INTO VALORACION_HARD_SKILL (PUESTO, ID_CANDIDATO, ID_HARD_SKILL, VALORACION, MARCA_IA)
+                SELECT PUESTO, ID_CANDIDATO, ID_HARD_SKILL, VALORACION, MARCA_IA
+                FROM VALORACION_HARD_SKILL_PREPARACION WHERE ID_EJECUCION = %s;
+            """, (id_ejecucion,))
+            cur.execute("""
+                INSERT INTO VALORACION_SOFT_SKILL (ID_CANDIDATO, ID_SOFT_SKILL, VALORACION, MARCA_IA)
+                SELECT ID_CANDIDATO, ID_SOFT_SKILL, VALORACION, MARCA_IA
+                FROM VALORACION_SOFT_SKILL_PREPARACION WHERE ID_EJECUCION = %s;
+            """, (id_ejecucion,))
+            cur.execute("""
+                INSERT INTO HUELLA_EVALUACION (PUESTO, ID_CANDIDATO, PERFIL_EVALUADOR, HUELLA, RESPUESTA)
+                SELECT PUESTO, ID_CANDIDATO, PERFIL_EVALUADOR, HUELLA, RESPUESTA
+                FROM HUELLA_EVALUACION_PREPARACION WHERE ID_EJECUCION = %s
+                ON DUPLICATE KEY UPDATE HUELLA = VALUES(HUELLA), RESPUESTA = VALUES(RESPUESTA);
+            """, (id_ejecucion,))
+            if ids:
+                actualizar_puntuacion_ponderada(cur, nombre_vacante)
+
+            for tabla in TABLAS_PREPARACION:
+                cur.execute(f"DELETE FROM {tabla} WHERE ID_EJECUCION = %s;", (id_ejecucion,))
+        conn.commit()
+        invalidar_caches_lectura(nombre_vacante, ids)
+        print(f"✅ Ejecución {id_ejecucion} publicada: {len(ids)} candidatos.")
+        return len(ids)
+    except Error as e:
+        print(f"❌ Error al publicar la ejecución {id_ejecucion} del puesto '{nombre_vacante}': {e}")
+        if conn:
+            conn.rollback()
+        return None
+    finally:
+        if conn and conn.is_connected():
+            conn.close()
+
+def descartar_preparaciones_antiguas(nombre_vacante: str, id_ejecucion_actual: int):
+    """
+    Borra lo preparado por ejecuciones anteriores del puesto que no están en curso (fallidas,
+    con el plazo agotado o sustituidas). No se pierde nada: si se reanudan, su punto de
+    control vuelve a preparar los candidatos sin llamar al LLM.
+    """
+    conn = None
+    try:
+        conn = db.obtener_conexion()
+        with conn.cursor() as cur:
+            for tabla in TABLAS_PREPARACION:
+                cur.execute(f"""
+                    DELETE p FROM {tabla} p
+                    JOIN EJECUCION_EVALUACION e ON e.ID_EJECUCION = p.ID_EJECUCION
+                    WHERE e.PUESTO = %s AND e.ESTADO <> %s AND p.ID_EJECUCION <> %s;
+                """, (nombre_vacante, ESTADO_EJECUCION_EN_CURSO, id_ejecucion_actual))
+        conn.commit()
+    except Error as e:
+        print(f"⚠️  No se pudo limpiar la preparación de ejecuciones anteriores de '{nombre_vacante}': {e}")
+        if conn:
+            conn.rollback()
+    finally:
+        if conn and conn.is_connected():
+            conn.close()
+
 def guardar_evaluacion_en_db(evaluacion: dict, id_candidato: int, nombre_vacante: str):
     """
     Guarda la evaluación completa (scores, justificación y preguntas) en la BD.
@@ -482,7 +1378,7 @@ def guardar_evaluacion_en_db(evaluacion: dict, id_candidato: int, nombre_vacante
     """
     conn = None
     try:
-        conn = mysql.connector.connect(**DB_CONFIG)
+        conn = db.obtener_conexion()
         conn.autocommit = False
         cursor = conn.cursor()
 
@@ -501,10 +1397,10 @@ def guardar_evaluacion_en_db(evaluacion: dict, id_candidato: int, nombre_vacante
         print("1/3 - Insertando en la tabla SCORING...")
         query_scoring = """
             INSERT INTO SCORING
-            (PUESTO, ID_CANDIDATO, SCORE, Justificacion,
+            (PUESTO, ID_CANDIDATO, SCORE, Justificacion, JUSTIFICACIONES,
              SCORE_FORMACION, SCORE_EXPERIENCIA, SCORE_SOFT_SKILL, SCORE_HARD_SKILL,
              PREGUNTAS_TECNICAS, PREGUNTAS_RRHH, PREGUNTAS_MANAGER)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s);
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s);
         """
         puntuaciones_parciales = evaluacion.get('puntuaciones_parciales', {})
 
@@ -513,6 +1409,8 @@ def guardar_evaluacion_en_db(evaluacion: dict, id_candidato: int, nombre_vacante
             id_candidato,
             evaluacion.get('puntuacion_global'),
             evaluacion.get('justificacion'),
+            json.dumps(justificaciones_evaluadores([(evaluacion, evaluacion.get('perfil_evaluador', ''))]) if evaluacion.get('justificacion') else [],
+                       ensure_ascii=False),
             puntuaciones_parciales.get('formacion'),
             puntuaciones_parciales.get('experiencia'),
             puntuaciones_parciales.get('soft_skills'),
@@ -522,6 +1420,7 @@ def guardar_evaluacion_en_db(evaluacion: dict, id_candidato: int, nombre_vacante
             json.dumps(evaluacion.get('PREGUNTAS_MANAGER', []), ensure_ascii=False)  # <-- AÑADIDO
         )
         cursor.execute(query_scoring, datos_scoring)
+        actualizar_puntuacion_ponderada(cursor, nombre_vacante, [id_candidato])
         print("   -> OK")
 
         # 2. Comprobar e Insertar en VALORACION_SOFT_SKILL
@@ -565,6 +1464,7 @@ def guardar_evaluacion_en_db(evaluacion: dict, id_candidato: int, nombre_vacante
             print(f"   -> OK ({len(datos_hard_skills)} filas)")
 
         conn.commit()
+        invalidar_caches_lectura(nombre_vacante, [id_candidato])
         print("\n✅ Transacción completada. Todos los datos han sido guardados.")
 
     except Error as error:
@@ -578,65 +1478,642 @@ def guardar_evaluacion_en_db(evaluacion: dict, id_candidato: int, nombre_vacante
             conn.close()
             print("   -> Conexión a la base de datos cerrada.")
     
-async def orquestador_reevaluar_puesto_modificado(nombre_vacante: str):
+async def _lanzar_evaluaciones(pares, requisitos_puesto: dict, progreso=None, usar_cache: bool = True,
+                              total: int = None, al_resultado=None, respuestas_previas: dict = None,
+                              plazo_ejecucion: float = PLAZO_EJECUCION, lote_llm: int = TAMANO_LOTE_LLM,
+                              multiperfil: bool = False, adaptativo: bool = False,
+                              plantilla: plantillas_prompt.PlantillaEvaluacion = None) -> dict:
     """
-    Orquesta la re-evaluación completa de un puesto que ha sido modificado.
-    Primero borra todas las evaluaciones existentes para ese puesto y luego
-    lanza el proceso de evaluación contra todos los candidatos.
-    """
-    print(f"\n{'#'*25} INICIO PIPELINE: RE-EVALUACIÓN DEL PUESTO '{nombre_vacante}' {'#'*25}")
-
-    # --- PASO 1: BORRAR DATOS ANTIGUOS ---
-    print(f"\n--- Fase 1/2: Limpiando datos de evaluaciones previas... ---")
-    _eliminar_evaluaciones_por_puesto(nombre_vacante)
+    Evalúa con el LLM los pares (id_candidato, datos_candidato, perfil_evaluador)
+    que entrega el iterable `pares`. Un productor los va volcando en una cola acotada
+    y MAX_CONSULTAS_CONCURRENTES consumidores los procesan, de modo que solo hay en
+    memoria tantos pares como permite la cola, sin importar el tamaño de la tabla.
+    Cada llamada tiene un plazo de TIMEOUT_LLAMADA segundos (LLM_TIMEOUT, en
+    planificador_llm) y la ejecución entera uno de `plazo_ejecucion`: al vencer, se
+    deja de lanzar pares y se termina con lo completado.
 
-    # --- PASO 2: RE-EVALUAR (REUTILIZANDO LA LÓGICA EXISTENTE) ---
-    print(f"\n--- Fase 2/2: Lanzando nueva evaluación completa... ---")
-    # Reutilizamos completamente la función original. ¡Máxima eficiencia!
-    await (orquestador_evaluar_puesto_nuevo_optimizado(nombre_vacante))
+    Args:
+        pares (iterable): Pares a evaluar; puede ser un generador perezoso, también
+                          asíncrono (p. ej. leyendo los candidatos con bd_async).
+        total (int, opcional): Número de pares esperado, solo para informar del progreso.
+        al_resultado (corrutina, opcional): Se invoca con cada resultado en cuanto llega.
+                                            Si se indica, los resultados no se acumulan.
+        respuestas_previas (dict, opcional): {(id_candidato, perfil): respuesta} ya obtenidas
+                                             en una ejecución anterior; esos pares no llaman al LLM.
+        plazo_ejecucion (float): Segundos máximos de la ejecución (0 = sin límite).
+        lote_llm (int): Candidatos por llamada al LLM para un mismo evaluador. Con 1
+                        (por defecto) cada par se evalúa con su propia llamada.
+        multiperfil (bool): Evalúa todos los perfiles pendientes de un candidato con una
+                            sola llamada. Los pares de cada candidato deben llegar seguidos.
+                            Tiene prioridad sobre `lote_llm`.
+        adaptativo (bool): Consulta los evaluadores de cada candidato en secuencia y omite
+                           los restantes si ya hay consenso o el candidato cae en una banda
+                           clara. Los pares omitidos se notifican marcados con 'omitido'.
+        plantilla (PlantillaEvaluacion, opcional): Plantilla del prompt, construida una vez
+                                                   por ejecución. Por defecto, la de VERSION_PROMPT.
+
+    Returns:
+        dict: 'resultados' (vacío si se usa `al_resultado`), 'rezagados' (pares cortados
+              por el plazo global), 'no_iniciados', 'plazo_agotado', 'lotes', 'adaptativo',
+              'prompt' (tokens de los prompts construidos) y métricas del planificador.
+    """
+    lote_llm = max(1, lote_llm or 1)
+    plantilla = plantilla or plantillas_prompt.crear_plantilla(requisitos_puesto, EVALUADORES)
+    fecha_limite = time.monotonic() + plazo_ejecucion if plazo_ejecucion else None
+    planificador = PlanificadorLLM(concurrencia_maxima=MAX_CONSULTAS_CONCURRENTES, timeout_llamada=TIMEOUT_LLAMADA,
+                                   fecha_limite=fecha_limite)
+    cola = asyncio.Queue(maxsize=MAX_CONSULTAS_CONCURRENTES * 2)
+    contador = {"total": total or 0, "completados": 0, "errores": 0}
+    informe = {"resultados": [], "rezagados": [], "no_iniciados": 0, "plazo_agotado": False,
+               "lotes": defaultdict(int), "adaptativo": defaultdict(int)}
+    if progreso:
+        progreso(contador["total"], 0, 0)
+
+    async def notificar(id_candidato, evaluador, resultado):
+        if isinstance(resultado, dict):
+            # Se fijan los identificadores conocidos en lugar de confiar en el eco del modelo.
+            resultado['id_candidato'] = id_candidato
+            resultado['perfil_evaluador'] = evaluador
+            if resultado.get('rezagado'):
+                informe["rezagados"].append((id_candidato, evaluador))
+            if al_resultado:
+                await al_resultado(resultado)
+            else:
+                informe["resultados"].append(resultado)
+        contador["completados"] += 1
+        contador["total"] = max(contador["total"], contador["completados"])
+        if not isinstance(resultado, dict) or resultado.get("error"):
+            contador["errores"] += 1
+        if progreso:
+            progreso(contador["total"], contador["completados"], contador["errores"])
+
+    async def evaluar_y_notificar(id_candidato, datos_candidato, evaluador):
+        try:
+            resultado = (respuestas_previas or {}).pop((id_candidato, evaluador), None)
+            if resultado is None:
+                resultado = await evaluar_candidato_con_llm(planificador, id_candidato, datos_candidato, requisitos_puesto,
+                                                            evaluador, usar_cache, plantilla)
+        except Exception as e:
+            print(f"Error inesperado al evaluar al candidato {id_candidato}: {e}")
+            resultado = None
+        await notificar(id_candidato, evaluador, resultado)
+        return resultado
+
+    async def evaluar_adaptativo_y_notificar(grupo):
+        # Los evaluadores de un mismo candidato se consultan uno tras otro, en el orden
+        # fijado, y se paran en cuanto el resultado ya no va a cambiar de forma relevante.
+        orden = {evaluador: i for i, evaluador in enumerate(ORDEN_EVALUADORES_ADAPTATIVO)}
+        grupo = sorted(grupo, key=lambda par: orden.get(par[2], len(orden)))
+        estadisticas = informe["adaptativo"]
+        estadisticas["candidatos"] += 1
+        estadisticas["pares"] += len(grupo)
+        evaluaciones = []
+        for i, (id_candidato, datos_candidato, evaluador) in enumerate(grupo):
+            resultado = await evaluar_y_notificar(id_candidato, datos_candidato, evaluador)
+            if isinstance(resultado, dict) and not resultado.get('error') and not resultado.get('omitido'):
+                evaluaciones.append(resultado)
+            motivo = _motivo_parada(evaluaciones)
+            restantes = grupo[i + 1:]
+            if motivo and restantes:
+                estadisticas[f"parada_{motivo}"] += 1
+                estadisticas["omitidos"] += len(restantes)
+                for id_restante, _, evaluador_restante in restantes:
+                    (respuestas_previas or {}).pop((id_restante, evaluador_restante), None)
+                    await notificar(id_restante, evaluador_restante, {"omitido": True, "motivo": motivo})
+                return
+
+    async def evaluar_grupo_y_notificar(grupo):
+        # Los pares con respuesta previa no entran en la llamada agrupada.
+        pendientes = []
+        for id_candidato, datos_candidato, evaluador in grupo:
+            if (respuestas_previas or {}).get((id_candidato, evaluador)) is not None:
+                await evaluar_y_notificar(id_candidato, datos_candidato, evaluador)
+            else:
+                pendientes.append((id_candidato, datos_candidato, evaluador))
+        if len(pendientes) <= 1:
+            for par in pendientes:
+                await evaluar_y_notificar(*par)
+            return
+        try:
+            if multiperfil:
+                # Mismo candidato, varios perfiles evaluadores.
+                id_candidato, datos_candidato, _ = pendientes[0]
+                resultados = await evaluar_multiperfil_con_llm(planificador, id_candidato, datos_candidato, requisitos_puesto,
+                                                               [ev for _, _, ev in pendientes], usar_cache, informe["lotes"],
+                                                               plantilla)
+            else:
+                # Mismo perfil evaluador, varios candidatos.
+                resultados = await evaluar_lote_con_llm(planificador, [(id_c, datos) for id_c, datos, _ in pendientes],
+                                                        requisitos_puesto, pendientes[0][2], usar_cache, informe["lotes"],
+                                                        plantilla)
+        except Exception as e:
+            print(f"Error inesperado al evaluar un grupo de {len(pendientes)} pares: {e}")
+            resultados = [None] * len(pendientes)
+        for (id_candidato, _, evaluador), resultado in zip(pendientes, resultados):
+            await notificar(id_candidato, evaluador, resultado)
+
+    async def productor():
+        # En modo lote, los pares se agrupan por evaluador hasta completar `lote_llm`;
+        # en los modos multiperfil y adaptativo, los pares consecutivos de un mismo candidato.
+        pendientes_por_evaluador = defaultdict(list)
+        candidato_actual = []
+        async with contextlib.aclosing(_iterar_pares(pares)) as iterador_pares:
+            async for par in iterador_pares:
+                if planificador.plazo_agotado():
+                    informe["plazo_agotado"] = True
+                    break
+                if multiperfil or adaptativo:
+                    if candidato_actual and candidato_actual[0][0] != par[0]:
+                        await cola.put(candidato_actual)
+                        candidato_actual = []
+                    candidato_actual.append(par)
+                    continue
+                if lote_llm <= 1:
+                    await cola.put([par])
+                    continue
+                pendientes = pendientes_por_evaluador[par[2]]
+                pendientes.append(par)
+                if len(pendientes) >= lote_llm:
+                    await cola.put(pendientes_por_evaluador.pop(par[2]))
+        for pendientes in [candidato_actual, *pendientes_por_evaluador.values()]:
+            if pendientes:
+                await cola.put(pendientes)
+        for _ in range(MAX_CONSULTAS_CONCURRENTES):
+            await cola.put(None)
+
+    async def consumidor():
+        while True:
+            lote = await cola.get()
+            if lote is None:
+                return
+            if planificador.plazo_agotado():
+                # Pares ya encolados cuando venció el plazo: no se lanzan.
+                informe["plazo_agotado"] = True
+                informe["no_iniciados"] += len(lote)
+                continue
+            if adaptativo and not multiperfil:
+                await evaluar_adaptativo_y_notificar(lote)
+            elif len(lote) == 1:
+                await evaluar_y_notificar(*lote[0])
+            else:
+                await evaluar_grupo_y_notificar(lote)
+
+    await asyncio.gather(productor(), *(consumidor() for _ in range(MAX_CONSULTAS_CONCURRENTES)))
+    informe["plazo_agotado"] = informe["plazo_agotado"] or bool(informe["rezagados"])
+    informe["lotes"] = dict(informe["lotes"])
+    informe["adaptativo"] = dict(informe["adaptativo"])
+    if informe["adaptativo"]:
+        informe["adaptativo"]["tasa_omision"] = round(informe["adaptativo"].get("omitidos", 0) / informe["adaptativo"]["pares"], 4)
+    informe["planificador"] = planificador.metricas()
+    informe["prompt"] = plantilla.estadisticas()
+    print(f"   -> Planificador del LLM: {informe['planificador']}")
+    print(f"   -> Prompts (plantilla v{informe['prompt']['version']}): {informe['prompt']}")
+    if informe["lotes"]:
+        modo = "multiperfil" if multiperfil else f"en lotes de {lote_llm}"
+        print(f"   -> Evaluación {modo}: {informe['lotes']}")
+    if informe["adaptativo"]:
+        print(f"   -> Muestreo adaptativo: {informe['adaptativo']}")
+    if informe["plazo_agotado"]:
+        muestra = ', '.join(f"{id_c}/{ev}" for id_c, ev in informe["rezagados"][:10])
+        print(f"⚠️  Plazo de la ejecución agotado: {len(informe['rezagados'])} llamadas rezagadas cortadas "
+              f"({muestra}{'...' if len(informe['rezagados']) > 10 else ''}) y {informe['no_iniciados']} pares encolados sin lanzar.")
+    return informe
+
+async def _iterar_pares(pares):
+    """Recorre `pares` tanto si es un iterable normal como asíncrono, cerrándolo al terminar."""
+    if not hasattr(pares, '__aiter__'):
+        for par in pares:
+            yield par
+        return
+    try:
+        async for par in pares:
+            yield par
+    finally:
+        if hasattr(pares, 'aclose'):
+            await pares.aclose()
+
+def _registros_huella(resultados: list, huellas: dict) -> list:
+    """Prepara (id_candidato, perfil, huella, respuesta) de las evaluaciones correctas."""
+    return [
+        (r['id_candidato'], r['perfil_evaluador'], huellas[(r['id_candidato'], r['perfil_evaluador'])], r)
+        for r in resultados
+        if not r.get('error') and (r['id_candidato'], r['perfil_evaluador']) in huellas
+    ]
+
+class _GuardadoProgresivo:
+    """
+    Agrupa las respuestas del LLM por candidato y, en cuanto un candidato tiene
+    todas sus evaluaciones, lo pasa al lote pendiente. Cada lote de `tamano_lote`
+    candidatos se consolida y se guarda en su propia transacción, de modo que el
+    ranking se va rellenando durante la ejecución y un fallo solo pierde un lote.
+    Con `id_ejecucion` los lotes van a la preparación de la ejecución y el ranking
+    no cambia hasta publicarla.
+    """
 
-    print(f"\n{'#'*25} FIN PIPELINE: RE-EVALUACIÓN COMPLETADA {'#'*25}")
+    def __init__(self, nombre_vacante: str, tamano_lote: int = TAMANO_LOTE_GUARDADO, reemplazar: bool = False,
+                 id_ejecucion: int = None):
+        """
+        Args:
+            nombre_vacante (str): Puesto evaluado.
+            tamano_lote (int): Candidatos por transacción (0 = todo al final).
+            reemplazar (bool): Si es True (re-evaluación), antes de guardar un candidato
+                               se completan sus evaluaciones con las respuestas guardadas
+                               de los evaluadores no re-evaluados y se borra su SCORING previo.
+            id_ejecucion (int, opcional): Ejecución en cuya preparación se guardan los lotes
+                                          (publicación atómica). El SCORING previo no se borra:
+                                          lo sustituye publicar_ejecucion.
+        """
+        self.nombre_vacante = nombre_vacante
+        self.tamano_lote = tamano_lote
+        self.reemplazar = reemplazar
+        self.id_ejecucion = id_ejecucion
+        self.huellas = {}
+        self.esperados = {}
+        self.en_curso = defaultdict(list)
+        self.lote = {}
+        self.candidatos_guardados = 0
+
+    def registrar_par(self, id_candidato, evaluador: str, huella: str):
+        """Anota que se va a evaluar el par; debe llamarse antes de lanzarlo."""
+        self.huellas[(id_candidato, evaluador)] = huella
+        self.esperados[id_candidato] = self.esperados.get(id_candidato, 0) + 1
+
+    async def anadir(self, resultado: dict):
+        id_candidato = resultado['id_candidato']
+        self.en_curso[id_candidato].append(resultado)
+        if len(self.en_curso[id_candidato]) >= self.esperados.get(id_candidato, len(EVALUADORES)):
+            self.lote[id_candidato] = self.en_curso.pop(id_candidato)
+            self.esperados.pop(id_candidato, None)
+            if self.tamano_lote and len(self.lote) >= self.tamano_lote:
+                await self._vaciar_lote()
+
+    async def finalizar(self):
+        """Guarda el último lote, incluidos candidatos con evaluaciones incompletas."""
+        self.lote.update(self.en_curso)
+        self.en_curso.clear()
+        await self._vaciar_lote()
+
+    async def _vaciar_lote(self):
+        if not self.lote:
+            return
+        lote, self.lote = self.lote, {}
+        # La escritura es bloqueante: se hace en el pool de BD para no frenar las llamadas al LLM.
+        await bd_async.ejecutar(self._guardar_lote, lote)
+
+    def _guardar_lote(self, lote: dict):
+        evaluaciones = [r for resultados in lote.values() for r in resultados]
+        huellas_lote = {clave: self.huellas.pop(clave) for clave in list(self.huellas) if clave[0] in lote}
+        guardar_huellas_evaluacion(self.nombre_vacante, _registros_huella(evaluaciones, huellas_lote), self.id_ejecucion)
+        if self.reemplazar:
+            evaluaciones += [
+                respuesta for respuesta in obtener_respuestas_evaluacion(self.nombre_vacante, lote.keys())
+                if (respuesta.get('id_candidato'), respuesta.get('perfil_evaluador')) not in huellas_lote
+            ]
+            if self.id_ejecucion is None:
+                # Solo SCORING y hard skills del puesto. Las soft skills del candidato son comunes
+                # a sus puestos: se conservan y guardar_evaluaciones_masivamente solo las inserta
+                # si no tiene ninguna.
+                _eliminar_evaluaciones_por_puesto(self.nombre_vacante, lote.keys())
+        guardar_evaluaciones_masivamente(_procesar_evaluaciones(evaluaciones), self.nombre_vacante, self.id_ejecucion)
+        self.candidatos_guardados += len(lote)
+        print(f"   -> Lote guardado: {len(lote)} candidatos ({self.candidatos_guardados} en total).")
+
+class _PuntoControl:
+    """Acumula las respuestas del LLM de una ejecución y las persiste por lotes."""
+
+    def __init__(self, id_ejecucion: int, tamano_lote: int = TAMANO_LOTE_PUNTO_CONTROL):
+        self.id_ejecucion = id_ejecucion
+        self.tamano_lote = tamano_lote
+        self.pendientes = []
+
+    async def anadir(self, resultado: dict):
+        self.pendientes.append(resultado)
+        if len(self.pendientes) >= self.tamano_lote:
+            await self.vaciar()
+
+    async def vaciar(self):
+        if not self.pendientes:
+            return
+        pendientes, self.pendientes = self.pendientes, []
+        await bd_async.ejecutar(guardar_resultados_ejecucion, self.id_ejecucion, pendientes)
 
-async def orquestador_evaluar_puesto_nuevo_optimizado(nombre_vacante: str):
+def _preseleccionar_candidatos(nombre_vacante: str, requisitos_puesto: dict, top_k: int, umbral: float,
+                               reemplazar: bool, tamano_lote: int = TAMANO_LOTE_GUARDADO, id_ejecucion: int = None) -> tuple:
     """
-    Toma una vacante y la evalúa contra todos los candidatos disponibles
-    de forma optimizada, minimizando las llamadas a la base de datos.
+    Puntúa a todos los candidatos con BM25 frente a los requisitos del puesto (sin
+    llamar al LLM) y guarda a los descartados con el estado NO_PRESELECCIONADO. Con
+    `id_ejecucion` se escriben en su preparación y publicar_ejecucion borra entonces su
+    SCORING y sus huellas anteriores; sin ella, se borran aquí. Al re-evaluar no se
+    reescriben los que ya estaban descartados.
+
+    Returns:
+        tuple: (ids de los candidatos admitidos, estadísticas de la preselección).
     """
-    print(f"\n{'='*20} INICIANDO WORKFLOW OPTIMIZADO: EVALUAR PUESTO '{nombre_vacante}' {'='*20}")
+    inicio = time.monotonic()
+    admitidos, puntuaciones = preseleccion.preseleccionar(
+        ((id_candidato, _parsear_otros(otros)) for id_candidato, otros in iterar_candidatos()),
+        requisitos_puesto, normalizar_texto, top_k, umbral
+    )
+    descartados = [id_candidato for id_candidato in puntuaciones if id_candidato not in admitidos]
+    ya_descartados = obtener_no_preseleccionados(nombre_vacante) if reemplazar else set()
+    nuevos_descartados = [id_candidato for id_candidato in descartados if id_candidato not in ya_descartados]
+    print(f"   -> Preselección (top_k={top_k}, umbral={umbral}): {len(admitidos)} de {len(puntuaciones)} candidatos "
+          f"pasan a la evaluación con IA; {len(descartados) - len(nuevos_descartados)} descartados ya lo estaban "
+          f"({time.monotonic() - inicio:.2f}s).")
+
+    # Los descartados se guardan por lotes, como las evaluaciones. Al re-evaluar se borra su
+    # SCORING anterior y sus huellas, para evaluarlos de nuevo si vuelven a ser admitidos
+    # (en la preparación, al publicar la ejecución).
+    tamano = tamano_lote or len(nuevos_descartados) or 1
+    for i in range(0, len(nuevos_descartados), tamano):
+        lote = nuevos_descartados[i:i + tamano]
+        if reemplazar and id_ejecucion is None:
+            # Solo lo de este puesto: las soft skills del candidato las usan sus otros puestos.
+            _eliminar_evaluaciones_por_puesto(nombre_vacante, lote, incluir_huellas=True)
+        guardar_evaluaciones_masivamente(
+            {id_candidato: _evaluacion_no_preseleccionada(puntuaciones[id_candidato]) for id_candidato in lote},
+            nombre_vacante, id_ejecucion
+        )
+    return admitidos, {
+        "candidatos": len(puntuaciones),
+        "admitidos": len(admitidos),
+        "descartados": len(descartados),
+        "descartados_sin_cambios": len(descartados) - len(nuevos_descartados),
+        "top_k": top_k,
+        "umbral": umbral,
+        "duracion_s": round(time.monotonic() - inicio, 3)
+    }
 
-    # 1. Obtenemos los requisitos del puesto UNA SOLA VEZ
-    requisitos_puesto = obtener_requisitos_puesto(nombre_vacante)
+async def _ejecutar_evaluacion(nombre_vacante: str, tipo: str, progreso=None, usar_cache: bool = True,
+                               filtrar_por_huella: bool = False, tamano_lote: int = TAMANO_LOTE_GUARDADO,
+                               ejecucion_previa: dict = None, plazo_ejecucion: float = PLAZO_EJECUCION,
+                               lote_llm: int = TAMANO_LOTE_LLM, ids_candidatos: list = None,
+                               registrar_ejecucion=None):
+    """
+    Núcleo común de las evaluaciones de un puesto. Registra la ejecución, recorre los
+    candidatos en streaming, evalúa con el LLM los pares necesarios, guarda un punto de
+    control por cada par completado y persiste los resultados por lotes.
 
-    
-    
+    Args:
+        tipo (str): 'evaluar' (puesto nuevo) o 'reevaluar' (puesto modificado).
+        filtrar_por_huella (bool): Omite los pares cuya huella coincide con la guardada.
+        ejecucion_previa (dict, opcional): Ejecución interrumpida que se reanuda. Sus pares
+                                           ya completados reutilizan la respuesta guardada.
+        plazo_ejecucion (float): Segundos máximos de la ejecución. Si vence, se guarda lo
+                                 completado y la ejecución queda en 'plazo_agotado', reanudable.
+        lote_llm (int): Candidatos por llamada al LLM (1 = una llamada por par).
+        ids_candidatos (list, opcional): Evalúa solo estos candidatos (sin preselección).
+        registrar_ejecucion (callable, opcional): Se llama con el ID_EJECUCION recién creado
+                                                  (la cola lo anota en el trabajo para reanudarlo).
+    """
+    # Todo el acceso a la BD pasa por bd_async: en el bucle de eventos solo quedan las
+    # llamadas al LLM, que así se solapan con las lecturas y escrituras.
+    requisitos_puesto = await bd_async.ejecutar(obtener_requisitos_puesto, nombre_vacante)
     if not requisitos_puesto:
         print(f"🛑 Proceso detenido. No se pudieron obtener los requisitos para el puesto '{nombre_vacante}'.")
         return
 
-    # 2. Obtenemos los datos de TODOS los candidatos UNA SOLA VEZ
-    todos_los_candidatos = obtener_datos_todos_los_candidatos()
-    
-    
-    
-    if not todos_los_candidatos:
+    num_candidatos = len(ids_candidatos) if ids_candidatos is not None else await bd_async.ejecutar(contar_candidatos)
+    if not num_candidatos:
         print("🛑 Proceso detenido. No se encontraron candidatos para evaluar.")
         return
-    semaphore = asyncio.Semaphore(MAX_CONSULTAS_CONCURRENTES)
-    tasks = []
-    # 3. Iteramos sobre los candidatos (ya en memoria) y ejecutamos la evaluación
-    for i, (id_candidato, datos_candidato) in enumerate(todos_los_candidatos.items()):
-        for evaluador in EVALUADORES.keys():
-            task = evaluar_candidato_con_llm(semaphore,id_candidato ,datos_candidato, requisitos_puesto, evaluador.format(nombre_vacante=nombre_vacante))
-            tasks.append(task)
-        #print(f"\n--- ({i+1}/{num_candidatos}) Evaluando al candidato con ID: {id_candidato} ---")
-    all_results = await asyncio.gather(*tasks, return_exceptions=True)
-    
-    # 4. Procesamos y guardamos todas las evaluaciones
 
-    evaluacion_consensuada = _procesar_evaluaciones(all_results)
-    guardar_evaluaciones_masivamente(evaluacion_consensuada, nombre_vacante)
+    # La parte común de los prompts (instrucciones y requisitos) se construye una vez por ejecución.
+    plantilla = plantillas_prompt.crear_plantilla(requisitos_puesto, EVALUADORES, VERSION_PROMPT)
+
+    modo = await bd_async.ejecutar(obtener_modo_evaluacion, nombre_vacante)
+    top_k, umbral = await bd_async.ejecutar(obtener_configuracion_preseleccion, nombre_vacante)
+    if modo == MODO_EVALUACION_MULTIPERFIL:
+        print("   -> Modo multiperfil: una llamada al LLM por candidato para todos los evaluadores.")
+    elif modo == MODO_EVALUACION_ADAPTATIVO:
+        print("   -> Modo adaptativo: los evaluadores se detienen al alcanzar consenso o una banda clara.")
+
+    respuestas_previas = {}
+    if ejecucion_previa:
+        id_ejecucion = ejecucion_previa['ID_EJECUCION']
+        respuestas_previas = await bd_async.ejecutar(obtener_resultados_ejecucion, id_ejecucion)
+        print(f"   -> Reanudando la ejecución {id_ejecucion}: {len(respuestas_previas)} respuestas reutilizables.")
+    else:
+        id_ejecucion = await bd_async.ejecutar(crear_ejecucion, nombre_vacante, tipo,
+                                               {"usar_cache": usar_cache, "filtrar_por_huella": filtrar_por_huella,
+                                                "lote_llm": lote_llm, "modo": modo, "ids_candidatos": ids_candidatos})
+        if registrar_ejecucion and id_ejecucion is not None:
+            await bd_async.ejecutar(registrar_ejecucion, id_ejecucion)
+
+    huellas_previas = await bd_async.ejecutar(obtener_huellas_evaluacion, nombre_vacante) if filtrar_por_huella else {}
+    # Las re-evaluaciones se preparan aparte y se publican de una vez al terminar, para que
+    # el ranking siga mostrando la evaluación anterior completa mientras tanto.
+    publicacion_atomica = tipo == 'reevaluar'
+    id_preparacion = id_ejecucion if publicacion_atomica else None
+    if publicacion_atomica and not ejecucion_previa:
+        await bd_async.ejecutar(descartar_preparaciones_antiguas, nombre_vacante, id_ejecucion)
+    # Al re-evaluar (o al reanudar) se reemplaza: el candidato puede tener ya un SCORING.
+    guardado = _GuardadoProgresivo(nombre_vacante, tamano_lote, reemplazar=filtrar_por_huella or tipo == 'reevaluar',
+                                   id_ejecucion=id_preparacion)
+    punto_control = _PuntoControl(id_ejecucion)
+    estadisticas = {"sin_cambios": 0, "evaluados": 0}
+
+    admitidos = None
+    if (top_k or umbral) and ids_candidatos is None:
+        admitidos, estadisticas["preseleccion"] = await bd_async.ejecutar(
+            _preseleccionar_candidatos, nombre_vacante, requisitos_puesto, top_k, umbral,
+            filtrar_por_huella or tipo == 'reevaluar', tamano_lote, id_preparacion
+        )
+        num_candidatos = len(admitidos)
+
+    async def pares_a_evaluar():
+        # Se cierra explícitamente para devolver la conexión si la ejecución se corta antes (plazo agotado).
+        async with contextlib.aclosing(bd_async.iterar(iterar_candidatos(ids_candidatos=ids_candidatos))) as candidatos:
+            async for id_candidato, otros in candidatos:
+                if admitidos is not None and id_candidato not in admitidos:
+                    continue
+                # La huella se calcula sobre lo que realmente se envía al LLM: los cambios en
+                # campos que la plantilla no usa no obligan a re-evaluar.
+                datos_candidato = plantilla.preparar_candidato(_parsear_otros(otros))
+                pendientes = []
+                for evaluador in EVALUADORES.keys():
+                    huella = calcular_huella_evaluacion(requisitos_puesto, datos_candidato, evaluador, modo)
+                    if huellas_previas.get((id_candidato, evaluador)) == huella:
+                        estadisticas["sin_cambios"] += 1
+                    else:
+                        pendientes.append((evaluador, huella))
+                # Se registran todos los pares del candidato antes de lanzar el primero,
+                # para que el guardado sepa cuántas respuestas esperar.
+                for evaluador, huella in pendientes:
+                    guardado.registrar_par(id_candidato, evaluador, huella)
+                for evaluador, _ in pendientes:
+                    estadisticas["evaluados"] += 1
+                    yield id_candidato, datos_candidato, evaluador
+
+    async def al_resultado(resultado: dict):
+        await punto_control.anadir(resultado)
+        await guardado.anadir(resultado)
+
+    try:
+        informe = await _lanzar_evaluaciones(pares_a_evaluar(), requisitos_puesto, progreso, usar_cache,
+                                             total=None if filtrar_por_huella else num_candidatos * len(EVALUADORES),
+                                             al_resultado=al_resultado, respuestas_previas=respuestas_previas,
+                                             plazo_ejecucion=plazo_ejecucion, lote_llm=lote_llm,
+                                             multiperfil=modo == MODO_EVALUACION_MULTIPERFIL,
+                                             adaptativo=modo == MODO_EVALUACION_ADAPTATIVO, plantilla=plantilla)
+        await punto_control.vaciar()
+        await guardado.finalizar()
+    except asyncio.CancelledError:
+        # Apagado del servicio: se guarda el punto de control y la ejecución queda en curso,
+        # de modo que el trabajo la reanuda al volver a arrancar.
+        await punto_control.vaciar()
+        raise
+    except Exception as e:
+        await punto_control.vaciar()
+        await bd_async.ejecutar(finalizar_ejecucion, id_ejecucion, ESTADO_EJECUCION_FALLIDA, str(e))
+        raise
+    estadisticas["rezagados"] = len(informe["rezagados"])
+    estadisticas["no_iniciados"] = informe["no_iniciados"]
+    estadisticas["plazo_agotado"] = informe["plazo_agotado"]
+    if informe["adaptativo"]:
+        estadisticas["adaptativo"] = informe["adaptativo"]
+    estadisticas["prompt"] = informe["prompt"]
+    if informe["plazo_agotado"]:
+        # La ejecución queda incompleta pero reanudable: los pares rezagados o no lanzados
+        # no tienen resultado en el punto de control y se evaluarán al reanudar.
+        resumen = (f"Plazo de {plazo_ejecucion:.0f}s agotado: {len(informe['rezagados'])} llamadas rezagadas, "
+                   f"{informe['no_iniciados']} pares encolados sin lanzar y el resto del puesto sin recorrer.")
+        if publicacion_atomica:
+            resumen += " Lo evaluado queda preparado y se publicará al reanudarla."
+        await bd_async.ejecutar(finalizar_ejecucion, id_ejecucion, ESTADO_EJECUCION_PLAZO_AGOTADO, resumen, estadisticas)
+    else:
+        if publicacion_atomica:
+            estadisticas["publicados"] = await bd_async.ejecutar(publicar_ejecucion, id_ejecucion, nombre_vacante)
+        if publicacion_atomica and estadisticas["publicados"] is None:
+            await bd_async.ejecutar(finalizar_ejecucion, id_ejecucion, ESTADO_EJECUCION_FALLIDA,
+                                    "No se pudo publicar la re-evaluación; sigue preparada y se puede reanudar.", estadisticas)
+        else:
+            await bd_async.ejecutar(finalizar_ejecucion, id_ejecucion, ESTADO_EJECUCION_COMPLETADA, estadisticas=estadisticas)
+
+    print(f"   -> Ejecución {id_ejecucion}: {estadisticas['evaluados']} pares evaluados, {estadisticas['sin_cambios']} sin cambios "
+          f"({guardado.candidatos_guardados} candidatos guardados).")
+    print(f"   -> Caché de respuestas del LLM: {CACHE_RESPUESTAS.estadisticas()}")
+    return estadisticas
+
+async def orquestador_reevaluar_puesto_modificado(nombre_vacante: str, progreso=None, forzar: bool = False,
+                                                  tamano_lote: int = TAMANO_LOTE_GUARDADO, reanudar: bool = False,
+                                                  lote_llm: int = TAMANO_LOTE_LLM, id_ejecucion: int = None,
+                                                  registrar_ejecucion=None):
+    """
+    Orquesta la re-evaluación de un puesto que ha sido modificado.
+    Calcula la huella de las entradas de cada par (candidato, evaluador) y solo
+    vuelve a llamar al LLM para los pares cuya huella ha cambiado. Los candidatos
+    sin cambios conservan su SCORING; el resto se recalcula reutilizando las
+    respuestas guardadas de los evaluadores que no han cambiado. Los resultados se
+    preparan aparte y se publican en una sola transacción al terminar, así que el
+    ranking no se vacía ni queda a medias durante la re-evaluación.
+
+    Args:
+        nombre_vacante (str): El puesto modificado.
+        progreso (callable, opcional): Callback progreso(total, completados, errores).
+        forzar (bool): Si es True, ignora las huellas y la caché de respuestas y
+                       re-evalúa todo el puesto con llamadas nuevas al LLM.
+        tamano_lote (int): Candidatos guardados por transacción (0 = todo al final).
+        reanudar (bool): Continúa la ejecución `id_ejecucion` que creó este trabajo antes de
+                         interrumpirse; si no llegó a crearla, se lanza una ejecución nueva.
+        lote_llm (int): Candidatos por llamada al LLM (1 = una llamada por par).
+        id_ejecucion (int, opcional): Ejecución creada por este trabajo (la anota la cola).
+        registrar_ejecucion (callable, opcional): Ver _ejecutar_evaluacion.
+    """
+    if reanudar and id_ejecucion is not None:
+        await reanudar_ejecucion(nombre_vacante, progreso=progreso, id_ejecucion=id_ejecucion, tamano_lote=tamano_lote)
+        return
+
+    print(f"\n{'#'*25} INICIO PIPELINE: RE-EVALUACIÓN DEL PUESTO '{nombre_vacante}' {'#'*25}")
+    estadisticas = await _ejecutar_evaluacion(nombre_vacante, 'reevaluar', progreso, usar_cache=not forzar,
+                                              filtrar_por_huella=not forzar, tamano_lote=tamano_lote, lote_llm=lote_llm,
+                                              registrar_ejecucion=registrar_ejecucion)
+    if estadisticas and not estadisticas["evaluados"]:
+        print(f"\n{'#'*25} FIN PIPELINE: SIN CAMBIOS RELEVANTES, 0 LLAMADAS AL LLM {'#'*25}")
+        return
+    print(f"\n{'#'*25} FIN PIPELINE: RE-EVALUACIÓN COMPLETADA {'#'*25}")
+
+async def orquestador_evaluar_puesto_nuevo_optimizado(nombre_vacante: str, progreso=None, usar_cache: bool = True,
+                                                      tamano_lote: int = TAMANO_LOTE_GUARDADO, reanudar: bool = False,
+                                                      lote_llm: int = TAMANO_LOTE_LLM, id_ejecucion: int = None,
+                                                      registrar_ejecucion=None):
+    """
+    Toma una vacante y la evalúa contra todos los candidatos disponibles
+    de forma optimizada, minimizando las llamadas a la base de datos.
+    Los candidatos se leen por páginas y se parsean a medida que se evalúan, y
+    los resultados se guardan por lotes en cuanto cada candidato está completo.
+
+    Args:
+        nombre_vacante (str): El puesto a evaluar.
+        progreso (callable, opcional): Callback progreso(total, completados, errores)
+                                       que se invoca al terminar cada llamada al LLM.
+        usar_cache (bool): Si es False, no se consultan respuestas cacheadas del LLM.
+        tamano_lote (int): Candidatos guardados por transacción (0 = todo al final).
+        reanudar (bool): Continúa la ejecución `id_ejecucion` que creó este trabajo antes de
+                         interrumpirse; si no llegó a crearla, se lanza una ejecución nueva.
+        lote_llm (int): Candidatos por llamada al LLM (1 = una llamada por par).
+        id_ejecucion (int, opcional): Ejecución creada por este trabajo (la anota la cola).
+        registrar_ejecucion (callable, opcional): Ver _ejecutar_evaluacion.
+    """
+    if reanudar and id_ejecucion is not None:
+        await reanudar_ejecucion(nombre_vacante, progreso=progreso, id_ejecucion=id_ejecucion, tamano_lote=tamano_lote)
+        return
+
+    print(f"\n{'='*20} INICIANDO WORKFLOW OPTIMIZADO: EVALUAR PUESTO '{nombre_vacante}' {'='*20}")
+    await _ejecutar_evaluacion(nombre_vacante, 'evaluar', progreso, usar_cache=usar_cache, tamano_lote=tamano_lote,
+                               lote_llm=lote_llm, registrar_ejecucion=registrar_ejecucion)
     print(f"\n{'='*20} WORKFLOW COMPLETADO: EVALUACIÓN")
-    
-    
 
+async def orquestador_reevaluar_candidato(nombre_vacante: str, progreso=None, id_candidato: int = None,
+                                          usar_cache: bool = False, reanudar: bool = False, id_ejecucion: int = None,
+                                          registrar_ejecucion=None):
+    """
+    Re-evalúa a un solo candidato para un puesto (p. ej. tras corregir su CV) con todos
+    los evaluadores. Por defecto hace llamadas nuevas al LLM. Su SCORING se sustituye al
+    terminar, como en las re-evaluaciones de puestos. La cola de trabajos lo ejecuta con
+    prioridad interactiva: en el presupuesto compartido del LLM adelanta a las
+    evaluaciones masivas en curso.
+
+    Args:
+        nombre_vacante (str): El puesto.
+        id_candidato (int): El candidato a re-evaluar.
+        usar_cache (bool): Si es True, reutiliza las respuestas cacheadas del LLM.
+        reanudar (bool): Continúa la ejecución `id_ejecucion` que creó este trabajo antes de
+                         interrumpirse; si no llegó a crearla, se re-evalúa de nuevo al candidato.
+        id_ejecucion (int, opcional): Ejecución creada por este trabajo (la anota la cola).
+        registrar_ejecucion (callable, opcional): Ver _ejecutar_evaluacion.
+    """
+    if reanudar and id_ejecucion is not None:
+        await reanudar_ejecucion(nombre_vacante, progreso=progreso, id_ejecucion=id_ejecucion, tamano_lote=1)
+        return
+
+    print(f"\n{'#'*25} RE-EVALUACIÓN DEL CANDIDATO {id_candidato} PARA EL PUESTO '{nombre_vacante}' {'#'*25}")
+    await _ejecutar_evaluacion(nombre_vacante, 'reevaluar', progreso, usar_cache=usar_cache, tamano_lote=1,
+                               lote_llm=1, ids_candidatos=[id_candidato], registrar_ejecucion=registrar_ejecucion)
 
+async def reanudar_ejecucion(nombre_vacante: str, progreso=None, id_ejecucion: int = None,
+                             tamano_lote: int = TAMANO_LOTE_GUARDADO, registrar_ejecucion=None):
+    """
+    Reanuda una ejecución interrumpida (por defecto, la última incompleta del puesto).
+    Los pares ya guardados se omiten por su huella, los que quedaron en el punto de
+    control reutilizan su respuesta cruda y solo se llama al LLM para los que faltan.
+    `registrar_ejecucion` se acepta por la interfaz de la cola de trabajos; la ejecución
+    reanudada ya existe, no hay nada que anotar.
+    """
+    ejecucion = await bd_async.ejecutar(obtener_ejecucion, id_ejecucion, None if id_ejecucion else nombre_vacante,
+                                        solo_incompletas=True)
+    if not ejecucion:
+        print(f"🛑 No hay ninguna ejecución incompleta que reanudar para el puesto '{nombre_vacante}'.")
+        return
+    nombre_vacante = ejecucion['PUESTO']
+    parametros = ejecucion['PARAMETROS'] or {}
+
+    print(f"\n{'#'*25} REANUDANDO EJECUCIÓN {ejecucion['ID_EJECUCION']} DEL PUESTO '{nombre_vacante}' {'#'*25}")
+    estadisticas = await _ejecutar_evaluacion(nombre_vacante, ejecucion['TIPO'], progreso,
+                                              usar_cache=parametros.get('usar_cache', True),
+                                              filtrar_por_huella=True, tamano_lote=tamano_lote,
+                                              ejecucion_previa=ejecucion,
+                                              lote_llm=parametros.get('lote_llm', TAMANO_LOTE_LLM),
+                                              ids_candidatos=parametros.get('ids_candidatos'))
+    print(f"\n{'#'*25} FIN PIPELINE: EJECUCIÓN REANUDADA {'#'*25}")
+    return estadisticas
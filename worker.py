@@ -0,0 +1,44 @@
+"""
+Proceso de evaluación para producción: ejecuta la cola de trabajos y el servicio de
+evaluación (y con él el presupuesto global del LLM) fuera de los workers web, que con
+JOBS_EMBEDDED=0 solo encolan. Debe haber un único proceso de este tipo por cola.
+
+Con SIGTERM o SIGINT deja de reclamar trabajos, espera hasta JOBS_DRAIN_TIMEOUT
+segundos a las evaluaciones en curso y, si no terminan, las interrumpe guardando su
+punto de control: sus trabajos vuelven a la cola y se reanudan en el próximo arranque.
+
+Uso:
+    python worker.py
+"""
+import os
+import signal
+import threading
+
+# Las invalidaciones de caché de este proceso tienen que llegar a los workers web
+# (mismo valor por defecto que gunicorn.conf.py). Se fija antes de importar app.py.
+os.environ.setdefault('RANKING_CACHE', 'sqlite')
+
+import app
+
+
+def main():
+    parar = threading.Event()
+
+    def al_recibir_senal(numero, _marco):
+        print(f"\n🛑 Señal {signal.Signals(numero).name} recibida: apagando las evaluaciones...")
+        parar.set()
+
+    signal.signal(signal.SIGTERM, al_recibir_senal)
+    signal.signal(signal.SIGINT, al_recibir_senal)
+
+    app.servicio_evaluacion.SERVICIO.iniciar()
+    app.cola_trabajos.iniciar()
+    print(f"✅ Proceso de evaluación en marcha (plazo de drenado al apagar: {app.PLAZO_DRENADO:.0f}s).")
+    while not parar.wait(1.0):
+        pass
+    completo = app.detener_evaluaciones()
+    raise SystemExit(0 if completo else 1)
+
+
+if __name__ == '__main__':
+    main()